@@ -6,6 +6,7 @@ from qgreenland.cli.fetch import fetch
 from qgreenland.cli.layers import layers
 from qgreenland.cli.provenance import provenance
 from qgreenland.cli.run import run
+from qgreenland.cli.stats import stats
 
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
@@ -19,6 +20,7 @@ cli.add_command(fetch)
 cli.add_command(layers)
 cli.add_command(provenance)
 cli.add_command(run)
+cli.add_command(stats)
 
 
 if __name__ == "__main__":
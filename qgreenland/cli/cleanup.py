@@ -4,7 +4,11 @@ import subprocess
 import click
 
 from qgreenland.constants.paths import (
+    FETCH_BLOBS_DIR,
     FETCH_DATASETS_DIR,
+    FETCH_PARTIAL_DIR,
+    FETCH_PREVIOUS_DIR,
+    RANGE_CACHE_DIR,
     RELEASE_LAYERS_DIR,
     RELEASE_PACKAGES_DIR,
     WIP_LAYERS_DIR,
@@ -73,6 +77,16 @@ def _print_and_run(cmd, *, dry_run):
     multiple=True,
     metavar="PATTERN",
 )
+@click.option(
+    "delete_unused_blobs",
+    "--delete-unused-blobs",
+    "-B",
+    help=(
+        "Delete stored fetched files which no asset links to any more."
+        " Implied by --delete-fetch-by-pattern"
+    ),
+    is_flag=True,
+)
 @click.option(
     "delete_all_wip_layers",
     "--delete-all-wip-layers",
@@ -171,9 +185,21 @@ def cleanup(**kwargs):  # noqa: C901
     if fetch_patterns := kwargs["delete_fetch_by_pattern"]:
         for p in fetch_patterns:
             print_and_run(f"rm -rf {FETCH_DATASETS_DIR}/{p}")
+        kwargs["delete_unused_blobs"] = True
+
+    if kwargs["delete_unused_blobs"]:
+        # A blob with only one link isn't in any asset directory.
+        print_and_run(
+            f"[ ! -d {FETCH_BLOBS_DIR} ]"
+            f" || find {FETCH_BLOBS_DIR} -type f -links 1 -delete",
+        )
 
     if kwargs["delete_all_fetch"]:
         print_and_run(f"rm -rf {FETCH_DATASETS_DIR}/*")
+        print_and_run(f"rm -rf {FETCH_BLOBS_DIR}")
+        print_and_run(f"rm -rf {FETCH_PREVIOUS_DIR}")
+        print_and_run(f"rm -rf {FETCH_PARTIAL_DIR}/*")
+        print_and_run(f"rm -rf {RANGE_CACHE_DIR}")
 
     # WIP
     if wip_patterns := kwargs["delete_wip_layers_by_pattern"]:
@@ -1,10 +1,18 @@
+import shutil
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
 
 import click
 import luigi
 from funcy import lmapcat, select
 
+if TYPE_CHECKING:
+    from qgreenland.util.luigi.tasks.fetch import FetchTask
+
 
 @click.command()
 @click.option(
@@ -20,13 +28,40 @@ from funcy import lmapcat, select
     show_default=True,
     help="Number of workers to use.",
 )
+@click.option(
+    "--revalidate",
+    is_flag=True,
+    help=(
+        "Check already-fetched HTTP assets for upstream changes with conditional"
+        " HEAD requests, and fetch again only those which changed."
+    ),
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    help=(
+        "Instead of fetching, find the size of each asset which hasn't been"
+        " fetched yet with HEAD requests, check they fit in working storage,"
+        " and print the plan, largest first, as JSON. Later fetches and runs"
+        " start the largest planned fetches first."
+    ),
+)
 @click.argument("pattern")
-def fetch(pattern, dry_run, workers) -> None:
+def fetch(pattern, dry_run, workers, revalidate, plan) -> None:
     """Fetch assets for datasets matching PATTERN."""
     # Hack to work around issue with sphinx-click:
     #     https://github.com/click-contrib/sphinx-click/issues/86#issuecomment-991196764
     from qgreenland.util.config.config import get_config, init_config
+    from qgreenland.util.hosts import host_stats_summary, read_host_stats
+    from qgreenland.util.ledger import enable_run_ledger
     from qgreenland.util.luigi import fetch_tasks_from_dataset
+    from qgreenland.util.luigi.resources import (
+        ResourceLimitedSchedulerFactory,
+        resource_limits,
+    )
+    from qgreenland.util.luigi.schedule import CostModel
+    from qgreenland.util.luigi.tasks.fetch import prefetch_cmr_granules
+    from qgreenland.util.range_cache import serve_range_cache_if_streaming
 
     init_config()
     config = get_config()
@@ -36,30 +71,153 @@ def fetch(pattern, dry_run, workers) -> None:
         config.datasets,
     ).values()
 
-    print("Fetching all assets for the following datasets:")
-    print(
+    # Keep stdout for the plan's JSON.
+    click.echo("Fetching all assets for the following datasets:", err=plan)
+    click.echo(
         textwrap.indent(
             "\n".join([d.id for d in dataset_matches]),
             "  - ",
-        )
+        ),
+        err=plan,
     )
-    if dry_run:
-        print("DRY RUN enabled. Aborting fetch.")
-        return
 
     fetch_tasks = lmapcat(
         lambda i: fetch_tasks_from_dataset(i),
         dataset_matches,
     )
 
-    result = luigi.build(
-        fetch_tasks,
-        workers=workers,
-        # Unlike CLI, running tasks from Python does not feature an "identical
-        # process lock" by default.
-        no_lock=False,
-        detailed_summary=True,
-    )
+    if plan:
+        _plan(fetch_tasks, workers=workers)
+        return
+
+    changed_tasks: list["FetchTask"] = []
+    if revalidate:
+        changed_tasks = _revalidate(fetch_tasks, workers=workers)
+
+    if dry_run:
+        print("DRY RUN enabled. Aborting fetch.")
+        return
+
+    run_id = enable_run_ledger()
+    prefetch_cmr_granules(fetch_tasks)
+
+    cost_model = CostModel()
+    for task in fetch_tasks:
+        # Start the longest (e.g. largest planned) fetches first.
+        task.priority = round(cost_model.seconds(task))
+
+    assets = [task.asset_cfg for task in fetch_tasks]
+    with serve_range_cache_if_streaming(assets), _fetching_again(changed_tasks):
+        result = luigi.build(
+            fetch_tasks,
+            workers=workers,
+            worker_scheduler_factory=ResourceLimitedSchedulerFactory(
+                resource_limits(assets),
+            ),
+            # Unlike CLI, running tasks from Python does not feature an
+            # "identical process lock" by default.
+            no_lock=False,
+            detailed_summary=True,
+        )
+
+    print(host_stats_summary(read_host_stats(run_id)))
 
     if not result.scheduling_succeeded:
         raise click.UsageError("Scheduling failed. See error log above.")
+
+
+def _plan(fetch_tasks: list[luigi.Task], *, workers: int) -> None:
+    from qgreenland.util.luigi.fetch_plan import (
+        plan_fetches,
+        plan_summary,
+        write_fetch_plan,
+    )
+
+    plan = plan_fetches(fetch_tasks, workers=workers)
+    write_fetch_plan(plan)
+
+    click.echo(plan.json(indent=2))
+    click.echo(plan_summary(plan), err=True)
+
+
+def _revalidation_status(task) -> str:
+    """Check whether `task`'s asset changed upstream, without raising errors.
+
+    One asset failing mustn't stop the others from being revalidated.
+    """
+    from qgreenland.util.request import asset_upstream_changed
+
+    try:
+        changed = asset_upstream_changed(
+            Path(task.output().path),
+            verify=getattr(task.asset_cfg, "verify_tls", True),
+        )
+    except Exception as e:
+        return f"failed ({e})"
+
+    return {True: "changed", False: "unchanged", None: "unknown"}[changed]
+
+
+def _revalidate(fetch_tasks: list[luigi.Task], *, workers: int) -> list["FetchTask"]:
+    """Find the tasks whose fetched assets have changed upstream."""
+    from qgreenland.util.luigi.tasks.fetch import FetchCmrGranule, FetchDataFiles
+
+    fetched: list["FetchTask"] = [
+        task
+        for task in fetch_tasks
+        if isinstance(task, (FetchCmrGranule, FetchDataFiles)) and task.complete()
+    ]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(_revalidation_status, fetched))
+
+    print()
+    print(f"Revalidated {len(fetched)} fetched HTTP assets:")
+    for task, status in zip(fetched, statuses):
+        print(f"  - {task.output_name}: {status}")
+
+    if unknown := [t for t, status in zip(fetched, statuses) if status == "unknown"]:
+        print(
+            f"{len(unknown)} assets have no recorded validators, or their server"
+            " doesn't provide any. Delete them with `cleanup -f` to fetch them"
+            " again.",
+        )
+
+    if failed := [t for t, s in zip(fetched, statuses) if s.startswith("failed")]:
+        print(f"{len(failed)} assets couldn't be revalidated, and are kept.")
+
+    if changed_tasks := [t for t, s in zip(fetched, statuses) if s == "changed"]:
+        print(
+            "Fetching changed assets again. Layers using them must be cleaned"
+            " up (e.g. with `cleanup --dev`) to be processed again.",
+        )
+    print()
+
+    return changed_tasks
+
+
+@contextmanager
+def _fetching_again(tasks: list["FetchTask"]) -> Iterator[None]:
+    """Move `tasks`' fetched assets aside, so they're fetched again.
+
+    Each previous asset is deleted once it has been fetched again, and otherwise
+    restored.
+    """
+    from qgreenland.constants.paths import FETCH_PREVIOUS_DIR
+
+    previous_paths = {}
+    try:
+        for task in tasks:
+            previous_path = FETCH_PREVIOUS_DIR / task.output_name
+            shutil.rmtree(previous_path, ignore_errors=True)
+            previous_path.parent.mkdir(parents=True, exist_ok=True)
+            Path(task.output().path).rename(previous_path)
+            previous_paths[task] = previous_path
+
+        yield
+    finally:
+        for task, previous_path in previous_paths.items():
+            if task.complete():
+                shutil.rmtree(previous_path)
+            else:
+                previous_path.rename(task.output().path)
@@ -1,8 +1,8 @@
 import json
 from fnmatch import fnmatch
+from typing import Optional
 
 import click
-from funcy import select
 
 from qgreenland.util.json import MagicJSONEncoder
 
@@ -19,10 +19,24 @@ Format = ["ids", "titles", "json"]
     show_default=True,
     help="The format in which to display the layers.",
 )
+@click.option(
+    "tag",
+    "--tag",
+    "-t",
+    help="Only list layers with this tag.",
+)
+@click.option(
+    "dataset_id",
+    "--dataset",
+    "-d",
+    help="Only list layers using the dataset with this ID.",
+)
 @click.argument("pattern")
 def layers(
     pattern: str,
     format: str,
+    tag: Optional[str],
+    dataset_id: Optional[str],
 ) -> None:
     """List available layers matching PATTERN."""
     # Hack to work around issue with sphinx-click:
@@ -32,10 +46,18 @@ def layers(
     init_config()
     config = get_config()
 
-    layers = select(
-        lambda i: fnmatch(i[1].id, pattern),
-        config.layers,
-    ).values()
+    layer_ids = set(config.layers)
+    if tag is not None:
+        layer_ids &= {layer.id for layer in config.layers_by_tag.get(tag, [])}
+    if dataset_id is not None:
+        layer_ids &= {
+            layer.id for layer in config.layers_by_dataset.get(dataset_id, [])
+        }
+    layers = [
+        layer
+        for layer_id, layer in config.layers.items()
+        if layer_id in layer_ids and fnmatch(layer_id, pattern)
+    ]
 
     if format == "ids":
         for layer in layers:
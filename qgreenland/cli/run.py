@@ -1,6 +1,13 @@
+import os
+import time
+from typing import TYPE_CHECKING, Optional, Sequence
+
 import click
 import luigi
 
+if TYPE_CHECKING:
+    from qgreenland.util.luigi.schedule import SchedulePlan
+
 
 @click.command()
 @click.option(
@@ -22,6 +29,14 @@ import luigi
     show_default=True,
     help="Number of workers to use.",
 )
+@click.option(
+    "--schedule-report",
+    is_flag=True,
+    help=(
+        "Print the predicted critical path before running, and the achieved"
+        " duration compared to the ideal after."
+    ),
+)
 @click.option(
     "--include",
     "-i",
@@ -67,11 +82,17 @@ def run(
     dry_run: bool,
     fetch_only: bool,
     workers: int,
+    schedule_report: bool,
 ) -> None:
     """Run pipelines for layers matching filters."""
     # Hack to work around issue with sphinx-click:
     #     https://github.com/click-contrib/sphinx-click/issues/86#issuecomment-991196764
     from qgreenland.util.config.config import get_config, init_config
+    from qgreenland.util.hosts import host_stats_summary, read_host_stats
+    from qgreenland.util.ledger import enable_run_ledger
+    from qgreenland.util.luigi import fetch_tasks_from_dataset, generate_layer_pipelines
+    from qgreenland.util.luigi.schedule import CostModel, SchedulePlan
+    from qgreenland.util.luigi.tasks.fetch import prefetch_cmr_granules
     from qgreenland.util.luigi.tasks.pipeline import (
         LayerPipelines,
         QGreenlandAll,
@@ -104,22 +125,91 @@ def run(
     if include or exclude or exclude_manual_assets or dry_run:
         action = "Fetching data" if fetch_only else "Running pipelines"
         print(f"{action} for the following layers:")
-        for layer in config.layers.keys():
-            print(f"  - {layer}")
+        print("\n".join(f"  - {layer}" for layer in config.layers.keys()))
+        print()
+
+    plan = None
+    if schedule_report:
+        plan = SchedulePlan(
+            generate_layer_pipelines(fetch_only=fetch_only),
+            cost_model=CostModel(),
+            exclude_complete=True,
+        )
+        print(plan.report(workers=workers))
         print()
 
     if dry_run:
         print("DRY RUN enabled. Aborting run.")
         return
 
-    result = luigi.build(
-        tasks,
-        workers=workers,
-        # Unlike CLI, running tasks from Python does not feature an "identical
-        # process lock" by default.
-        no_lock=False,
-        detailed_summary=True,
+    run_id = enable_run_ledger()
+    print(f"Recording task statistics as run {run_id}. See `qgreenland stats`.")
+
+    prefetch_cmr_granules(
+        task
+        for dataset in config.datasets.values()
+        for task in fetch_tasks_from_dataset(dataset)
     )
 
+    result = _build(tasks, workers=workers, plan=plan)
+    print(host_stats_summary(read_host_stats(run_id)))
+
     if not result.scheduling_succeeded:
         raise SystemExit("Scheduling failed. See log above for details.")
+
+
+def _build(
+    tasks: Sequence[luigi.Task],
+    *,
+    workers: int,
+    plan: Optional["SchedulePlan"],
+) -> luigi.execution_summary.LuigiRunResult:
+    """Run `tasks`, comparing the duration with `plan`'s ideal if provided."""
+    from qgreenland.constants.project import FETCH_HOST_CONCURRENCY
+    from qgreenland.util.config.config import get_config
+    from qgreenland.util.gdal_settings import WORKERS_ENVVAR, gdal_settings
+    from qgreenland.util.luigi.resources import (
+        ResourceLimitedSchedulerFactory,
+        resource_limits,
+    )
+    from qgreenland.util.range_cache import serve_range_cache_if_streaming
+
+    assets = [
+        asset
+        for dataset in get_config().datasets.values()
+        for asset in dataset.assets.values()
+    ]
+    limits = resource_limits(assets)
+    heavy = {k: v for k, v in limits.items() if not k.startswith("fetch_host:")}
+    print(f"Limiting concurrent heavy steps to: {heavy}")
+    print(
+        f"Limiting concurrent fetches to {FETCH_HOST_CONCURRENCY} per host"
+        f" ({len(limits) - len(heavy)} hosts)",
+    )
+
+    # Inherited by worker processes.
+    os.environ[WORKERS_ENVVAR] = str(workers)
+    print(f"Running steps with GDAL settings: {gdal_settings()}")
+
+    start = time.monotonic()
+    with serve_range_cache_if_streaming(assets):
+        result = luigi.build(
+            tasks,
+            workers=workers,
+            worker_scheduler_factory=ResourceLimitedSchedulerFactory(limits),
+            # Unlike CLI, running tasks from Python does not feature an
+            # "identical process lock" by default.
+            no_lock=False,
+            detailed_summary=True,
+        )
+
+    if plan is not None:
+        makespan = time.monotonic() - start
+        ideal = plan.ideal_makespan_seconds(workers=workers)
+        print(
+            f"Achieved makespan: {makespan:.0f}s"
+            f" (predicted ideal: {ideal:.0f}s"
+            f"{f', {makespan / ideal:.2f}x ideal' if ideal else ''})",
+        )
+
+    return result
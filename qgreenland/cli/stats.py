@@ -0,0 +1,96 @@
+from collections import defaultdict
+from typing import Optional
+
+import click
+
+from qgreenland.constants.paths import RUN_LEDGER_FP
+from qgreenland.util.ledger import compare_with_previous, read_ledger
+
+By = ["layer", "step"]
+
+
+def _change(current: float, previous: Optional[float]) -> str:
+    if not previous:
+        return "new"
+    return f"{(current - previous) / previous:+.0%}"
+
+
+@click.command()
+@click.option(
+    "by",
+    "--by",
+    "-b",
+    type=click.Choice(By, case_sensitive=False),
+    default="layer",
+    show_default=True,
+    help="Rank layers (including their fetch tasks) or individual steps.",
+)
+@click.option(
+    "--top",
+    "-n",
+    default=20,
+    show_default=True,
+    help="Number of results to display.",
+)
+@click.option(
+    "--run",
+    "-r",
+    "run_id",
+    help="The run to display. Defaults to the latest run.",
+)
+def stats(by: str, top: int, run_id: Optional[str]) -> None:
+    """Rank the slowest layers or steps of a run and compare with previous runs.
+
+    Only tasks which actually ran are recorded; tasks that were already
+    complete are not.
+    """
+    entries = read_ledger()
+    if not entries:
+        print(f"No runs recorded in {RUN_LEDGER_FP}.")
+        return
+
+    compared = compare_with_previous(entries, run_id=run_id)
+    if not compared:
+        raise click.UsageError(f"Run {run_id} not found in {RUN_LEDGER_FP}.")
+
+    print(f"Run {compared[0][0].run_id}:")
+    print()
+
+    if by == "step":
+        rows = sorted(compared, key=lambda pair: pair[0].wall_seconds, reverse=True)
+        print(
+            f"{'wall':>9} {'cpu':>9} {'peak rss':>9} {'output':>9}"
+            f" {'vs prev':>8}  step"
+        )
+        for entry, previous in rows[:top]:
+            previous_seconds = previous.wall_seconds if previous else None
+            config_changed = (
+                previous is not None and previous.fingerprint != entry.fingerprint
+            )
+            print(
+                f"{entry.wall_seconds:8.1f}s"
+                f" {entry.user_cpu_seconds + entry.system_cpu_seconds:8.1f}s"
+                f" {entry.peak_rss_bytes / 2**20:7.0f}MB"
+                f" {entry.output_bytes / 2**20:7.0f}MB"
+                f" {_change(entry.wall_seconds, previous_seconds):>8}"
+                f"  {entry.subject} {entry.step}"
+                f"{' (config changed)' if config_changed else ''}"
+            )
+        return
+
+    # Tasks for the same layer share a subject, except fetch tasks, which are
+    # per-asset.
+    wall: dict[str, float] = defaultdict(float)
+    previous_wall: dict[str, float] = defaultdict(float)
+    for entry, previous in compared:
+        wall[entry.subject] += entry.wall_seconds
+        if previous is not None:
+            previous_wall[entry.subject] += previous.wall_seconds
+
+    print(f"{'wall':>9} {'vs prev':>8}  layer or asset")
+    for subject in sorted(wall, key=lambda s: wall[s], reverse=True)[:top]:
+        print(
+            f"{wall[subject]:8.1f}s"
+            f" {_change(wall[subject], previous_wall.get(subject)):>8}"
+            f"  {subject}"
+        )
@@ -7,7 +7,7 @@ from qgreenland.config.helpers.steps.compress_and_add_overviews import (
     compress_and_add_overviews,
 )
 from qgreenland.models.config.layer import Layer, LayerInput
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import ExtractSlicesStep, RasterSlice
 
 _year_ranges = [
     (start_year, end_year)
@@ -16,11 +16,41 @@ _year_ranges = [
 
 
 SurfaceElevVar = Literal["SEC", "SECer"]
+_variables: tuple[SurfaceElevVar, ...] = ("SEC", "SECer")
+
+
+def _slice_filename(
+    *,
+    variable: SurfaceElevVar,
+    start_year: int,
+    end_year: int,
+) -> str:
+    return f"{variable.lower()}_{start_year}_{end_year}.tif"
+
+
+# Every surface elevation layer uses this same step, so the NetCDF file is only
+# opened once to extract the slices for all layers.
+_extract_all_slices = ExtractSlicesStep(
+    input_file="{input_dir}/Release/CCI_GrIS_RA_SEC_5km_Vers2.0_2020-08-26.nc",
+    creation_options=["COMPRESS=DEFLATE"],
+    slices=[
+        RasterSlice(
+            array=f"name={variable},view=[:,:,{array_index}]",
+            output_file="{output_dir}/"
+            + _slice_filename(
+                variable=variable,
+                start_year=start_year,
+                end_year=end_year,
+            ),
+        )
+        for variable in _variables
+        for array_index, (start_year, end_year) in enumerate(_year_ranges)
+    ],
+)
 
 
 def surface_elevation_layer(
     *,
-    array_index: int,
     start_year: int,
     end_year: int,
     variable: SurfaceElevVar,
@@ -44,20 +74,13 @@ def surface_elevation_layer(
             asset=dataset.assets["only"],
         ),
         steps=[
-            CommandStep(
-                args=[
-                    "gdalmdimtranslate",
-                    "-co",
-                    "COMPRESS=DEFLATE",
-                    "-array",
-                    f"name={variable},view=[:,:,{array_index}]",
-                    "{input_dir}/Release/CCI_GrIS_RA_SEC_5km_Vers2.0_2020-08-26.nc",
-                    "{output_dir}/" + f"{variable.lower()}_{start_year}_{end_year}.tif",
-                ],
-            ),
+            _extract_all_slices,
             *compress_and_add_overviews(
-                input_file=(
-                    "{input_dir}/" f"{variable.lower()}_{start_year}_{end_year}.tif"
+                input_file="{input_dir}/"
+                + _slice_filename(
+                    variable=variable,
+                    start_year=start_year,
+                    end_year=end_year,
                 ),
                 output_file="{output_dir}/overviews.tif",
                 dtype_is_float=True,
@@ -69,10 +92,9 @@ def surface_elevation_layer(
 def surface_elevation_layers_for_var(*, variable: SurfaceElevVar):
     return [
         surface_elevation_layer(
-            array_index=array_index,
             start_year=start_year,
             end_year=end_year,
             variable=variable,
         )
-        for array_index, (start_year, end_year) in enumerate(_year_ranges)
+        for start_year, end_year in _year_ranges
     ]
@@ -10,6 +10,17 @@ from qgreenland.config.project import project
 from qgreenland.models.config.layer import Layer, LayerInput
 from qgreenland.models.config.step import CommandStep
 
+RACMO_ZIP_FILENAME = "RACMO_QGreenland_Jan2021.zip"
+
+
+def _decompress_racmo() -> CommandStep:
+    """Decompress the full RACMO archive.
+
+    All RACMO layers use this same step so that the archive is only decompressed
+    once and the output is shared between layers.
+    """
+    return decompress_step(input_file="{input_dir}/" + RACMO_ZIP_FILENAME)
+
 
 def _make_racmo_wind_vectors() -> Layer:
     return Layer(
@@ -27,12 +38,9 @@ def _make_racmo_wind_vectors() -> Layer:
         ),
         steps=[
             *compressed_vector(
-                input_file="{input_dir}/RACMO_QGreenland_Jan2021.zip",
+                input_file="{input_dir}/" + RACMO_ZIP_FILENAME,
                 output_file="{output_dir}/racmo_wind_vectors.gpkg",
                 vector_filename="wind_vector_points.gpkg",
-                decompress_step_kwargs={
-                    "decompress_contents_mask": "wind_vector_points.gpkg",
-                },
             ),
         ],
     )
@@ -53,10 +61,7 @@ def _make_racmo_wind_speed() -> Layer:
             asset=dataset.assets["only"],
         ),
         steps=[
-            decompress_step(
-                input_file="{input_dir}/RACMO_QGreenland_Jan2021.zip",
-                decompress_contents_mask="magnitudes.nc",
-            ),
+            _decompress_racmo(),
             *warp_and_cut(
                 input_file="{input_dir}/magnitudes.nc",
                 output_file="{output_dir}/racmo_wind_speed.tif",
@@ -144,7 +149,6 @@ def _make_masked_racmo_layer(
     description: str,
     style: str,
     input_filename: str,
-    decompress_contents_mask: str,
     variable: str,
     nodata: int = -9999,
     gdal_edit_args=(),
@@ -160,10 +164,7 @@ def _make_masked_racmo_layer(
             asset=dataset.assets["only"],
         ),
         steps=[
-            decompress_step(
-                input_file="{input_dir}/RACMO_QGreenland_Jan2021.zip",
-                decompress_contents_mask=decompress_contents_mask,
-            ),
+            _decompress_racmo(),
             # Apply the promice mask. The `Promicemask` values are 3 = Greenland ice
             # sheet; 2,1 = Greenland peripheral ice caps; 0 = Ocean. This step masks
             # out the ocean as 'nodata'.
@@ -211,10 +212,6 @@ def _make_masked_racmo_layers() -> list[Layer]:
                 title=params["title"],
                 description=params["description"],
                 style=layer_id,
-                decompress_contents_mask=(
-                    input_filename
-                    + " Icemask_Topo_Iceclasses_lon_lat_average_1km_GrIS.nc"
-                ),
                 input_filename=input_filename,
                 variable=variable,
             ),
@@ -271,10 +268,7 @@ def make_racmo_supplemental_layers() -> list[Layer]:
                     asset=dataset.assets["only"],
                 ),
                 steps=[
-                    decompress_step(
-                        input_file="{input_dir}/RACMO_QGreenland_Jan2021.zip",
-                        decompress_contents_mask=params["extract_filename"],
-                    ),
+                    _decompress_racmo(),
                     CommandStep(
                         args=[
                             "gdal_translate",
@@ -311,7 +305,6 @@ def make_racmo_supplemental_layers() -> list[Layer]:
             Project (GIMP) Digital Elevation Model."""
         ),
         style="racmo_topography",
-        decompress_contents_mask="Icemask_Topo_Iceclasses_lon_lat_average_1km_GrIS.nc",
         input_filename="Icemask_Topo_Iceclasses_lon_lat_average_1km_GrIS.nc",
         variable="Topography",
         gdal_edit_args=[
@@ -4,7 +4,7 @@ from qgreenland.config.datasets import wmm
 from qgreenland.config.helpers.steps.ogr2ogr import STANDARD_OGR2OGR_ARGS
 from qgreenland.config.project import project
 from qgreenland.models.config.layer import Layer, LayerInput
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import AnyStep, CommandStep, PythonStep
 
 
 def make_boz_layer(*, year: int) -> Layer:
@@ -203,9 +203,15 @@ def unzip_and_reproject_wmm_vector(
     *,
     partial_filename: str,
     contour_units: str,
-    unzip_contents_mask: str,
     zip_filename: str,
-) -> list[CommandStep]:
+    unzip_contents_mask: str = "",
+) -> list[AnyStep]:
+    """Unzip a WMM shapefile and reproject it.
+
+    Without an `unzip_contents_mask`, the whole zip file is decompressed. This
+    allows the decompression to be shared between all layers using the same
+    zip file.
+    """
     unzip = CommandStep(
         args=[
             "unzip",
@@ -217,11 +223,13 @@ def unzip_and_reproject_wmm_vector(
         ],
     )
 
-    reproject_with_sql = CommandStep(
+    reproject_with_sql = PythonStep(
         id="ogr2ogr",
+        utility="ogr2ogr",
+        input_file="{input_dir}/" + f"{partial_filename}.shp",
+        output_file="{output_dir}/" + f"{partial_filename}.gpkg",
+        config_options={"OGR_ENABLE_PARTIAL_REPROJECTION": "TRUE"},
         args=[
-            "OGR_ENABLE_PARTIAL_REPROJECTION=TRUE",
-            "ogr2ogr",
             *STANDARD_OGR2OGR_ARGS,
             "-clipdst",
             project.boundaries["background"].filepath,
@@ -233,8 +241,6 @@ def unzip_and_reproject_wmm_vector(
                 rf"CAST(Contour AS TEXT) || \" {contour_units}\" as label "
                 f'FROM {partial_filename}"'
             ),
-            "{output_dir}/" + f"{partial_filename}.gpkg",
-            "{input_dir}/" + f"{partial_filename}.shp",
         ],
     )
 
@@ -263,7 +269,6 @@ def make_wmm_variable_layer(
         ),
         steps=unzip_and_reproject_wmm_vector(
             zip_filename=f"WMM_{year}_all_shape_geographic.zip",
-            unzip_contents_mask=f"*{variable.upper()}_{year}*",
             partial_filename=f"{variable.upper()}_{year}",
             contour_units=contour_label,
         ),
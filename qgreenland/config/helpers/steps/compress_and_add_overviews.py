@@ -1,7 +1,7 @@
 from typing import Literal, Optional
 
 from qgreenland._typing import StepArgs
-from qgreenland.models.config.step import AnyStep, CommandStep
+from qgreenland.models.config.step import PythonStep
 
 # https://gdal.org/programs/gdaladdo.html
 ResamplingAlgorithm = Literal[
@@ -30,7 +30,7 @@ def compress_and_add_overviews(
     resampling_algorithm: ResamplingAlgorithm = "average",
     compress_type: CompressionType = "DEFLATE",
     compress_args: StepArgs = (),
-) -> list[AnyStep]:
+) -> list[PythonStep]:
     """Compress raster and build overviews.
 
     If `dtype_is_float`, we use floating-point prediction with our compression,
@@ -60,38 +60,30 @@ def compress_and_add_overviews(
             ]
         )
 
-    compress = [
-        "gdal_translate",
-        *compress_creation_options,
-        *compress_args,
-        input_file,
-        "{output_dir}/compressed.tif",
-    ]
-
-    copy_into_place = [
-        "cp",
-        "{input_dir}/compressed.tif",
-        output_file,
-    ]
-
-    add_overviews = [
-        "gdaladdo",
-        "-r",
-        resampling_algorithm,
-        output_file,
-        "2",
-        "4",
-        "8",
-        "16",
-    ]
-
     return [
-        CommandStep(
+        PythonStep(
             id="compress_raster",
-            args=compress,
+            utility="gdal_translate",
+            input_file=input_file,
+            output_file="{output_dir}/compressed.tif",
+            args=[
+                *compress_creation_options,
+                *compress_args,
+            ],
         ),
-        CommandStep(
+        # Copies the compressed file to `output_file` before adding overviews.
+        PythonStep(
             id="build_overviews",
-            args=copy_into_place + ["&&"] + add_overviews,
+            utility="gdaladdo",
+            input_file="{input_dir}/compressed.tif",
+            output_file=output_file,
+            args=[
+                "-r",
+                resampling_algorithm,
+                "2",
+                "4",
+                "8",
+                "16",
+            ],
         ),
     ]
@@ -1,11 +1,15 @@
+from fnmatch import fnmatch
+from pathlib import PurePosixPath
 from types import MappingProxyType
+from typing import Optional
 
 from qgreenland._typing import StepArgs
 from qgreenland.config.helpers.steps.decompress import decompress_step
 from qgreenland.config.helpers.steps.ogr2ogr import ogr2ogr
 from qgreenland.config.project import project
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import AnyStep
 from qgreenland.util.runtime_vars import EvalFilePath
+from qgreenland.util.vsi import archive_member_path
 
 # Create an immutable dict for the decompress step kwargs default value (flake8
 # B006 and B008)
@@ -24,8 +28,26 @@ def compressed_vector(
     decompress_step_kwargs=default_decompress_step_kwargs,
     ogr2ogr_args: StepArgs = (),
     boundary_filepath: EvalFilePath = project.boundaries["background"].filepath,
-) -> list[CommandStep]:
-    """Unzip a vector data file and reproject."""
+) -> list[AnyStep]:
+    """Reproject a vector data file in an archive.
+
+    The file is read in place from the archive if GDAL can read the archive
+    (see `qgreenland.util.vsi`), and extracted first otherwise.
+    """
+    if in_place_path := _in_place_path(
+        input_file,
+        vector_filename=vector_filename,
+        **decompress_step_kwargs,
+    ):
+        return [
+            *ogr2ogr(
+                input_file=in_place_path,
+                output_file=output_file,
+                boundary_filepath=boundary_filepath,
+                ogr2ogr_args=ogr2ogr_args,
+            ),
+        ]
+
     return [
         decompress_step(
             input_file=input_file,
@@ -38,3 +60,27 @@ def compressed_vector(
             ogr2ogr_args=ogr2ogr_args,
         ),
     ]
+
+
+def _in_place_path(
+    input_file: str,
+    *,
+    vector_filename: str,
+    decompress_type: str = "unzip",
+    decompress_contents_mask: str = "",
+) -> Optional[str]:
+    """Find the path to read `vector_filename` from in `input_file` in place.
+
+    The member must match `decompress_contents_mask` too, to read the same file
+    as extracting it would. That's only possible if the mask is a file stem
+    (`dir/name.*`) with the same directory as `vector_filename`.
+    """
+    member = vector_filename
+    if decompress_contents_mask:
+        stem, _, ext = decompress_contents_mask.rpartition(".")
+        suffix = PurePosixPath(vector_filename).suffix
+        if ext != "*" or not fnmatch(stem + suffix, vector_filename):
+            return None
+        member = stem + suffix
+
+    return archive_member_path(input_file, member, decompress_type=decompress_type)
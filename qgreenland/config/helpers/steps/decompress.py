@@ -36,14 +36,26 @@ def decompress_step(
                 )
             )
 
+        # Decompress straight to the output directory, instead of copying the
+        # archive there first. Stop at the first failure; otherwise the loop's
+        # status is only that of the last file.
         args = [
-            "cp",
+            "for",
+            "gz_fp",
+            "in",
             input_file,
-            "{output_dir}/",
-            "&&",
+            ";",
+            "do",
             "gzip",
-            "-d",
-            "{output_dir}/*.gz",
+            "-dc",
+            '"$gz_fp"',
+            ">",
+            '"{output_dir}/$(basename "$gz_fp" .gz)"',
+            "||",
+            "exit",
+            "1",
+            ";",
+            "done",
         ]
     else:
         raise NotImplementedError(
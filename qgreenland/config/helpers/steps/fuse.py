@@ -0,0 +1,25 @@
+from typing import Optional
+
+from qgreenland.models.config.step import FusedStep, PythonStep
+
+
+def fuse(
+    steps: list[PythonStep],
+    *,
+    id: Optional[str] = None,
+) -> list[FusedStep]:
+    """Fuse consecutive raster steps to avoid writing intermediate rasters.
+
+    e.g.:
+
+        fuse([
+            *warp_and_cut(...),
+            *compress_and_add_overviews(...),
+        ])
+    """
+    return [
+        FusedStep(
+            steps=steps,
+            **({"id": id} if id else {}),
+        )
+    ]
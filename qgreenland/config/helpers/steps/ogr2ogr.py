@@ -1,8 +1,6 @@
-from typing import Any
-
 from qgreenland._typing import StepArgs
 from qgreenland.config.project import project
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import PythonStep
 from qgreenland.util.runtime_vars import EvalFilePath
 
 STANDARD_OGR2OGR_ARGS = [
@@ -22,25 +20,25 @@ def ogr2ogr(
     boundary_filepath: EvalFilePath = project.boundaries["background"].filepath,
     ogr2ogr_args: StepArgs = (),
     enable_partial_reprojection=False,
-) -> list[CommandStep]:
+) -> list[PythonStep]:
     """Warp to project CRS and do other stuff as specified in args."""
-    init_args: list[Any] = []
+    config_options: dict[str, str] = {}
     if enable_partial_reprojection:
-        init_args.append("OGR_ENABLE_PARTIAL_REPROJECTION=TRUE")
+        config_options["OGR_ENABLE_PARTIAL_REPROJECTION"] = "TRUE"
 
     return [
-        CommandStep(
+        PythonStep(
             id="ogr2ogr",
-            args=init_args
-            + [
-                "ogr2ogr",
+            utility="ogr2ogr",
+            input_file=input_file,
+            output_file=output_file,
+            args=[
                 *STANDARD_OGR2OGR_ARGS,
                 "-clipdst",
                 boundary_filepath,
                 "-makevalid",
                 *ogr2ogr_args,
-                output_file,
-                input_file,
             ],
+            config_options=config_options,
         )
     ]
@@ -1,6 +1,6 @@
 from qgreenland._typing import ResamplingMethod, StepArgs
 from qgreenland.config.project import project
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import PythonStep
 from qgreenland.util.runtime_vars import EvalFilePath
 
 
@@ -11,12 +11,14 @@ def warp(
     cut_file: EvalFilePath,
     resampling_method: ResamplingMethod = "bilinear",
     warp_args: StepArgs = (),
-) -> list[CommandStep]:
+) -> list[PythonStep]:
 
     return [
-        CommandStep(
+        PythonStep(
+            utility="gdalwarp",
+            input_file=input_file,
+            output_file=output_file,
             args=[
-                "gdalwarp",
                 "-cutline",
                 cut_file,
                 "-crop_to_cutline",
@@ -27,8 +29,6 @@ def warp(
                 *warp_args,
                 "-co",
                 "COMPRESS=DEFLATE",
-                input_file,
-                output_file,
             ],
         )
     ]
@@ -1,6 +1,6 @@
 from qgreenland._typing import ResamplingMethod, StepArgs
 from qgreenland.config.project import project
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import PythonStep
 
 
 def warp_and_cut(
@@ -13,31 +13,31 @@ def warp_and_cut(
     resampling_method: ResamplingMethod = "bilinear",
     reproject_args: StepArgs = (),
     cut_args: StepArgs = (),
-) -> list[CommandStep]:
-    reproject = CommandStep(
+) -> list[PythonStep]:
+    reproject = PythonStep(
+        utility="gdalwarp",
+        input_file=input_file,
+        output_file="{output_dir}/warped.tif",
         args=[
-            "gdalwarp",
             "-t_srs",
             project.crs,
             "-r",
             resampling_method,
             *reproject_args,
-            input_file,
-            "{output_dir}/warped.tif",
         ],
     )
 
-    cut = CommandStep(
+    cut = PythonStep(
+        utility="gdalwarp",
+        input_file="{input_dir}/warped.tif",
+        output_file=output_file,
         args=[
-            "gdalwarp",
             "-cutline",
             cut_file,
             "-crop_to_cutline",
             "-co",
             "COMPRESS=DEFLATE",
             *cut_args,
-            "{input_dir}/warped.tif",
-            output_file,
         ],
     )
 
@@ -6,7 +6,7 @@ from qgreenland.config.helpers.steps.compress_and_add_overviews import (
 )
 from qgreenland.config.helpers.steps.gdal_edit import gdal_edit
 from qgreenland.models.config.layer import Layer, LayerInput
-from qgreenland.models.config.step import CommandStep
+from qgreenland.models.config.step import CommandStep, ExtractSlicesStep, RasterSlice
 
 basal_thermal_state = Layer(
     id="basal_thermal_state",
@@ -19,13 +19,17 @@ basal_thermal_state = Layer(
         asset=dataset.assets["only"],
     ),
     steps=[
-        CommandStep(
-            args=[
-                "gdalmdimtranslate",
-                "-array",
-                "name=likely_basal_thermal_state,transpose=[1,0],view=[::-1,:]",
-                "{input_dir}/RDBTS4_Greenland_1993_2013_01_basal_thermal_state.nc",
-                "{output_dir}/basal_thermal_state.tif",
+        ExtractSlicesStep(
+            input_file=(
+                "{input_dir}/RDBTS4_Greenland_1993_2013_01_basal_thermal_state.nc"
+            ),
+            slices=[
+                RasterSlice(
+                    array=(
+                        "name=likely_basal_thermal_state,transpose=[1,0],view=[::-1,:]"
+                    ),
+                    output_file="{output_dir}/basal_thermal_state.tif",
+                ),
             ],
         ),
         # Convert the dataset to `Int16` data type to save a little extra space
@@ -2,8 +2,10 @@ from qgreenland.config.datasets import bedmachine
 from qgreenland.config.helpers.steps.compress_and_add_overviews import (
     compress_and_add_overviews,
 )
+from qgreenland.config.helpers.steps.fuse import fuse
 from qgreenland.config.helpers.steps.warp_and_cut import warp_and_cut
 from qgreenland.models.config.layer import Layer, LayerInput
+from qgreenland.models.config.step import ExtractSlicesStep, RasterSlice
 
 bedmachine_fn = "BedMachineGreenland-2021-04-20.nc"
 
@@ -36,6 +38,18 @@ bed_datasets = {
     },
 }
 
+# Shared by all BedMachine layers so the NetCDF file is only read once.
+_extract_variables = ExtractSlicesStep(
+    input_file="{input_dir}/" + bedmachine_fn,
+    slices=[
+        RasterSlice(
+            array=f"name={key}",
+            output_file="{output_dir}/" + f"{key}.tif",
+        )
+        for key in bed_datasets.keys()
+    ],
+)
+
 layers = [
     Layer(
         id=f"bedmachine_{key}",
@@ -48,15 +62,20 @@ layers = [
             asset=bedmachine.bedmachine.assets["only"],
         ),
         steps=[
-            *warp_and_cut(
-                input_file="NETCDF:{input_dir}/" + f"{bedmachine_fn}:{key}",
-                output_file="{output_dir}/warped_and_cut.tif",
-                cut_file="{assets_dir}/greenland_rectangle.geojson",
-            ),
-            *compress_and_add_overviews(
-                input_file="{input_dir}/warped_and_cut.tif",
-                output_file="{output_dir}/overviews.tif",
-                dtype_is_float=False if key == "errbed" else True,
+            _extract_variables,
+            *fuse(
+                [
+                    *warp_and_cut(
+                        input_file="{input_dir}/" + f"{key}.tif",
+                        output_file="{output_dir}/warped_and_cut.tif",
+                        cut_file="{assets_dir}/greenland_rectangle.geojson",
+                    ),
+                    *compress_and_add_overviews(
+                        input_file="{input_dir}/warped_and_cut.tif",
+                        output_file="{output_dir}/overviews.tif",
+                        dtype_is_float=False if key == "errbed" else True,
+                    ),
+                ]
             ),
         ],
     )
@@ -2,6 +2,7 @@ from qgreenland.config.datasets.arctic_dem import arctic_dem as dataset
 from qgreenland.config.helpers.steps.compress_and_add_overviews import (
     compress_and_add_overviews,
 )
+from qgreenland.config.helpers.steps.fuse import fuse
 from qgreenland.config.helpers.steps.gdal_edit import gdal_edit
 from qgreenland.config.helpers.steps.warp import warp
 from qgreenland.config.project import project
@@ -48,10 +49,12 @@ arctic_dem = Layer(
                 "0.01",
             ],
         ),
-        *compress_and_add_overviews(
-            input_file="{input_dir}/arctic_dem.tif",
-            output_file="{output_dir}/arctic_dem.tif",
-            dtype_is_float=False,
+        *fuse(
+            compress_and_add_overviews(
+                input_file="{input_dir}/arctic_dem.tif",
+                output_file="{output_dir}/arctic_dem.tif",
+                dtype_is_float=False,
+            ),
         ),
     ],
 )
@@ -13,10 +13,31 @@ PRIVATE_ARCHIVE_DIR = Path("/private-archive")
 
 WORKING_STORAGE_DIR = Path("/working-storage")
 FETCH_DATASETS_DIR = WORKING_STORAGE_DIR / "fetch-datasets"
+# Fetched files by SHA-256; files in asset directories are hard links to these.
+# Inside `FETCH_DATASETS_DIR` so they're on the same filesystem.
+FETCH_BLOBS_DIR = FETCH_DATASETS_DIR / ".blobs"
+# Assets which changed upstream, kept by `fetch --revalidate` until they've been
+# fetched again. Also inside `FETCH_DATASETS_DIR`, so they're moved, not copied.
+FETCH_PREVIOUS_DIR = FETCH_DATASETS_DIR / ".previous"
+# Incomplete downloads, kept so they can be resumed.
+FETCH_PARTIAL_DIR = WORKING_STORAGE_DIR / "fetch-partial"
+# Which hosts are paused after repeated failures, and per-host fetch statistics.
+FETCH_HOSTS_DIR = WORKING_STORAGE_DIR / "fetch-hosts"
+# Resolved CMR granules; see `qgreenland.util.cmr`.
+CMR_CACHE_FP = WORKING_STORAGE_DIR / "cmr-granules.json"
+# The latest plan made by `qgreenland fetch --plan`.
+FETCH_PLAN_FP = WORKING_STORAGE_DIR / "fetch-plan.json"
+# Blocks of streamed assets' files; see `qgreenland.util.range_cache`.
+RANGE_CACHE_DIR = WORKING_STORAGE_DIR / "range-cache"
+# Compiled configurations; see `qgreenland.util.config.compile`.
+CONFIG_CACHE_DIR = WORKING_STORAGE_DIR / "config-cache"
 
 WIP_LAYERS_DIR = WORKING_STORAGE_DIR / "wip-layers"
 WIP_PACKAGE_DIR = WORKING_STORAGE_DIR / "wip-package"
 
+# Resource usage of every completed task, one JSON object per line.
+RUN_LEDGER_FP = WORKING_STORAGE_DIR / "run-ledger.jsonl"
+
 RELEASE_LAYERS_DIR = WORKING_STORAGE_DIR / "release-layers"
 RELEASE_PACKAGES_DIR = WORKING_STORAGE_DIR / "release-packages"
 
@@ -24,6 +45,7 @@ COMPILE_PACKAGE_DIR = WIP_PACKAGE_DIR / PROJECT
 
 ANCILLARY_DIR = PACKAGE_DIR / "ancillary"
 TEMPLATES_DIR = ANCILLARY_DIR / "templates"
+STYLES_DIR = ANCILLARY_DIR / "styles"
 ASSETS_DIR = PACKAGE_DIR / "assets"
 SCRIPTS_DIR = PROJECT_DIR / "scripts"
 
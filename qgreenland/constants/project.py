@@ -8,3 +8,28 @@ ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
 REQUEST_TIMEOUT = 30
 
 URS_COOKIE = "urs_user_already_logged"
+
+# Resolved CMR granules are reused for this long before CMR is asked again.
+CMR_CACHE_TTL_HOURS = float(os.environ.get("QGR_CMR_CACHE_TTL_HOURS", 24 * 7))
+
+# Reuse the compiled configuration while the config tree and code are unchanged.
+CONFIG_CACHE = os.environ.get("QGR_CONFIG_CACHE", "true").lower() == "true"
+
+# In bytes. Downloads are read and written in chunks of this size.
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("QGR_DOWNLOAD_CHUNK_SIZE", 4 * 2**20))
+
+# Large files are downloaded as this many concurrent byte ranges, if the server
+# supports it.
+DOWNLOAD_SEGMENTS = int(os.environ.get("QGR_DOWNLOAD_SEGMENTS", 4))
+
+# At most this many assets are fetched from the same host at once, however many
+# workers there are.
+FETCH_HOST_CONCURRENCY = int(os.environ.get("QGR_FETCH_HOST_CONCURRENCY", 2))
+
+# The local port streamed assets are read through. Fetched streamed assets
+# refer to it, so they must be fetched again if it changes.
+RANGE_CACHE_PORT = int(os.environ.get("QGR_RANGE_CACHE_PORT", 8089))
+
+# Start commands which require a shell from a small long-lived process per
+# worker instead of forking the worker for each command.
+PERSISTENT_SHELL = os.environ.get("QGR_PERSISTENT_SHELL", "false").lower() == "true"
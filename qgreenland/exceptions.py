@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class QgrInterpolationError(Exception):
     """Something went wrong interpolating runtime variables."""
 
@@ -34,6 +37,19 @@ class QgrRuntimeError(Exception):
     pass
 
 
+class QgrTransientError(QgrRuntimeError):
+    """Something went wrong which may succeed if tried again, e.g. a 503."""
+
+    retry_after: Optional[float] = None
+    """Seconds the server asked us to wait before trying again, if any."""
+
+
+class QgrUpstreamChangedError(QgrRuntimeError):
+    """A remote file changed while we were fetching it."""
+
+    pass
+
+
 class QgrSubprocessError(Exception):
     """Something went wrong running a `subprocess` command."""
 
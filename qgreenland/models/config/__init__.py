@@ -1,4 +1,5 @@
-from typing import Any
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Callable, Iterable, TypeVar
 
 import anytree
 
@@ -7,6 +8,9 @@ from qgreenland.models.config.dataset import Dataset
 from qgreenland.models.config.layer import Layer
 from qgreenland.models.config.project import Project
 
+if TYPE_CHECKING:
+    from qgreenland.util.tree import LayerNode
+
 
 class Config(QgrBaseModel):
     """The configuration determines the pipeline outputs.
@@ -30,7 +34,68 @@ class Config(QgrBaseModel):
     Structured as they would be in the QGIS Layers Panel.
     """
 
+    # Indexes of the layer tree, computed once. Looking layers up in the tree
+    # means visiting every leaf, and tasks look their layers up many times.
+
+    @cached_property
+    def layer_nodes(self) -> dict[str, "LayerNode"]:
+        """A lookup of the layer tree's nodes by layer id, in tree order."""
+        return {node.layer_cfg.id: node for node in self.layer_tree.leaves}
+
+    @cached_property
+    def layer_group_paths(self) -> dict[str, tuple[str, ...]]:
+        """A lookup of the names of the groups each layer is in, by layer id."""
+        return {
+            layer_id: node.group_name_path
+            for layer_id, node in self.layer_nodes.items()
+        }
+
+    @cached_property
+    def layers_by_dataset(self) -> dict[str, list[Layer]]:
+        """A lookup of the layers using each dataset, by dataset id."""
+        return _group_layers(
+            self.layer_nodes.values(),
+            lambda layer: [layer.input.dataset.id],
+        )
+
+    @cached_property
+    def layers_by_asset(self) -> dict[tuple[str, str], list[Layer]]:
+        """A lookup of the layers using each asset, by dataset and asset id."""
+        return _group_layers(
+            self.layer_nodes.values(),
+            lambda layer: [(layer.input.dataset.id, layer.input.asset.id)],
+        )
+
+    @cached_property
+    def layers_by_style(self) -> dict[str, list[Layer]]:
+        """A lookup of the layers using each style, by style name."""
+        return _group_layers(
+            self.layer_nodes.values(),
+            lambda layer: [layer.style] if layer.style else [],
+        )
+
+    @cached_property
+    def layers_by_tag(self) -> dict[str, list[Layer]]:
+        """A lookup of the layers with each tag."""
+        return _group_layers(self.layer_nodes.values(), lambda layer: layer.tags)
+
     def __json__(self) -> dict[Any, Any]:
         return self.dict(
             include={"project", "datasets", "layer_tree"},
         )
+
+
+K = TypeVar("K")
+
+
+def _group_layers(
+    layer_nodes: Iterable["LayerNode"],
+    keys: Callable[[Layer], list[K]],
+) -> dict[K, list[Layer]]:
+    """Group the layers of `layer_nodes` by each of their `keys`."""
+    grouped: dict[K, list[Layer]] = {}
+    for node in layer_nodes:
+        for key in keys(node.layer_cfg):
+            grouped.setdefault(key, []).append(node.layer_cfg)
+
+    return grouped
@@ -8,6 +8,7 @@ import qgreenland.exceptions as exc
 from qgreenland._typing import QgsLayerProviderType
 from qgreenland.constants.paths import ASSETS_DIR
 from qgreenland.models.base_model import QgrBaseModel
+from qgreenland.util.model_validators import reusable_validator, validate_sha256_digests
 from qgreenland.util.runtime_vars import EvalFilePath, EvalStr
 
 
@@ -39,9 +40,44 @@ class HttpAsset(DatasetAsset):
     urls: list[AnyUrl]
     """List of URLs to fetch."""
 
+    sha256: dict[str, str] = {}
+    """Expected SHA-256 hex digests of fetched files, by filename.
+
+    Files are verified as they're downloaded, and files already in the fetch
+    blob store are not downloaded again.
+    """
+
+    stream: bool = False
+    """Leave the data remote, reading only the byte ranges steps need?
+
+    Each URL is "fetched" as a GDAL VRT reading it through a local cache of
+    byte ranges (see `qgreenland.util.range_cache`), so this is only suitable
+    for rasters GDAL can read in windows, e.g. GeoTIFFs, of which only a small
+    part is used.
+    """
+
+    _sha256_validator = reusable_validator("sha256", validate_sha256_digests)
+
+    @validator("stream")
+    @classmethod
+    def ensure_streamed_over_http(cls, value, values):
+        """Ensure streamed assets are fetched over HTTP(S), which has byte ranges."""
+        if value and any(
+            not str(url).startswith(("http://", "https://"))
+            for url in values.get("urls", [])
+        ):
+            raise exc.QgrInvalidConfigError(
+                f"Only HTTP(S) assets can be streamed. Received: {values['urls']}",
+            )
+
+        return value
+
     @cached_property
     def provenance(self) -> str:
-        return f"# Data fetched via HTTP from {[str(u) for u in self.urls]}"
+        urls = [str(u) for u in self.urls]
+        if self.stream:
+            return f"# Data streamed (only the byte ranges read) via HTTP from {urls}"
+        return f"# Data fetched via HTTP from {urls}"
 
 
 # TODO: OnlineRaster/OnlineVector asset types? The thing that makes this a
@@ -76,6 +112,11 @@ class CmrAsset(DatasetAsset):
     collection_concept_id: str = Field(..., min_length=1)
     """The CMR unique collection concept identifier."""
 
+    sha256: dict[str, str] = {}
+    """Expected SHA-256 hex digests of fetched files, by filename."""
+
+    _sha256_validator = reusable_validator("sha256", validate_sha256_digests)
+
     @cached_property
     def provenance(self) -> str:
         return (
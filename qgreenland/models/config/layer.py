@@ -4,7 +4,7 @@ from typing import Any, Optional, Union
 from pydantic import Field, validator
 
 import qgreenland.exceptions as exc
-from qgreenland.constants.paths import ANCILLARY_DIR
+from qgreenland.constants.paths import STYLES_DIR
 from qgreenland.models.base_model import QgrBaseModel
 from qgreenland.models.config.dataset import AnyAsset, Dataset
 from qgreenland.models.config.step import AnyStep
@@ -23,7 +23,7 @@ class LayerInput(QgrBaseModel):
 
 
 def _style_filepath(style_name: str) -> Path:
-    return ANCILLARY_DIR / "styles" / (style_name + ".qml")
+    return STYLES_DIR / (style_name + ".qml")
 
 
 class Layer(QgrBaseModel):
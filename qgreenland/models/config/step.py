@@ -2,11 +2,19 @@ from abc import ABC, abstractmethod
 from functools import cached_property
 from typing import Literal, Optional, Union
 
-from pydantic import root_validator
+from pydantic import Field, root_validator
 
 from qgreenland.models.base_model import QgrBaseModel
 from qgreenland.util.runtime_vars import EvalStr
 
+ResourceClass = Literal["light", "cpu", "memory"]
+"""How demanding a step is, used to limit how many such steps run at once.
+
+* `light`: Not limited.
+* `cpu`: Uses one or more cores fully, e.g. compression or building overviews.
+* `memory`: Uses a lot of memory (and CPU), e.g. warping large rasters.
+"""
+
 
 class LayerStep(ABC):
     id: Optional[str]
@@ -35,6 +43,9 @@ class CommandStep(QgrBaseModel, LayerStep):
     args: list[EvalStr]
     """The command arguments, e.g. ['cat', '{input_dir}/foo.txt']."""  # noqa:FS003
 
+    resource_class: Optional[ResourceClass] = None
+    """Inferred from the programs in `args` if not specified."""
+
     # We use a root validator here because with a regular validator, we would
     # not have access to the `args` field, because field order matters to
     # regular validators. We didn't want to order our fields based on validator
@@ -61,4 +72,221 @@ class CommandStep(QgrBaseModel, LayerStep):
         return " ".join([str(arg) for arg in self.args])
 
 
-AnyStep = Union[CommandStep]
+class RasterSlice(QgrBaseModel):
+    """A 2D slice of a raster dataset, written to its own GeoTIFF.
+
+    Exactly one of `array` or `band` must be specified.
+    """
+
+    output_file: EvalStr
+    """The GeoTIFF to write, e.g. `'{output_dir}/sec_1992_1996.tif'`."""  # noqa:FS003
+
+    array: Optional[str]
+    """A multidimensional array specification, as accepted by `gdalmdimtranslate`.
+
+    e.g. `'name=SEC,view=[:,:,0]'`.
+    """
+
+    band: Optional[int] = Field(None, ge=1)
+    """A band number of a classic raster dataset, as accepted by `gdal_translate`."""
+
+    @root_validator
+    @classmethod
+    def array_xor_band(cls, values):
+        """Ensure the slice is specified either as an array or a band."""
+        if (values.get("array") is None) == (values.get("band") is None):
+            raise ValueError("Exactly one of `array` or `band` must be specified.")
+
+        return values
+
+
+class ExtractSlicesStep(QgrBaseModel, LayerStep):
+    """A step which extracts many slices from one raster dataset in one pass.
+
+    The input dataset is opened (and its metadata parsed) only once, instead of
+    once per slice. Layers which each need one slice of the same dataset should
+    all use the same `ExtractSlicesStep` so that it is shared between them.
+    """
+
+    id: Optional[str] = "extract_slices"
+
+    type: Literal["extract_slices"] = "extract_slices"
+
+    input_file: EvalStr
+    """The dataset to extract slices from, e.g. `'{input_dir}/foo.nc'`."""  # noqa:FS003
+
+    slices: list[RasterSlice] = Field(..., min_items=1)
+    """The slices to extract."""
+
+    creation_options: list[str] = []
+    """GeoTIFF creation options, e.g. `['COMPRESS=DEFLATE']`."""
+
+    @cached_property
+    def provenance(self) -> str:
+        creation_options = [
+            arg for option in self.creation_options for arg in ("-co", option)
+        ]
+        commands = []
+        for raster_slice in self.slices:
+            if raster_slice.array is not None:
+                command = [
+                    "gdalmdimtranslate",
+                    *creation_options,
+                    "-array",
+                    raster_slice.array,
+                ]
+            else:
+                command = [
+                    "gdal_translate",
+                    *creation_options,
+                    "-b",
+                    str(raster_slice.band),
+                ]
+
+            command.extend([str(self.input_file), str(raster_slice.output_file)])
+            commands.append(" ".join(command))
+
+        return "\n".join(commands)
+
+
+GdalUtility = Literal[
+    "gdal_translate",
+    "gdalwarp",
+    "ogr2ogr",
+    "gdalbuildvrt",
+    "gdalmdimtranslate",
+    "gdaladdo",
+]
+
+
+class PythonStep(QgrBaseModel, LayerStep):
+    """A step run in-process with the GDAL Python API.
+
+    Equivalent to running the GDAL command-line `utility` with `args`, but
+    without starting a shell or activating a conda environment.
+    """
+
+    id: Optional[str]
+
+    type: Literal["python"] = "python"
+
+    utility: GdalUtility
+    """The GDAL command-line utility this step is equivalent to."""
+
+    input_file: EvalStr
+    """The input dataset, e.g. `'{input_dir}/*.shp'`. May be a glob."""  # noqa:FS003
+
+    output_file: EvalStr
+    """The output dataset, e.g. `'{output_dir}/final.gpkg'`."""  # noqa:FS003
+
+    args: list[EvalStr] = []
+    """Options as they would be passed to `utility` on the command line.
+
+    Arguments are split and unquoted like a shell would, so
+    `['-sql', '"SELECT * FROM foo"']` is valid. `--config KEY VALUE` options
+    are also accepted. For `gdaladdo`, only `-r` and overview levels are
+    supported, e.g. `['-r', 'average', '2', '4']`.
+    """
+
+    config_options: dict[str, str] = {}
+    """GDAL configuration options to set while this step runs."""
+
+    resource_class: Optional[ResourceClass] = None
+    """Inferred from `utility` if not specified."""
+
+    @root_validator
+    @classmethod
+    def set_default_id(cls, values):
+        """Use the utility name as the identifier if one is not provided."""
+        if values.get("id") is None and "utility" in values:
+            values["id"] = values["utility"]
+
+        return values
+
+    def with_implied_args(self, args: list[str]) -> list[str]:
+        """Add the arguments `utility` is always run with to `args`.
+
+        `gdalwarp` is run with `-multi`, to overlap reading and warping; warping
+        itself uses `GDAL_NUM_THREADS`.
+        """
+        if self.utility == "gdalwarp" and "-multi" not in args:
+            return [*args, "-multi"]
+
+        return args
+
+    @cached_property
+    def provenance(self) -> str:
+        config_options = [
+            f"{key}={value}" for key, value in self.config_options.items()
+        ]
+        args = self.with_implied_args([str(arg) for arg in self.args])
+        input_file = str(self.input_file)
+        output_file = str(self.output_file)
+
+        if self.utility == "gdaladdo":
+            options = [arg for arg in args if not arg.isdigit()]
+            levels = [arg for arg in args if arg.isdigit()]
+            command = ["gdaladdo", *options, output_file, *levels]
+            if input_file != output_file:
+                command = ["cp", input_file, output_file, "&&", *command]
+        elif self.utility in ("ogr2ogr", "gdalbuildvrt"):
+            # These utilities take the output before the input.
+            command = [self.utility, *args, output_file, input_file]
+        else:
+            command = [self.utility, *args, input_file, output_file]
+
+        return " ".join(config_options + command)
+
+
+# Utilities which can write a VRT instead of a materialized raster.
+VRT_UTILITIES = ("gdal_translate", "gdalwarp", "gdalbuildvrt")
+
+
+class FusedStep(QgrBaseModel, LayerStep):
+    """Consecutive raster steps run as one, materializing only the final output.
+
+    Each sub-step is evaluated as if it were a separate step: its
+    `{input_dir}` is the previous sub-step's `{output_dir}`. However, every
+    sub-step except the last writes a VRT instead of a full raster (regardless
+    of the output file's name). If the last sub-step is `gdaladdo`, the sub-step
+    before it writes a real raster, which is moved instead of copied before
+    adding overviews.
+    """
+
+    id: Optional[str] = "fused"
+
+    type: Literal["fused"] = "fused"
+
+    steps: list[PythonStep] = Field(..., min_items=2)
+    """The steps to fuse, in order."""
+
+    @root_validator
+    @classmethod
+    def validate_steps_fusable(cls, values):
+        """Ensure every intermediate step can write a VRT."""
+        steps = values.get("steps")
+        if not steps:
+            return values
+
+        intermediate_steps = steps[:-1]
+        if steps[-1].utility == "gdaladdo":
+            # The step before `gdaladdo` materializes a raster.
+            intermediate_steps = steps[:-2]
+            if steps[-2].utility == "gdaladdo":
+                raise ValueError("`gdaladdo` may only be the last fused step.")
+
+        for step in intermediate_steps:
+            if step.utility not in VRT_UTILITIES:
+                raise ValueError(
+                    f"Only the last fused step may use {step.utility};"
+                    f" intermediate steps must use one of {VRT_UTILITIES}.",
+                )
+
+        return values
+
+    @cached_property
+    def provenance(self) -> str:
+        return "\n".join(step.provenance for step in self.steps)
+
+
+AnyStep = Union[CommandStep, ExtractSlicesStep, PythonStep, FusedStep]
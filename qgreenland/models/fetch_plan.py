@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+
+from qgreenland.models.base_model import QgrBaseModel
+
+
+class PlannedFetch(QgrBaseModel):
+    """An asset which hasn't been fetched yet, and its estimated size."""
+
+    dataset_id: str
+    asset_id: str
+
+    urls: list[str]
+    """The URLs of the asset's files, if they're known in advance."""
+
+    bytes: Optional[int]
+    """The total size of the asset's files, if every file's size is known."""
+
+    @property
+    def subject(self) -> str:
+        """Identify the asset like the run ledger does."""
+        return f"{self.dataset_id}.{self.asset_id}"
+
+
+class FetchPlan(QgrBaseModel):
+    """The assets a fetch would download, largest first."""
+
+    created_at: datetime
+
+    fetches: list[PlannedFetch]
+    """Largest first. Assets of unknown size are last."""
+
+    total_bytes: int
+    """The total size of assets whose size is known."""
+
+    free_bytes: int
+    """Free space in working storage when the plan was made."""
+
+    @property
+    def unknown_count(self) -> int:
+        return sum(1 for fetch in self.fetches if fetch.bytes is None)
+
+    @property
+    def fits(self) -> bool:
+        """Whether the assets of known size fit in working storage."""
+        return self.total_bytes <= self.free_bytes
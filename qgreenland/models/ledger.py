@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Optional
+
+from qgreenland.models.base_model import QgrBaseModel
+
+
+class LedgerEntry(QgrBaseModel):
+    """Resource usage of one successfully completed pipeline task."""
+
+    run_id: str
+    """Identifies the `qgreenland run` invocation the task was run by."""
+
+    finished_at: datetime
+
+    task: str
+    """The task family, e.g. `ChainableTask`."""
+
+    subject: str
+    """The layer id, or `{dataset_id}.{asset_id}` for fetch tasks."""
+
+    step: str
+    """The step identifier within a layer, e.g. `01-python-gdalwarp`, or the
+    task's role, e.g. `fetch` or `finalize`."""
+
+    fingerprint: Optional[str]
+    """The configuration fingerprint of the task's output, if any.
+
+    Runs with differing fingerprints processed differently-configured steps.
+    """
+
+    wall_seconds: float
+    user_cpu_seconds: float
+    system_cpu_seconds: float
+
+    peak_rss_bytes: int
+    """The peak resident memory of the task or of any command it ran.
+
+    Where the peak of the task's process can't be reset when the task starts
+    (i.e. not on Linux), this is the peak of the whole process instead.
+    """
+
+    read_bytes: Optional[int]
+    """Bytes read from storage, if the platform reports it."""
+
+    written_bytes: Optional[int]
+    """Bytes written to storage, if the platform reports it."""
+
+    output_bytes: int
+    """The total size of the task's output."""
+
+    @property
+    def key(self) -> tuple[str, str]:
+        """Identify the same task across runs."""
+        return (self.subject, self.step)
@@ -0,0 +1,81 @@
+from typing import Mapping, Optional
+
+from qgreenland.models.base_model import QgrBaseModel
+
+
+class ResponseValidators(QgrBaseModel):
+    """HTTP response headers which identify the version of a fetched file."""
+
+    filename: str
+    """The name the file was written as."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_length: Optional[int]
+
+    @classmethod
+    def from_headers(
+        cls,
+        headers: Mapping[str, str],
+        *,
+        filename: str,
+    ) -> "ResponseValidators":
+        """Read validators from case-insensitive response `headers`."""
+        content_length = headers.get("content-length", "")
+        return cls(
+            filename=filename,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            # The length of encoded content isn't the length of the file.
+            content_length=(
+                int(content_length)
+                if content_length.isdigit() and "content-encoding" not in headers
+                else None
+            ),
+        )
+
+    @property
+    def conditional_headers(self) -> dict[str, str]:
+        """Request headers which ask for the file only if it has changed."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    @property
+    def if_range(self) -> Optional[str]:
+        """An `If-Range` request header value identifying this version, if any.
+
+        Weak ETags can't be used in `If-Range`.
+        """
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def changed(self, current: "ResponseValidators") -> Optional[bool]:
+        """Compare with the validators of the `current` upstream file.
+
+        `None` if there's nothing to compare.
+        """
+        comparisons = [
+            previous != now
+            for previous, now in (
+                (self.etag, current.etag),
+                (self.last_modified, current.last_modified),
+                (self.content_length, current.content_length),
+            )
+            if previous is not None and now is not None
+        ]
+        if not comparisons:
+            return None
+
+        return any(comparisons)
+
+
+class AssetValidators(QgrBaseModel):
+    """The validators of each file of a fetched asset."""
+
+    files: dict[str, ResponseValidators] = {}
+    """By URL."""
@@ -1,15 +1,28 @@
 """A runner is a function which executes a certain type of step."""
 
+from pathlib import Path
 from typing import Any, Type
 
-from qgreenland.models.config.step import AnyStep, CommandStep
+from qgreenland.models.config.step import (
+    AnyStep,
+    CommandStep,
+    ExtractSlicesStep,
+    FusedStep,
+    PythonStep,
+)
 from qgreenland.runners.command import command_runner
+from qgreenland.runners.extract_slices import extract_slices_runner
+from qgreenland.runners.fused import fused_runner
+from qgreenland.runners.python import gdal_config_options, python_runner
+from qgreenland.util.gdal_settings import gdal_settings, write_gdal_settings
 
 # Each runner corresponds to a type of "step" available in the layer
 # configuration file.
 RUNNERS: dict[Type[AnyStep], Any] = {
     CommandStep: command_runner,
-    # 'python': 'TODO',
+    ExtractSlicesStep: extract_slices_runner,
+    PythonStep: python_runner,
+    FusedStep: fused_runner,
 }
 
 
@@ -19,9 +32,19 @@ def step_runner(
     input_dir: str,
     output_dir: str,
 ):
-    """Execute a runner based on the step configuration."""
-    RUNNERS[type(step)](
-        step,
-        input_dir=input_dir,
-        output_dir=output_dir,
-    )
+    """Execute a runner based on the step configuration.
+
+    GDAL is tuned for the number of concurrent workers (see
+    `qgreenland.util.gdal_settings`) and the settings are recorded in
+    `output_dir`.
+    """
+    settings = gdal_settings()
+    write_gdal_settings(settings, output_dir=Path(output_dir))
+
+    # Steps run in-process use these options unless they set their own.
+    with gdal_config_options(settings):
+        RUNNERS[type(step)](
+            step,
+            input_dir=input_dir,
+            output_dir=output_dir,
+        )
@@ -1,5 +1,6 @@
 from qgreenland.models.config.step import CommandStep
 from qgreenland.util.command import interpolate_args, run_qgr_command
+from qgreenland.util.gdal_settings import gdal_settings
 
 
 def command_runner(
@@ -22,4 +23,7 @@ def command_runner(
     # TODO: What's an "ogr" command? Any command will work, this just runs the
     # command in our special "qgreenland-cmd" conda environment. Rename the
     # function to "run_conda_command"? ¯\_(ツ)_/¯
-    run_qgr_command(command_args)
+    # GDAL reads configuration options from the environment, but `--config`
+    # options or environment variable assignments in the command take
+    # precedence.
+    run_qgr_command(command_args, env=gdal_settings())
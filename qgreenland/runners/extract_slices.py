@@ -0,0 +1,65 @@
+import logging
+
+from osgeo import gdal
+
+import qgreenland.exceptions as exc
+from qgreenland.models.config.step import ExtractSlicesStep
+
+logger = logging.getLogger("luigi-interface")
+
+gdal.UseExceptions()
+
+
+def extract_slices_runner(
+    step: ExtractSlicesStep,
+    *,
+    input_dir: str,
+    output_dir: str,
+) -> None:
+    """Extract all slices in `step` while opening the input dataset only once."""
+    input_file = step.input_file.eval(input_dir=input_dir, output_dir=output_dir)
+
+    array_slices = [s for s in step.slices if s.array is not None]
+    band_slices = [s for s in step.slices if s.band is not None]
+
+    if array_slices:
+        multidim_dataset = gdal.OpenEx(input_file, gdal.OF_MULTIDIM_RASTER)
+        for raster_slice in array_slices:
+            output_file = raster_slice.output_file.eval(
+                input_dir=input_dir,
+                output_dir=output_dir,
+            )
+            logger.info(f"Extracting array {raster_slice.array} to {output_file}")
+            result = gdal.MultiDimTranslate(
+                output_file,
+                multidim_dataset,
+                format="GTiff",
+                arraySpecs=[raster_slice.array],
+                creationOptions=step.creation_options,
+            )
+            _check_written(result, output_file=output_file)
+            # Dereference the output dataset to close it, flushing it to disk.
+            result = None
+
+    if band_slices:
+        dataset = gdal.Open(input_file)
+        for raster_slice in band_slices:
+            output_file = raster_slice.output_file.eval(
+                input_dir=input_dir,
+                output_dir=output_dir,
+            )
+            logger.info(f"Extracting band {raster_slice.band} to {output_file}")
+            result = gdal.Translate(
+                output_file,
+                dataset,
+                format="GTiff",
+                bandList=[raster_slice.band],
+                creationOptions=step.creation_options,
+            )
+            _check_written(result, output_file=output_file)
+            result = None
+
+
+def _check_written(dataset, *, output_file: str) -> None:
+    if dataset is None:
+        raise exc.QgrRuntimeError(f"GDAL failed to write {output_file}")
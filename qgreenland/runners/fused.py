@@ -0,0 +1,49 @@
+import logging
+import tempfile
+from pathlib import Path
+
+from qgreenland.models.config.step import FusedStep
+from qgreenland.runners.python import run_python_step
+
+logger = logging.getLogger("luigi-interface")
+
+
+def fused_runner(
+    step: FusedStep,
+    *,
+    input_dir: str,
+    output_dir: str,
+) -> None:
+    """Run the fused steps, writing VRTs for all but the final output.
+
+    Intermediate outputs are written to scratch directories inside
+    `output_dir`, so the raster materialized before `gdaladdo` can be moved in
+    to place instead of copied. The scratch directories are removed after.
+    """
+    last_step = step.steps[-1]
+    # The step whose output is a real raster instead of a VRT.
+    materialize_index = len(step.steps) - 1
+    if last_step.utility == "gdaladdo":
+        materialize_index -= 1
+
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".fused-") as scratch:
+        step_input_dir = input_dir
+        for index, sub_step in enumerate(step.steps):
+            if index == len(step.steps) - 1:
+                step_output_dir = output_dir
+            else:
+                step_output_dir = str(Path(scratch) / f"{index:02}")
+                Path(step_output_dir).mkdir()
+
+            logger.info(
+                f"Running fused step {index + 1}/{len(step.steps)}"
+                f" ({'VRT' if index < materialize_index else 'materialized'})",
+            )
+            run_python_step(
+                sub_step,
+                input_dir=step_input_dir,
+                output_dir=step_output_dir,
+                as_vrt=index < materialize_index,
+                move_input=index == len(step.steps) - 1,
+            )
+            step_input_dir = step_output_dir
@@ -1,10 +1,280 @@
-from qgreenland.models.config.step import LayerStep
+import glob
+import logging
+import shlex
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Union
+
+from osgeo import gdal
+
+import qgreenland.exceptions as exc
+from qgreenland.models.config.step import PythonStep
+from qgreenland.util.command import interpolate_args
+from qgreenland.util.vsi import (
+    expand_archive_path,
+    extract_archive_path,
+    split_archive_path,
+)
+
+logger = logging.getLogger("luigi-interface")
+
+gdal.UseExceptions()
+
+# Utilities which accept more than one input dataset.
+MULTIPLE_INPUT_UTILITIES = ("gdalwarp", "gdalbuildvrt")
 
 
 def python_runner(
-    step: LayerStep,
+    step: PythonStep,
     *,
     input_dir: str,
     output_dir: str,
 ) -> None:
-    ...
+    """Run a GDAL utility in-process with the GDAL Python API."""
+    run_python_step(step, input_dir=input_dir, output_dir=output_dir)
+
+
+def run_python_step(
+    step: PythonStep,
+    *,
+    input_dir: str,
+    output_dir: str,
+    as_vrt: bool = False,
+    move_input: bool = False,
+) -> None:
+    """Run `step`, optionally writing a VRT instead of a materialized raster.
+
+    If `move_input`, `gdaladdo` moves its input to the output location instead
+    of copying it.
+    """
+    args = _split_args(
+        interpolate_args(step.args, input_dir=input_dir, output_dir=output_dir),
+    )
+    args, config_options = _pop_config_options(step.with_implied_args(args))
+    if as_vrt:
+        args = _without_creation_options(args)
+        # `gdalbuildvrt` always writes a VRT and doesn't accept `-of`.
+        if step.utility != "gdalbuildvrt":
+            args.extend(["-of", "VRT"])
+    config_options = {**step.config_options, **config_options}
+
+    input_file = step.input_file.eval(input_dir=input_dir, output_dir=output_dir)
+    output_file = step.output_file.eval(input_dir=input_dir, output_dir=output_dir)
+    inputs = _expand_input(input_file, utility=step.utility)
+
+    logger.info(f"Running {step.utility} in-process:")
+    logger.info(step.provenance)
+
+    with gdal_config_options(config_options), _readable_input(
+        inputs,
+        output_dir=output_dir,
+    ) as inputs:
+        try:
+            if step.utility == "gdaladdo":
+                _build_overviews(
+                    inputs,
+                    output_file,
+                    args=args,
+                    move_input=move_input,
+                )
+            else:
+                result = UTILITY_FUNCS[step.utility](output_file, inputs, options=args)
+                if result is None:
+                    raise exc.QgrRuntimeError(
+                        f"{step.utility} failed to write {output_file}",
+                    )
+                # Dereference the output dataset to close it, flushing it to
+                # disk.
+                result = None
+        except RuntimeError as e:
+            raise exc.QgrRuntimeError(f"{step.utility} failed: {e}") from e
+
+
+def _split_args(args: list[str]) -> list[str]:
+    """Split and unquote `args` the same way a shell would.
+
+    `CommandStep` arguments are joined and interpreted by a shell, so we do the
+    same here to accept identical arguments.
+    """
+    return shlex.split(" ".join(args))
+
+
+def _pop_config_options(args: list[str]) -> tuple[list[str], dict[str, str]]:
+    """Remove `--config KEY VALUE` options from `args`.
+
+    The GDAL Python utility functions don't accept them like the command-line
+    utilities do.
+    """
+    remaining_args: list[str] = []
+    config_options: dict[str, str] = {}
+
+    arg_iter = iter(args)
+    for arg in arg_iter:
+        if arg == "--config":
+            try:
+                key = next(arg_iter)
+                config_options[key] = next(arg_iter)
+            except StopIteration:
+                raise exc.QgrInvalidConfigError(
+                    f"`--config` requires a key and a value: {args}",
+                )
+        else:
+            remaining_args.append(arg)
+
+    return remaining_args, config_options
+
+
+def _without_creation_options(args: list[str]) -> list[str]:
+    """Remove `-co` and `-of` options, which are irrelevant to a VRT."""
+    remaining_args: list[str] = []
+
+    arg_iter = iter(args)
+    for arg in arg_iter:
+        if arg in ("-co", "-of"):
+            next(arg_iter, None)
+        else:
+            remaining_args.append(arg)
+
+    return remaining_args
+
+
+def _expand_input(input_file: str, *, utility: str) -> Union[str, list[str]]:
+    """Expand globs in `input_file` the same way a shell would.
+
+    Globs in paths in archives (e.g. `/vsizip/{input_dir}/*.zip/*.shp`) are
+    expanded in both the archive and member parts.
+    """  # noqa: FS003
+    if split_archive_path(input_file) is not None:
+        matches = expand_archive_path(input_file)
+    elif glob.has_magic(input_file):
+        matches = sorted(glob.glob(input_file))
+    else:
+        return input_file
+
+    if not matches:
+        raise exc.QgrRuntimeError(f"No files matched {input_file}")
+
+    if utility in MULTIPLE_INPUT_UTILITIES:
+        return matches
+
+    if len(matches) > 1:
+        raise exc.QgrRuntimeError(
+            f"{utility} accepts only one input, but {input_file} matched: {matches}",
+        )
+
+    return matches[0]
+
+
+@contextmanager
+def _readable_input(
+    input_file: Union[str, list[str]],
+    *,
+    output_dir: str,
+) -> Iterator[Union[str, list[str]]]:
+    """Extract archives GDAL can't read `input_file` from in place.
+
+    Extracted archives are in temporary directories in `output_dir`, deleted
+    after the step runs.
+    """
+    temp_dirs: list[str] = []
+
+    def readable(path: str) -> str:
+        if split_archive_path(path) is None or _opens_in_place(path):
+            return path
+
+        logger.info(f"Can't read {path} in place; extracting it instead")
+        temp_dirs.append(tempfile.mkdtemp(prefix=".extracted-", dir=output_dir))
+        return extract_archive_path(path, output_dir=Path(temp_dirs[-1]))
+
+    try:
+        if isinstance(input_file, str):
+            yield readable(input_file)
+        else:
+            yield [readable(path) for path in input_file]
+    finally:
+        for temp_dir in temp_dirs:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _opens_in_place(path: str) -> bool:
+    try:
+        dataset = gdal.OpenEx(path)
+    except RuntimeError:
+        return False
+
+    opened = dataset is not None
+    # Dereference the dataset to close it.
+    dataset = None
+    return opened
+
+
+@contextmanager
+def gdal_config_options(config_options: dict[str, str]) -> Iterator[None]:
+    """Set GDAL configuration options, restoring their old values after."""
+    old_values = {key: gdal.GetConfigOption(key) for key in config_options}
+    old_cache_max = gdal.GetCacheMax()
+    for key, value in config_options.items():
+        gdal.SetConfigOption(key, value)
+
+    # The block cache size is only read from the configuration option when
+    # the cache is first used.
+    cache_max = config_options.get("GDAL_CACHEMAX", "")
+    if cache_max.isdigit():
+        gdal.SetCacheMax(int(cache_max) * 2**20)
+
+    try:
+        yield
+    finally:
+        for key, old_value in old_values.items():
+            gdal.SetConfigOption(key, old_value)
+        gdal.SetCacheMax(old_cache_max)
+
+
+def _build_overviews(
+    input_file: Union[str, list[str]],
+    output_file: str,
+    *,
+    args: list[str],
+    move_input: bool = False,
+) -> None:
+    """Add overviews to `output_file`, first copying `input_file` to it.
+
+    Equivalent to `cp input_file output_file && gdaladdo args output_file`, or
+    `mv ...` if `move_input`.
+    """
+    resampling = "nearest"
+    levels: list[int] = []
+
+    arg_iter = iter(args)
+    for arg in arg_iter:
+        if arg == "-r":
+            resampling = next(arg_iter, resampling)
+        elif arg.isdigit():
+            levels.append(int(arg))
+        else:
+            raise exc.QgrInvalidConfigError(
+                f"Unsupported gdaladdo argument {arg!r} in: {args}",
+            )
+
+    assert isinstance(input_file, str)
+    if input_file != output_file:
+        if move_input:
+            shutil.move(input_file, output_file)
+        else:
+            shutil.copyfile(input_file, output_file)
+
+    dataset = gdal.Open(output_file, gdal.GA_Update)
+    dataset.BuildOverviews(resampling.upper(), levels)
+    # Dereference the dataset to close it, flushing the overviews to disk.
+    dataset = None
+
+
+UTILITY_FUNCS: dict[str, Callable] = {
+    "gdal_translate": gdal.Translate,
+    "gdalwarp": gdal.Warp,
+    "ogr2ogr": gdal.VectorTranslate,
+    "gdalbuildvrt": gdal.BuildVRT,
+    "gdalmdimtranslate": gdal.MultiDimTranslate,
+}
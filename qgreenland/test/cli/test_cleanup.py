@@ -0,0 +1,29 @@
+import importlib
+import os
+
+from click.testing import CliRunner
+
+from qgreenland.cli.cleanup import cleanup
+
+# Not `import qgreenland.cli.cleanup`; `qgreenland.cli` has a `cleanup` command.
+cleanup_module = importlib.import_module("qgreenland.cli.cleanup")
+
+
+def test_cleanup_deletes_unused_blobs(tmp_path, monkeypatch):
+    datasets_dir = tmp_path / "fetch-datasets"
+    blobs_dir = datasets_dir / ".blobs"
+    monkeypatch.setattr(cleanup_module, "FETCH_DATASETS_DIR", datasets_dir)
+    monkeypatch.setattr(cleanup_module, "FETCH_BLOBS_DIR", blobs_dir)
+
+    for name in ("kept", "deleted"):
+        blob_fp = blobs_dir / name[:2] / name
+        blob_fp.parent.mkdir(parents=True)
+        blob_fp.write_text(name)
+        (datasets_dir / f"dataset.{name}").mkdir()
+        os.link(blob_fp, datasets_dir / f"dataset.{name}" / "data.tif")
+
+    result = CliRunner().invoke(cleanup, ["-f", "dataset.deleted"])
+
+    assert result.exit_code == 0, result.output
+    assert [p.name for p in blobs_dir.glob("*/*")] == ["kept"]
+    assert (datasets_dir / "dataset.kept" / "data.tif").read_text() == "kept"
@@ -0,0 +1,48 @@
+import luigi
+import pytest
+
+import qgreenland.constants.paths as paths
+from qgreenland.cli.fetch import _fetching_again
+
+
+class _FakeFetchTask:
+    def __init__(self, output_dir):
+        self.output_name = output_dir.name
+        self._target = luigi.LocalTarget(output_dir)
+
+    def output(self):
+        return self._target
+
+    def complete(self):
+        return self._target.exists()
+
+
+@pytest.fixture
+def fetched(tmp_path, monkeypatch):
+    monkeypatch.setattr(paths, "FETCH_PREVIOUS_DIR", tmp_path / ".previous")
+    output_dir = tmp_path / "dataset.asset"
+    output_dir.mkdir()
+    (output_dir / "data.tif").write_text("old")
+    return _FakeFetchTask(output_dir), output_dir
+
+
+def test_fetching_again(fetched, tmp_path):
+    task, output_dir = fetched
+
+    with _fetching_again([task]):
+        assert not task.complete()
+        output_dir.mkdir()
+        (output_dir / "data.tif").write_text("new")
+
+    assert (output_dir / "data.tif").read_text() == "new"
+    assert list((tmp_path / ".previous").iterdir()) == []
+
+
+def test_fetching_again_failed(fetched):
+    task, output_dir = fetched
+
+    with pytest.raises(RuntimeError), _fetching_again([task]):
+        raise RuntimeError("Fetch failed")
+
+    # The previous copy is kept until the asset has been fetched again.
+    assert (output_dir / "data.tif").read_text() == "old"
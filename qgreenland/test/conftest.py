@@ -1,5 +1,11 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
 import pytest
+from osgeo import gdal, osr
 
+import qgreenland.util.hosts as hosts
 from qgreenland.models.config.asset import HttpAsset, OnlineAsset
 from qgreenland.models.config.layer import Layer
 from qgreenland.models.config.layer_group import LayerGroupSettings, RootGroupSettings
@@ -68,6 +74,28 @@ mock_raster_layer_cfg = {
 MockRasterLayerConfig = Layer(**mock_raster_layer_cfg)
 
 
+def write_raster(
+    fp: Path,
+    *,
+    origin: tuple[float, float] = (0, 0),
+    size: int = 64,
+) -> bytes:
+    """Write a small single-band GeoTIFF in EPSG:3413, returning its pixels."""
+    pixels = bytes(i % 251 for i in range(size * size))
+
+    driver = gdal.GetDriverByName("GTiff")
+    dataset = driver.Create(str(fp), size, size, 1, gdal.GDT_Byte)
+    dataset.SetGeoTransform([origin[0], 1000, 0, origin[1], 0, -1000])
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(3413)
+    dataset.SetProjection(srs.ExportToWkt())
+    dataset.GetRasterBand(1).WriteRaster(0, 0, size, size, pixels)
+    # Dereference the dataset to close it, flushing it to disk.
+    dataset = None
+
+    return pixels
+
+
 def _layer_node(cfg: Layer) -> LayerGroupNode:
     node = LayerGroupNode(
         "layers",
@@ -123,7 +151,8 @@ def raster_layer_cfg():
 @pytest.fixture
 def full_cfg():
     """Return an example config."""
-    return compile_cfg(TEST_CONFIG_DIR)
+    # Not cached; tests mustn't read or write the working storage.
+    return compile_cfg(TEST_CONFIG_DIR, use_cache=False)
 
 
 @pytest.fixture(scope="session")
@@ -146,3 +175,41 @@ def online_layer_node(online_layer_cfg):
 @pytest.fixture
 def raster_layer_node(raster_layer_cfg):
     return _layer_node(raster_layer_cfg)
+
+
+@pytest.fixture
+def http_server():
+    """Return a function serving a request handler class on a local port.
+
+    The function returns the server's base URL. Servers are shut down after the
+    test.
+    """
+    servers = []
+
+    def _serve(handler: type[BaseHTTPRequestHandler]) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        servers.append(server)
+        thread = threading.Thread(
+            target=server.serve_forever,
+            kwargs={"poll_interval": 0.01},
+            daemon=True,
+        )
+        thread.start()
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield _serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def isolated_hosts(tmp_path, monkeypatch):
+    """Keep per-host fetch statistics out of the real fetch directory.
+
+    Retries don't wait, and no statistics carry over from other tests.
+    """
+    monkeypatch.setattr(hosts, "FETCH_HOSTS_DIR", tmp_path / "hosts")
+    monkeypatch.setattr(hosts, "BACKOFF_BASE_SECONDS", 0)
+    monkeypatch.setattr(hosts, "_stats", {})
+    monkeypatch.setattr(hosts, "_consecutive_failures", {})
@@ -0,0 +1,58 @@
+import time
+
+from qgreenland.models.config import Config
+from qgreenland.models.config.layer_group import LayerGroupSettings, RootGroupSettings
+from qgreenland.util.tree import LayerGroupNode, LayerNode
+
+
+def test_config_indexes(full_cfg):
+    raster_node = full_cfg.layer_nodes["example_raster"]
+
+    assert raster_node.layer_cfg.id == "example_raster"
+    assert full_cfg.layer_group_paths["example_raster"] == ("Group", "Subgroup")
+    assert [layer.id for layer in full_cfg.layers_by_tag["foo"]] == [
+        "example_online",
+        "example_raster",
+    ]
+    assert [layer.id for layer in full_cfg.layers_by_dataset["example_dataset"]] == [
+        "example_raster",
+    ]
+    assert [
+        layer.id for layer in full_cfg.layers_by_asset[("example_dataset", "only")]
+    ] == ["example_raster"]
+    assert full_cfg.layers_by_style == {}
+
+
+def test_config_indexes_scale(full_cfg, raster_layer_cfg):
+    layer_count = 10_000
+    root = LayerGroupNode("layers", settings=RootGroupSettings())
+    layers = {}
+    for group_index in range(layer_count // 100):
+        group = LayerGroupNode(
+            f"Group {group_index}",
+            settings=LayerGroupSettings(),
+            parent=root,
+        )
+        for layer_index in range(100):
+            layer_id = f"layer_{group_index}_{layer_index}"
+            layers[layer_id] = raster_layer_cfg.copy(
+                update={"id": layer_id, "tags": [f"tag_{layer_index}"]},
+            )
+            LayerNode(layer_id, layer_cfg=layers[layer_id], parent=group)
+
+    config = Config(
+        project=full_cfg.project,
+        layers=layers,
+        datasets=full_cfg.datasets,
+        layer_tree=root,
+    )
+
+    start = time.monotonic()
+    for layer_id in layers:
+        assert config.layer_nodes[layer_id].layer_cfg is layers[layer_id]
+        assert config.layer_group_paths[layer_id][0].startswith("Group")
+    assert len(config.layers_by_tag["tag_0"]) == layer_count // 100
+    assert len(config.layers_by_dataset["example_dataset"]) == layer_count
+
+    # Scanning the tree's leaves for each lookup would take minutes.
+    assert time.monotonic() - start < 5
@@ -0,0 +1,68 @@
+import pytest
+from pydantic import ValidationError
+
+from qgreenland.models.config.step import FusedStep, PythonStep
+
+
+def test_python_step_provenance_ogr2ogr():
+    step = PythonStep(
+        utility="ogr2ogr",
+        input_file="{input_dir}/foo.shp",
+        output_file="{output_dir}/foo.gpkg",
+        args=["-t_srs", "EPSG:3413"],
+        config_options={"OGR_ENABLE_PARTIAL_REPROJECTION": "TRUE"},
+    )
+
+    assert step.id == "ogr2ogr"
+    assert step.provenance == (
+        "OGR_ENABLE_PARTIAL_REPROJECTION=TRUE"
+        " ogr2ogr -t_srs EPSG:3413 {output_dir}/foo.gpkg {input_dir}/foo.shp"
+    )
+
+
+def test_python_step_provenance_gdalwarp():
+    step = PythonStep(
+        utility="gdalwarp",
+        input_file="{input_dir}/foo.tif",
+        output_file="{output_dir}/foo.tif",
+        args=["-t_srs", "EPSG:3413"],
+    )
+
+    # As run, with `-multi`.
+    assert step.provenance == (
+        "gdalwarp -t_srs EPSG:3413 -multi {input_dir}/foo.tif {output_dir}/foo.tif"
+    )
+
+
+def test_python_step_provenance_gdaladdo():
+    step = PythonStep(
+        utility="gdaladdo",
+        input_file="{input_dir}/compressed.tif",
+        output_file="{output_dir}/overviews.tif",
+        args=["-r", "average", "2", "4"],
+    )
+
+    assert step.provenance == (
+        "cp {input_dir}/compressed.tif {output_dir}/overviews.tif"
+        " && gdaladdo -r average {output_dir}/overviews.tif 2 4"
+    )
+
+
+def test_fused_step_rejects_unfusable_intermediate_step():
+    ogr2ogr = PythonStep(
+        utility="ogr2ogr",
+        input_file="{input_dir}/foo.shp",
+        output_file="{output_dir}/foo.gpkg",
+    )
+    translate = PythonStep(
+        utility="gdal_translate",
+        input_file="{input_dir}/foo.tif",
+        output_file="{output_dir}/foo.tif",
+    )
+
+    assert FusedStep(steps=[translate, ogr2ogr]).provenance == "\n".join(
+        [translate.provenance, ogr2ogr.provenance],
+    )
+
+    with pytest.raises(ValidationError):
+        FusedStep(steps=[ogr2ogr, translate])
@@ -0,0 +1,31 @@
+from requests.structures import CaseInsensitiveDict
+
+from qgreenland.models.validators import ResponseValidators
+
+
+def test_response_validators():
+    validators = ResponseValidators.from_headers(
+        CaseInsensitiveDict(
+            {
+                "ETag": '"abc"',
+                "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+                "Content-Length": "100",
+            },
+        ),
+        filename="foo.zip",
+    )
+
+    assert validators.conditional_headers == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+    assert validators.changed(validators) is False
+    assert validators.changed(validators.copy(update={"etag": '"def"'})) is True
+
+    unknown = ResponseValidators(
+        filename="foo.zip",
+        etag=None,
+        last_modified=None,
+        content_length=None,
+    )
+    assert validators.changed(unknown) is None
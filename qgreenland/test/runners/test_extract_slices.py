@@ -0,0 +1,46 @@
+import pytest
+from osgeo import gdal
+
+from qgreenland.models.config.step import ExtractSlicesStep, RasterSlice
+from qgreenland.runners.extract_slices import extract_slices_runner
+from qgreenland.test.conftest import write_raster
+
+
+def test_extract_slices_matches_netcdf_subdataset(tmp_path):
+    """Extracting an array keeps the grid of the classic `NETCDF:` subdataset.
+
+    As the BedMachine layers now do, instead of reading `NETCDF:...:{var}`.
+    """
+    write_raster(tmp_path / "source.tif")
+    nc_fp = tmp_path / "bedmachine.nc"
+    # Like BedMachine: a projected grid, with y decreasing.
+    gdal.Translate(
+        str(nc_fp),
+        str(tmp_path / "source.tif"),
+        format="netCDF",
+        creationOptions=["WRITE_BOTTOMUP=NO"],
+    )
+
+    extract_slices_runner(
+        ExtractSlicesStep(
+            input_file="{input_dir}/bedmachine.nc",
+            slices=[
+                RasterSlice(
+                    array="name=Band1",
+                    output_file="{output_dir}/extracted.tif",
+                ),
+            ],
+        ),
+        input_dir=str(tmp_path),
+        output_dir=str(tmp_path),
+    )
+
+    extracted = gdal.Open(str(tmp_path / "extracted.tif"))
+    classic = gdal.Translate(str(tmp_path / "classic.tif"), f"NETCDF:{nc_fp}:Band1")
+
+    assert (extracted.RasterXSize, extracted.RasterYSize) == (
+        classic.RasterXSize,
+        classic.RasterYSize,
+    )
+    assert extracted.GetGeoTransform() == pytest.approx(classic.GetGeoTransform())
+    assert extracted.GetSpatialRef().IsSame(classic.GetSpatialRef())
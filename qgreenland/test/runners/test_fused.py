@@ -0,0 +1,67 @@
+from osgeo import gdal
+
+from qgreenland.models.config.step import FusedStep, PythonStep
+from qgreenland.runners.fused import fused_runner
+from qgreenland.runners.python import run_python_step
+from qgreenland.test.conftest import write_raster
+
+STEPS = [
+    PythonStep(
+        utility="gdalwarp",
+        input_file="{input_dir}/a.tif",
+        output_file="{output_dir}/warped.tif",
+        args=["-tr", "2000", "2000", "-r", "average"],
+    ),
+    PythonStep(
+        utility="gdal_translate",
+        input_file="{input_dir}/warped.tif",
+        output_file="{output_dir}/compressed.tif",
+        args=["-co", "COMPRESS=DEFLATE"],
+    ),
+    PythonStep(
+        utility="gdaladdo",
+        input_file="{input_dir}/compressed.tif",
+        output_file="{output_dir}/final.tif",
+        args=["-r", "average", "2", "4"],
+    ),
+]
+
+
+def test_fused_runner_matches_separate_steps(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    write_raster(input_dir / "a.tif")
+
+    step_input_dir = input_dir
+    for index, step in enumerate(STEPS):
+        step_output_dir = tmp_path / f"separate-{index}"
+        step_output_dir.mkdir()
+        run_python_step(
+            step,
+            input_dir=str(step_input_dir),
+            output_dir=str(step_output_dir),
+        )
+        step_input_dir = step_output_dir
+    separate = gdal.Open(str(step_input_dir / "final.tif"))
+
+    fused_dir = tmp_path / "fused"
+    fused_dir.mkdir()
+    fused_runner(
+        FusedStep(steps=STEPS),
+        input_dir=str(input_dir),
+        output_dir=str(fused_dir),
+    )
+
+    # No intermediate VRTs or scratch directories are left behind.
+    assert [p.name for p in fused_dir.iterdir()] == ["final.tif"]
+
+    fused = gdal.Open(str(fused_dir / "final.tif"))
+    assert fused.GetGeoTransform() == separate.GetGeoTransform()
+    assert fused.GetProjection() == separate.GetProjection()
+    assert (fused.RasterXSize, fused.RasterYSize) == (32, 32)
+
+    fused_band = fused.GetRasterBand(1)
+    separate_band = separate.GetRasterBand(1)
+    assert fused_band.ReadRaster() == separate_band.ReadRaster()
+    assert fused_band.GetOverviewCount() == separate_band.GetOverviewCount() == 2
+    assert fused.GetMetadata("IMAGE_STRUCTURE")["COMPRESSION"] == "DEFLATE"
@@ -0,0 +1,194 @@
+import json
+
+import pytest
+from osgeo import gdal
+
+import qgreenland.exceptions as exc
+import qgreenland.runners.python as python_runner_module
+from qgreenland.models.config.step import PythonStep
+from qgreenland.runners.python import _expand_input, run_python_step
+from qgreenland.test.conftest import write_raster
+
+
+@pytest.fixture
+def step_dirs(tmp_path):
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    return input_dir, output_dir
+
+
+def _run(step: PythonStep, step_dirs, **kwargs) -> None:
+    input_dir, output_dir = step_dirs
+    run_python_step(
+        step,
+        input_dir=str(input_dir),
+        output_dir=str(output_dir),
+        **kwargs,
+    )
+
+
+def test_run_python_step_ogr2ogr(step_dirs):
+    input_dir, output_dir = step_dirs
+    (input_dir / "points.geojson").write_text(
+        json.dumps(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "properties": {"name": name, "value": value},
+                        "geometry": {"type": "Point", "coordinates": coordinates},
+                    }
+                    for name, value, coordinates in (
+                        ("a", 1, [-45, 70]),
+                        ("b", 2, [-40, 72]),
+                        ("c", 3, [-50, 65]),
+                    )
+                ],
+            },
+        ),
+    )
+
+    _run(
+        PythonStep(
+            utility="ogr2ogr",
+            input_file="{input_dir}/*.geojson",
+            output_file="{output_dir}/points.gpkg",
+            # Quoted like a `CommandStep` argument.
+            args=["-t_srs", "EPSG:3413", "-where", "'value > 1'"],
+        ),
+        step_dirs,
+    )
+
+    dataset = gdal.OpenEx(str(output_dir / "points.gpkg"), gdal.OF_VECTOR)
+    layer = dataset.GetLayer(0)
+    assert layer.GetSpatialRef().GetAuthorityCode(None) == "3413"
+    assert [feature.GetField("name") for feature in layer] == ["b", "c"]
+
+
+def test_run_python_step_gdal_translate_config_options(step_dirs, monkeypatch):
+    input_dir, output_dir = step_dirs
+    pixels = write_raster(input_dir / "a.tif")
+
+    config_seen = {}
+
+    def recording_translate(*args, **kwargs):
+        for key in ("QGR_ARG_OPTION", "QGR_STEP_OPTION"):
+            config_seen[key] = gdal.GetConfigOption(key)
+        return gdal.Translate(*args, **kwargs)
+
+    monkeypatch.setitem(
+        python_runner_module.UTILITY_FUNCS,
+        "gdal_translate",
+        recording_translate,
+    )
+
+    _run(
+        PythonStep(
+            utility="gdal_translate",
+            input_file="{input_dir}/a.tif",
+            output_file="{output_dir}/b.tif",
+            args=[
+                "--config",
+                "QGR_ARG_OPTION",
+                "from-args",
+                "-mo",
+                "'QGR_TITLE=A title'",
+            ],
+            config_options={"QGR_STEP_OPTION": "from-step"},
+        ),
+        step_dirs,
+    )
+
+    assert config_seen == {
+        "QGR_ARG_OPTION": "from-args",
+        "QGR_STEP_OPTION": "from-step",
+    }
+    # Only while the step runs.
+    assert gdal.GetConfigOption("QGR_ARG_OPTION") is None
+    assert gdal.GetConfigOption("QGR_STEP_OPTION") is None
+
+    dataset = gdal.Open(str(output_dir / "b.tif"))
+    assert dataset.GetMetadataItem("QGR_TITLE") == "A title"
+    assert dataset.GetRasterBand(1).ReadRaster() == pixels
+
+
+@pytest.mark.parametrize(
+    "output_file,move_input",
+    [
+        ("{output_dir}/overviews.tif", False),
+        ("{output_dir}/overviews.tif", True),
+        # In place.
+        ("{input_dir}/a.tif", False),
+    ],
+)
+def test_run_python_step_gdaladdo(step_dirs, output_file, move_input):
+    input_dir, output_dir = step_dirs
+    input_fp = input_dir / "a.tif"
+    pixels = write_raster(input_fp)
+
+    step = PythonStep(
+        utility="gdaladdo",
+        input_file="{input_dir}/a.tif",
+        output_file=output_file,
+        args=["-r", "average", "2", "4"],
+    )
+    _run(step, step_dirs, move_input=move_input)
+
+    output_fp = output_file.format(input_dir=input_dir, output_dir=output_dir)
+    band = gdal.Open(output_fp).GetRasterBand(1)
+    assert band.GetOverviewCount() == 2
+    assert band.ReadRaster() == pixels
+
+    if output_fp == str(input_fp):
+        return
+    if move_input:
+        assert not input_fp.exists()
+    else:
+        # The input is copied, not modified.
+        assert gdal.Open(str(input_fp)).GetRasterBand(1).GetOverviewCount() == 0
+
+
+def test_run_python_step_gdalbuildvrt_glob(step_dirs):
+    input_dir, output_dir = step_dirs
+    pixels = write_raster(input_dir / "west.tif", origin=(0, 0))
+    write_raster(input_dir / "east.tif", origin=(64_000, 0))
+
+    _run(
+        PythonStep(
+            utility="gdalbuildvrt",
+            input_file="{input_dir}/*.tif",
+            output_file="{output_dir}/mosaic.vrt",
+        ),
+        step_dirs,
+    )
+
+    dataset = gdal.Open(str(output_dir / "mosaic.vrt"))
+    assert (dataset.RasterXSize, dataset.RasterYSize) == (128, 64)
+    band = dataset.GetRasterBand(1)
+    assert band.ReadRaster(0, 0, 64, 64) == pixels
+    assert band.ReadRaster(64, 0, 64, 64) == pixels
+
+
+def test_expand_input(tmp_path):
+    (tmp_path / "a.tif").touch()
+    (tmp_path / "b.tif").touch()
+
+    assert _expand_input(f"{tmp_path}/*.tif", utility="gdalbuildvrt") == [
+        f"{tmp_path}/a.tif",
+        f"{tmp_path}/b.tif",
+    ]
+    assert _expand_input(f"{tmp_path}/a.*", utility="gdal_translate") == (
+        f"{tmp_path}/a.tif"
+    )
+    # Not a glob; left for GDAL to open.
+    assert _expand_input(f"{tmp_path}/c.tif", utility="gdal_translate") == (
+        f"{tmp_path}/c.tif"
+    )
+
+    with pytest.raises(exc.QgrRuntimeError, match="accepts only one input"):
+        _expand_input(f"{tmp_path}/*.tif", utility="gdal_translate")
+    with pytest.raises(exc.QgrRuntimeError, match="No files matched"):
+        _expand_input(f"{tmp_path}/*.shp", utility="ogr2ogr")
@@ -0,0 +1,35 @@
+import shutil
+
+import pytest
+
+import qgreenland.util.config.compile as compile_module
+from qgreenland.test.constants import TEST_CONFIG_DIR
+from qgreenland.util.config.compile import compile_cfg, config_cache_key
+from qgreenland.util.config.export import export_config_json
+
+
+def test_compile_cfg_cached(tmp_path, monkeypatch):
+    # Bypass `functools.cache`.
+    compile_uncached = compile_cfg.__wrapped__
+    config = compile_uncached(TEST_CONFIG_DIR, cache_dir=tmp_path, use_cache=True)
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+
+    def fail(*args, **kwargs):
+        pytest.fail("Config compiled again.")
+
+    monkeypatch.setattr(compile_module, "compile_cfg_uncached", fail)
+    cached = compile_uncached(TEST_CONFIG_DIR, cache_dir=tmp_path, use_cache=True)
+    assert export_config_json(cached) == export_config_json(config)
+
+
+def test_config_cache_key(tmp_path):
+    config_dir = tmp_path / "config"
+    shutil.copytree(TEST_CONFIG_DIR, config_dir)
+    key = config_cache_key(config_dir)
+
+    assert config_cache_key(config_dir) == key
+    assert config_cache_key(config_dir, include_patterns=("foo",)) != key
+
+    layer_fp = next(config_dir.glob("layers/**/*.py"))
+    layer_fp.write_text(layer_fp.read_text() + "\n")
+    assert config_cache_key(config_dir) != key
@@ -12,9 +12,9 @@ from qgreenland.util.config.compile import compile_cfg
 
 def test_missing_settings():
     with pytest.raises(exc.QgrConfigCompileError):
-        compile_cfg(TEST_CONFIG_W_MISSING_SETTINGS_DIR)
+        compile_cfg(TEST_CONFIG_W_MISSING_SETTINGS_DIR, use_cache=False)
 
 
 def test_extra_settings():
     with pytest.raises(exc.QgrConfigCompileError):
-        compile_cfg(TEST_CONFIG_W_EXTRA_SETTINGS_DIR)
+        compile_cfg(TEST_CONFIG_W_EXTRA_SETTINGS_DIR, use_cache=False)
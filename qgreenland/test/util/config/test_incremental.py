@@ -0,0 +1,81 @@
+import shutil
+import sys
+from types import ModuleType
+
+import pytest
+
+from qgreenland.test.constants import TEST_CONFIG_DIR
+from qgreenland.util.config.incremental import (
+    IncrementalConfigCompiler,
+    dependents,
+    module_imports,
+)
+
+_HELPER_MODULE = "qgr_test_incremental_helpers"
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    config_dir = tmp_path / "config"
+    shutil.copytree(TEST_CONFIG_DIR, config_dir)
+
+    # A helper module, imported by name by a layer module.
+    monkeypatch.syspath_prepend(str(config_dir))
+    (config_dir / f"{_HELPER_MODULE}.py").write_text('TITLE = "Before"\n')
+    (config_dir / "layers" / "Other").mkdir()
+    (config_dir / "layers" / "Other" / "helped.py").write_text(
+        "from qgreenland.models.config.layer import Layer\n"
+        "from qgreenland.test.conftest import mock_raster_layer_cfg\n"
+        f"from {_HELPER_MODULE} import TITLE\n"
+        "\n"
+        'helped = Layer(**{**mock_raster_layer_cfg, "id": "helped", "title": TITLE})\n',
+    )
+
+    yield config_dir.resolve()
+    sys.modules.pop(_HELPER_MODULE, None)
+
+
+def test_module_imports(config_dir):
+    helped_fp = config_dir / "layers" / "Other" / "helped.py"
+    helper_fp = config_dir / f"{_HELPER_MODULE}.py"
+
+    assert helper_fp in module_imports(helped_fp)
+    assert dependents({helper_fp}, {helped_fp: {helper_fp}}) == {
+        helper_fp,
+        helped_fp,
+    }
+
+
+def test_incremental_compile(config_dir):
+    examples_fp = config_dir / "layers" / "Group" / "Subgroup" / "examples.py"
+    helped_fp = config_dir / "layers" / "Other" / "helped.py"
+    compiler = IncrementalConfigCompiler(config_dir)
+
+    config = compiler.compile()
+    assert config.layers["helped"].title == "Before"
+    assert {examples_fp, helped_fp} <= compiler.executed
+
+    compiler.compile()
+    assert compiler.executed == set()
+
+    (config_dir / f"{_HELPER_MODULE}.py").write_text('TITLE = "After"\n')
+    config = compiler.compile()
+    assert compiler.executed == {helped_fp}
+    assert config.layers["helped"].title == "After"
+    assert set(config.layers) == {"example_online", "example_raster", "helped"}
+
+    examples_fp.write_text(examples_fp.read_text() + "\n")
+    compiler.compile()
+    assert compiler.executed == {examples_fp}
+
+
+def test_incremental_compile_current_project(config_dir, monkeypatch):
+    compiler = IncrementalConfigCompiler(config_dir)
+    project = compiler.compile().project
+
+    # As if the project module had changed and been executed again.
+    project_module = ModuleType("qgreenland.config.project")
+    project_module.__dict__["project"] = project.copy(update={"crs": "EPSG:4326"})
+    monkeypatch.setitem(sys.modules, "qgreenland.config.project", project_module)
+
+    assert compiler.compile().project.crs == "EPSG:4326"
@@ -0,0 +1,96 @@
+import datetime
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import qgreenland.util.cmr as cmr
+from qgreenland.util.cmr import Granule, resolve_cmr_granules, search_cmr_granules
+
+CSV_HEADER = "Granule UR,Start Time,Online Access URLs"
+
+
+def _row(granule_ur: str) -> str:
+    return f"{granule_ur},2020-01-01T00:00:00.000Z,https://example.com/{granule_ur}.nc"
+
+
+class _CmrHandler(BaseHTTPRequestHandler):
+    # Rows returned for queries without `granule_ur[]`, two per page.
+    rows = [_row("a"), _row("b"), _row("c")]
+    queries: list[dict[str, list[str]]] = []
+    cleared: list[bytes] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):  # noqa: N802
+        query = parse_qs(urlsplit(self.path).query)
+        type(self).queries.append(query)
+
+        rows = [_row(ur) for ur in query.get("granule_ur[]", [])] or self.rows
+        page = int(self.headers.get("CMR-Scroll-Id", 0))
+        page_rows = rows[page * 2 : page * 2 + 2]  # noqa: E203
+        body = "\n".join([CSV_HEADER, *page_rows]).encode()
+
+        self.send_response(200)
+        self.send_header("CMR-Hits", str(len(rows)))
+        self.send_header("CMR-Scroll-Id", str(page + 1))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # noqa: N802
+        type(self).cleared.append(self.rfile.read(int(self.headers["Content-Length"])))
+        self.send_response(204)
+        self.end_headers()
+
+
+@pytest.fixture
+def cmr_server(http_server, monkeypatch):
+    _CmrHandler.queries = []
+    _CmrHandler.cleared = []
+
+    base_url = http_server(_CmrHandler)
+    monkeypatch.setattr(cmr, "CMR_GRANULES_URL", f"{base_url}/search/granules.csv")
+    monkeypatch.setattr(cmr, "CMR_CLEAR_SCROLL_URL", f"{base_url}/search/clear")
+
+
+def test_search_cmr_granules_follows_scroll_pages(cmr_server):
+    granules = search_cmr_granules(short_name="X", version="1")
+    assert _CmrHandler.queries == []
+
+    assert [g["Granule UR"] for g in granules] == ["a", "b", "c"]
+    assert len(_CmrHandler.queries) == 2
+    assert _CmrHandler.queries[0]["version"] == ["1", "01", "001"]
+    assert _CmrHandler.cleared == [b'{"scroll_id": "2"}']
+
+
+def test_resolve_cmr_granules_batched_and_cached(cmr_server, tmp_path, monkeypatch):
+    cache_fp = tmp_path / "cmr.json"
+    keys = [("C1", "x"), ("C1", "y"), ("C2", "z")]
+
+    granules = resolve_cmr_granules(keys, cache_fp=cache_fp)
+    assert granules[("C1", "y")] == Granule(
+        urls=("https://example.com/y.nc",),
+        start_time=datetime.datetime(2020, 1, 1),
+    )
+    # One query per collection.
+    assert [q["collection_concept_id[]"] for q in _CmrHandler.queries] == [
+        ["C1"],
+        ["C2"],
+    ]
+
+    assert resolve_cmr_granules(keys, cache_fp=cache_fp) == granules
+    assert len(_CmrHandler.queries) == 2
+
+    # Expire the cache.
+    monkeypatch.setattr(cmr, "CMR_CACHE_TTL_HOURS", -1)
+    resolve_cmr_granules(keys[:1], cache_fp=cache_fp)
+    assert len(_CmrHandler.queries) == 3
+
+
+def test_resolve_cmr_granules_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(cmr, "_query_granules", lambda *_: {})
+
+    with pytest.raises(RuntimeError, match="Expected exactly one granule"):
+        resolve_cmr_granules([("C1", "x")], cache_fp=tmp_path / "cmr.json")
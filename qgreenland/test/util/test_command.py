@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import qgreenland.exceptions as exc
+import qgreenland.util.command as command_module
+import qgreenland.util.ledger as ledger
+from qgreenland.util.command import _direct_argv, run_cmd
+
+
+@pytest.mark.parametrize(
+    "cmd_str,expected",
+    [
+        (
+            'ogr2ogr -sql "SELECT a FROM b" out.gpkg',
+            ["ogr2ogr", "-sql", "SELECT a FROM b", "out.gpkg"],
+        ),
+        ("FOO=bar unzip x.zip", ["FOO=bar", "unzip", "x.zip"]),
+        ("cp a b && gdaladdo b", None),
+        ("unzip {input_dir}/*.zip", None),
+        ("FOO=bar", None),
+    ],
+)
+def test__direct_argv(cmd_str, expected):
+    assert _direct_argv(cmd_str) == expected
+
+
+def test_run_cmd():
+    assert run_cmd(["FOO=bar", "printenv", "FOO"]).stdout == b"bar\n"
+    assert run_cmd(["echo", "a", "&&", "echo", "b"]).stdout == b"a\nb\n"
+
+    with pytest.raises(exc.QgrSubprocessError):
+        run_cmd(["false"])
+
+
+@pytest.fixture
+def persistent_shell(monkeypatch):
+    monkeypatch.setattr(command_module, "PERSISTENT_SHELL", True)
+    monkeypatch.setattr(command_module, "_shell_workers", {})
+    monkeypatch.setattr(ledger, "_command_peak_rss_kb", 0)
+    monkeypatch.setattr(ledger, "_unreaped_command_cpu", {"user": 0.0, "system": 0.0})
+    yield
+    for worker in command_module._shell_workers.values():
+        worker.close()
+
+
+def test_run_cmd_persistent_shell(persistent_shell):
+    assert run_cmd(["echo", "a", "&&", "echo", "b"]).stdout == b"a\nb\n"
+    # Each command runs in its own shell.
+    run_cmd(["cd", "/", "&&", "export", "FOO=bar"])
+    assert (
+        run_cmd(["echo", "$FOO", "&&", "pwd"]).stdout == f"\n{os.getcwd()}\n".encode()
+    )
+
+    with pytest.raises(exc.QgrSubprocessError):
+        run_cmd(["echo", "a", "&&", "false"])
+
+    # Commands' resource usage is recorded, though they aren't our children.
+    run_cmd(["for i in $(seq 200000); do :; done"])
+    assert ledger._command_peak_rss_kb > 0
+    assert ledger._unreaped_command_cpu["user"] > 0
+
+
+def test_run_cmd_persistent_shell_closes_idle_workers(persistent_shell):
+    workers = [
+        command_module._shell_worker({"FOO": str(index)})
+        for index in range(command_module.MAX_SHELL_WORKERS + 1)
+    ]
+
+    assert len(command_module._shell_workers) == command_module.MAX_SHELL_WORKERS
+    assert not workers[0].alive
+    assert all(worker.alive for worker in workers[1:])
+    # Reused, and no longer the least recently used.
+    assert command_module._shell_worker({"FOO": "1"}) is workers[1]
+    assert list(command_module._shell_workers.values()) == [workers[2], workers[1]]
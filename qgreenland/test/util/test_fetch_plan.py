@@ -0,0 +1,75 @@
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from qgreenland.models.config.asset import HttpAsset
+from qgreenland.util.luigi.fetch_plan import plan_fetches
+from qgreenland.util.luigi.schedule import PLANNED_FETCH_BYTES_PER_SECOND, CostModel
+from qgreenland.util.luigi.tasks.fetch import FetchDataFiles
+
+SIZES = {"/small.bin": 10, "/large.bin": 1000}
+
+
+class _SizeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):  # noqa: N802
+        path = self.path.split("?")[0]
+        if path not in SIZES:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(SIZES[path]))
+        self.end_headers()
+
+    do_GET = do_HEAD  # noqa: N815
+
+
+class _FetchDataFiles(FetchDataFiles):
+    # By dataset id.
+    asset_urls: dict[str, list[str]] = {}
+
+    @property
+    def asset_cfg(self):
+        return HttpAsset(id=self.asset_id, urls=self.asset_urls[self.dataset_id])
+
+    def complete(self):
+        return False
+
+
+@pytest.fixture
+def size_server(http_server):
+    return http_server(_SizeHandler)
+
+
+def test_plan_fetches(size_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        _FetchDataFiles,
+        "asset_urls",
+        {
+            "small": [f"{size_server}/small.bin", f"{size_server}/small.bin?copy"],
+            "unknown": [f"{size_server}/large.bin", f"{size_server}/missing.bin"],
+            "large": [f"{size_server}/large.bin"],
+        },
+    )
+    tasks = [
+        _FetchDataFiles(dataset_id=dataset_id, asset_id="only")
+        for dataset_id in ("small", "unknown", "large")
+    ]
+
+    plan = plan_fetches(tasks, workers=2, storage_dir=tmp_path / "storage")
+
+    assert [(f.subject, f.bytes) for f in plan.fetches] == [
+        ("large.only", 1000),
+        ("small.only", 20),
+        ("unknown.only", None),
+    ]
+    assert plan.total_bytes == 1020
+    assert plan.unknown_count == 1
+    assert plan.fits
+
+    cost_model = CostModel(entries=[], fetch_plan=plan)
+    assert cost_model.seconds(tasks[2]) == 1000 / PLANNED_FETCH_BYTES_PER_SECOND
@@ -0,0 +1,56 @@
+from qgreenland.models.config.layer import Layer
+from qgreenland.test.conftest import mock_raster_layer_cfg
+from qgreenland.util.fingerprint import layer_step_fingerprints
+
+
+def _layer_with_steps(steps, **kwargs) -> Layer:
+    return Layer(**{**mock_raster_layer_cfg, **kwargs, "steps": steps})
+
+
+_steps = [
+    {"type": "command", "args": ["foo", "{input_dir}/bar"]},
+    {"type": "command", "args": ["baz", "{assets_dir}/qux"]},
+]
+
+
+def test_layer_step_fingerprints_stable(raster_layer_cfg):
+    assert layer_step_fingerprints(raster_layer_cfg) == layer_step_fingerprints(
+        raster_layer_cfg
+    )
+
+
+def test_layer_step_fingerprints_ignore_layer_and_step_ids():
+    layer = _layer_with_steps(_steps)
+    renamed = _layer_with_steps(
+        [{**step, "id": f"renamed_{i}"} for i, step in enumerate(_steps)],
+        id="renamed_layer",
+    )
+
+    assert layer_step_fingerprints(layer) == layer_step_fingerprints(renamed)
+
+
+def test_layer_step_fingerprints_change_propagates_downstream():
+    layer = _layer_with_steps(_steps)
+    changed = _layer_with_steps(
+        [{"type": "command", "args": ["foo", "{input_dir}/CHANGED"]}, _steps[1]],
+    )
+
+    original_fps = layer_step_fingerprints(layer)
+    changed_fps = layer_step_fingerprints(changed)
+
+    assert len(original_fps) == len(changed_fps) == 2
+    assert original_fps[0] != changed_fps[0]
+    assert original_fps[1] != changed_fps[1]
+
+
+def test_layer_step_fingerprints_change_does_not_propagate_upstream():
+    layer = _layer_with_steps(_steps)
+    changed = _layer_with_steps(
+        [_steps[0], {"type": "command", "args": ["baz", "CHANGED"]}],
+    )
+
+    original_fps = layer_step_fingerprints(layer)
+    changed_fps = layer_step_fingerprints(changed)
+
+    assert original_fps[0] == changed_fps[0]
+    assert original_fps[1] != changed_fps[1]
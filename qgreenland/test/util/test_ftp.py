@@ -0,0 +1,150 @@
+import json
+import socket
+import socketserver
+import threading
+from typing import Optional
+
+import pytest
+
+from qgreenland.util.ftp import close_idle_connections
+from qgreenland.util.request import fetch_and_write_file
+
+DATA = bytes(range(256)) * 1024
+
+
+class _FtpHandler(socketserver.StreamRequestHandler):
+    """Just enough of an FTP server for `ftplib` to retrieve files."""
+
+    files = {"/pub/a.bin": DATA, "/pub/b.bin": DATA[::-1]}
+    logins = 0
+    quits = 0
+    rests: list[int] = []
+    # Drop the data connection after sending this many bytes of the next file.
+    drop_after: Optional[int] = None
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply("220 Ready")
+        self.data_server: Optional[socket.socket] = None
+        self.rest = 0
+
+        for line in self.rfile:
+            command, _, arg = line.decode().strip().partition(" ")
+            if command.upper() == "QUIT":
+                type(self).quits += 1
+                self._reply("221 Bye")
+                return
+            self._reply(self._respond(command.upper(), arg))
+
+    def _respond(self, command: str, arg: str) -> str:  # noqa: C901
+        if command == "USER":
+            return "331 Password required"
+        if command == "PASS":
+            type(self).logins += 1
+            return "230 Logged in"
+        if command in ("TYPE", "NOOP"):
+            return "200 OK"
+        if command == "SIZE":
+            return f"213 {len(self.files[arg])}" if arg in self.files else "550 No"
+        if command == "REST":
+            self.rest = int(arg)
+            type(self).rests.append(self.rest)
+            return f"350 Restarting at {self.rest}"
+        if command == "PASV":
+            self.data_server = socket.create_server(("127.0.0.1", 0))
+            port = self.data_server.getsockname()[1]
+            return f"227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 255})"
+        if command == "RETR":
+            return self._retrieve(arg)
+        return "502 Not implemented"
+
+    def _retrieve(self, path: str) -> str:
+        assert self.data_server is not None
+        self._reply("150 Opening data connection")
+        conn, _ = self.data_server.accept()
+        body = self.files[path][self.rest :]  # noqa: E203
+        self.rest = 0
+
+        drop_after = type(self).drop_after
+        type(self).drop_after = None
+        with conn:
+            conn.sendall(body if drop_after is None else body[:drop_after])
+        self.data_server.close()
+
+        if drop_after is not None:
+            return "426 Connection closed; transfer aborted"
+        return "226 Transfer complete"
+
+
+@pytest.fixture
+def ftp_server(isolated_hosts):
+    _FtpHandler.logins = 0
+    _FtpHandler.quits = 0
+    _FtpHandler.rests = []
+    _FtpHandler.drop_after = None
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FtpHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": 0.01},
+        daemon=True,
+    )
+    thread.start()
+    yield f"ftp://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_ftp_connections_reused(ftp_server, tmp_path):
+    a_fp = fetch_and_write_file(f"{ftp_server}/pub/a.bin", output_dir=tmp_path)
+    b_fp = fetch_and_write_file(f"{ftp_server}/pub/b.bin", output_dir=tmp_path)
+
+    assert a_fp.read_bytes() == DATA
+    assert b_fp.read_bytes() == DATA[::-1]
+    assert _FtpHandler.logins == 1
+
+    close_idle_connections()
+    assert _FtpHandler.quits == 1
+    fetch_and_write_file(f"{ftp_server}/pub/a.bin", output_dir=tmp_path)
+    assert _FtpHandler.logins == 2
+
+
+def test_ftp_resumes(ftp_server, tmp_path):
+    _FtpHandler.drop_after = 1000
+    partial_dir = tmp_path / "partial"
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    fp = fetch_and_write_file(
+        f"{ftp_server}/pub/a.bin",
+        output_dir=output_dir,
+        partial_dir=partial_dir,
+    )
+
+    assert fp.read_bytes() == DATA
+    assert _FtpHandler.rests == [1000]
+    assert list(partial_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize("saved_size", [None, len(DATA) + 1])
+def test_ftp_discards_stale_partial(ftp_server, tmp_path, saved_size):
+    url = f"{ftp_server}/pub/a.bin"
+    partial_dir = tmp_path / "partial"
+    partial_dir.mkdir()
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    # Left by a download of an earlier version of the file.
+    (partial_dir / "a.bin.part").write_bytes(b"x" * 1000)
+    if saved_size is not None:
+        (partial_dir / "a.bin.part.json").write_text(
+            json.dumps({"url": url, "size": saved_size, "modified": None}),
+        )
+
+    fp = fetch_and_write_file(url, output_dir=output_dir, partial_dir=partial_dir)
+
+    assert fp.read_bytes() == DATA
+    assert _FtpHandler.rests == []
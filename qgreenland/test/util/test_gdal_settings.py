@@ -0,0 +1,33 @@
+import qgreenland.util.gdal_settings as gdal_settings_module
+from qgreenland.util.gdal_settings import (
+    gdal_settings,
+    read_gdal_settings,
+    write_gdal_settings,
+)
+
+
+def test_gdal_settings(monkeypatch):
+    monkeypatch.setattr(gdal_settings_module, "machine_cpu_count", lambda: 8)
+    monkeypatch.setattr(gdal_settings_module, "machine_memory_bytes", lambda: 2**34)
+
+    assert gdal_settings(workers=1) == {
+        "GDAL_NUM_THREADS": "8",
+        "GDAL_CACHEMAX": "8192",
+    }
+    assert gdal_settings(workers=4) == {
+        "GDAL_NUM_THREADS": "2",
+        "GDAL_CACHEMAX": "2048",
+    }
+    assert gdal_settings(workers=1000) == {
+        "GDAL_NUM_THREADS": "1",
+        "GDAL_CACHEMAX": "64",
+    }
+
+
+def test_gdal_settings_roundtrip(tmp_path):
+    assert read_gdal_settings(tmp_path) is None
+
+    settings = {"GDAL_NUM_THREADS": "2", "GDAL_CACHEMAX": "2048"}
+    write_gdal_settings(settings, output_dir=tmp_path)
+
+    assert read_gdal_settings(tmp_path) == settings
@@ -0,0 +1,104 @@
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+import qgreenland.util.hosts as hosts
+from qgreenland.util.hosts import (
+    backoff_seconds,
+    check_status,
+    host_stats_summary,
+    paused_until,
+    read_host_stats,
+    record_transfer,
+    save_host_stats,
+    with_retries,
+)
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    # Respond with 503 to this many requests before succeeding.
+    failures = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):  # noqa: N802
+        if type(self).failures:
+            type(self).failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+
+pytestmark = pytest.mark.usefixtures("isolated_hosts")
+
+
+@pytest.fixture
+def flaky_server(http_server):
+    _FlakyHandler.failures = 0
+    return http_server(_FlakyHandler)
+
+
+def test_backoff_seconds():
+    assert 0 <= backoff_seconds(3) <= hosts.BACKOFF_BASE_SECONDS * 4
+    assert backoff_seconds(1, retry_after=5) == 5
+    assert backoff_seconds(1, retry_after=3600) == hosts.BACKOFF_MAX_SECONDS
+
+
+def test_with_retries_recovers(flaky_server):
+    _FlakyHandler.failures = 2
+    url = f"{flaky_server}/a.txt"
+
+    def get():
+        resp = requests.get(url)
+        check_status(resp)
+        return resp.content
+
+    assert with_retries(url, get) == b"ok"
+    assert hosts._stats["127.0.0.1"] == hosts.HostStats(
+        requests=3,
+        retries=2,
+        failures=2,
+    )
+
+
+def test_circuit_breaker_pauses_only_failing_host(monkeypatch):
+    monkeypatch.setattr(hosts, "BREAKER_THRESHOLD", 2)
+
+    def fail():
+        raise requests.ConnectionError("refused")
+
+    with pytest.raises(requests.ConnectionError):
+        with_retries("https://down.example.com/a.txt", fail, attempts=2)
+
+    assert paused_until("down.example.com") is not None
+    assert paused_until("up.example.com") is None
+
+
+def test_host_stats_summary():
+    with_retries("https://example.com/a.txt", lambda: None)
+    record_transfer("https://example.com/a.txt", nbytes=2**20, seconds=0.5)
+    save_host_stats("run-1")
+
+    with_retries("https://example.com/b.txt", lambda: None)
+    record_transfer("https://example.com/b.txt", nbytes=2**20, seconds=0.5)
+    save_host_stats("run-1")
+    save_host_stats("run-2")
+
+    stats = read_host_stats("run-1")
+    assert stats == {
+        "example.com": hosts.HostStats(requests=2, bytes=2**21, seconds=1.0),
+    }
+    assert host_stats_summary(stats) == (
+        "Fetched from:\n"
+        "  - example.com: 2 requests, 0 retries, 0 failures;"
+        " 2.0 MiB at 2.0 MiB/s per transfer"
+    )
+    assert read_host_stats("run-2") == {}
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+from qgreenland.models.ledger import LedgerEntry
+from qgreenland.util.ledger import (
+    append_ledger_entry,
+    compare_with_previous,
+    peak_rss_kb,
+    read_ledger,
+    reset_peak_rss,
+)
+
+
+def _entry(*, run_id: str, step: str, wall_seconds: float) -> LedgerEntry:
+    return LedgerEntry(
+        run_id=run_id,
+        finished_at=datetime(2022, 1, 1),
+        task="ChainableTask",
+        subject="example_layer",
+        step=step,
+        fingerprint="abc123",
+        wall_seconds=wall_seconds,
+        user_cpu_seconds=1.0,
+        system_cpu_seconds=0.5,
+        peak_rss_bytes=1024,
+        read_bytes=None,
+        written_bytes=2048,
+        output_bytes=4096,
+    )
+
+
+def test_ledger_roundtrip(tmp_path):
+    ledger_fp = tmp_path / "ledger.jsonl"
+    entries = [
+        _entry(run_id="1", step="00-python-ogr2ogr", wall_seconds=2.0),
+        _entry(run_id="1", step="01-python-gdalwarp", wall_seconds=3.0),
+    ]
+    for entry in entries:
+        append_ledger_entry(entry, ledger_fp)
+
+    assert read_ledger(ledger_fp) == entries
+
+
+def test_compare_with_previous():
+    first = _entry(run_id="1", step="00-python-ogr2ogr", wall_seconds=2.0)
+    second = _entry(run_id="2", step="00-python-ogr2ogr", wall_seconds=1.0)
+    new_step = _entry(run_id="2", step="01-python-gdalwarp", wall_seconds=3.0)
+
+    assert compare_with_previous([first, second, new_step]) == [
+        (second, first),
+        (new_step, None),
+    ]
+    assert compare_with_previous([first, second, new_step], run_id="1") == [
+        (first, None),
+    ]
+
+
+def test_compare_with_previous_unknown_run():
+    entry = _entry(run_id="1", step="00-python-ogr2ogr", wall_seconds=2.0)
+
+    assert compare_with_previous([entry], run_id="2") == []
+
+
+def test_reset_peak_rss():
+    if not reset_peak_rss():
+        pytest.skip("The peak RSS can't be reset on this platform.")
+
+    allocated = bytearray(64 * 2**20)
+    peak = peak_rss_kb()
+    del allocated
+
+    reset_peak_rss()
+    reset_peak = peak_rss_kb()
+    assert peak is not None and reset_peak is not None
+    assert reset_peak < peak - 32 * 2**10
@@ -0,0 +1,183 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+import qgreenland.util.range_cache as range_cache
+from qgreenland.util.range_cache import (
+    META_FILENAME,
+    RANGE_CACHE_BLOCK_SIZE,
+    serve_range_cache,
+    stream_path,
+)
+
+DATA = bytes(range(256)) * (RANGE_CACHE_BLOCK_SIZE // 256) * 3 + b"tail"
+# Another version of the file, of the same size.
+DATA_V2 = DATA[::-1]
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    data = DATA
+    etag = '"v1"'
+    requests_received: list[str] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):  # noqa: N802
+        type(self).requests_received.append("HEAD")
+        if self.path != "/global.tif":
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.data)))
+        self.end_headers()
+
+    def do_GET(self):  # noqa: N802
+        byte_range = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if byte_range is None or (if_range and if_range != self.etag):
+            # Checking whether Earthdata Login is required, or the file changed.
+            if byte_range is not None:
+                type(self).requests_received.append(f"{byte_range} (changed)")
+            self.send_response(200)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", str(len(self.data)))
+            self.end_headers()
+            self.wfile.write(self.data)
+            return
+
+        type(self).requests_received.append(byte_range)
+        first, last = byte_range.removeprefix("bytes=").split("-")
+        start, end = int(first), int(last)
+
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(self.data)}")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(self.data[start : end + 1])  # noqa: E203
+
+
+@pytest.fixture
+def upstream(http_server, isolated_hosts):
+    _UpstreamHandler.data = DATA
+    _UpstreamHandler.etag = '"v1"'
+    _UpstreamHandler.requests_received = []
+    return http_server(_UpstreamHandler)
+
+
+def _proxy_url(url: str, *, port: int, verify_tls: bool = True) -> str:
+    return stream_path(url, port=port, verify_tls=verify_tls).removeprefix(
+        "/vsicurl/",
+    )
+
+
+def _get(url: str, byte_range: str) -> bytes:
+    resp = requests.get(url, headers={"Range": byte_range})
+    assert resp.status_code == 206
+    return resp.content
+
+
+def test_range_cache_fetches_only_blocks_read(upstream, tmp_path):
+    url = f"{upstream}/global.tif"
+    block = RANGE_CACHE_BLOCK_SIZE
+    cache_dir = tmp_path / "cache"
+
+    with serve_range_cache(port=0, cache_dir=cache_dir) as port:
+        proxy_url = _proxy_url(url, port=port)
+
+        head = requests.head(proxy_url)
+        assert head.headers["Content-Length"] == str(len(DATA))
+        assert head.headers["Accept-Ranges"] == "bytes"
+
+        assert _get(proxy_url, "bytes=0-99") == DATA[:100]
+        assert _get(proxy_url, f"bytes={2 * block + 10}-{2 * block + 19}") == (
+            DATA[2 * block + 10 : 2 * block + 20]  # noqa: E203
+        )
+        # Read from the cache.
+        assert _get(proxy_url, "bytes=50-149") == DATA[50:150]
+        assert _get(proxy_url, "bytes=-4") == b"tail"
+
+    assert _UpstreamHandler.requests_received == [
+        "HEAD",
+        f"bytes=0-{block - 1}",
+        f"bytes={2 * block}-{3 * block - 1}",
+        f"bytes={3 * block}-{len(DATA) - 1}",
+    ]
+
+    # The cache persists; once it's checked that the file hasn't changed, only
+    # the missing block is fetched.
+    _UpstreamHandler.requests_received = []
+    with serve_range_cache(port=0, cache_dir=cache_dir) as port:
+        resp = requests.get(_proxy_url(url, port=port))
+        assert resp.status_code == 200
+        assert resp.content == DATA
+
+    assert _UpstreamHandler.requests_received == [
+        "HEAD",
+        f"bytes={block}-{2 * block - 1}",
+    ]
+    # The exact URL is recorded with the cached blocks.
+    [meta_fp] = cache_dir.glob(f"*/{META_FILENAME}")
+    assert json.loads(meta_fp.read_text())["url"] == url
+
+
+def test_range_cache_drops_changed_file(upstream, tmp_path):
+    url = f"{upstream}/global.tif"
+    block = RANGE_CACHE_BLOCK_SIZE
+    cache_dir = tmp_path / "cache"
+
+    with serve_range_cache(port=0, cache_dir=cache_dir) as port:
+        proxy_url = _proxy_url(url, port=port)
+        assert _get(proxy_url, "bytes=0-99") == DATA[:100]
+
+        # The file changes while the proxy is running.
+        _UpstreamHandler.data = DATA_V2
+        _UpstreamHandler.etag = '"v2"'
+        with pytest.raises(requests.RequestException):
+            _get(proxy_url, f"bytes={block}-{block + 99}")
+        assert not any(cache_dir.iterdir())
+
+        assert _get(proxy_url, "bytes=0-99") == DATA_V2[:100]
+
+    # The file changes between runs.
+    _UpstreamHandler.data = DATA
+    _UpstreamHandler.etag = '"v3"'
+    _UpstreamHandler.requests_received = []
+    with serve_range_cache(port=0, cache_dir=cache_dir) as port:
+        assert _get(_proxy_url(url, port=port), "bytes=0-99") == DATA[:100]
+
+    assert _UpstreamHandler.requests_received == ["HEAD", f"bytes=0-{block - 1}"]
+    [meta_fp] = cache_dir.glob(f"*/{META_FILENAME}")
+    assert json.loads(meta_fp.read_text())["etag"] == '"v3"'
+
+
+def test_range_cache_missing_file(upstream, tmp_path):
+    with serve_range_cache(port=0, cache_dir=tmp_path / "cache") as port:
+        resp = requests.head(_proxy_url(f"{upstream}/missing.tif", port=port))
+
+    assert resp.status_code == 404
+
+
+def test_range_cache_verify_tls(upstream, tmp_path, monkeypatch):
+    verify_requested = []
+    get_session = range_cache.get_session
+
+    def recording_get_session(url, *, verify=True):
+        verify_requested.append(verify)
+        return get_session(url, verify=verify)
+
+    monkeypatch.setattr(range_cache, "get_session", recording_get_session)
+
+    url = f"{upstream}/global.tif"
+    with serve_range_cache(port=0, cache_dir=tmp_path / "cache") as port:
+        proxy_url = _proxy_url(url, port=port, verify_tls=False)
+        assert _get(proxy_url, "bytes=0-99") == DATA[:100]
+
+    assert verify_requested and not any(verify_requested)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+from http.server import BaseHTTPRequestHandler
+from typing import Optional
+
+import pytest
+import requests
+
+import qgreenland.exceptions as exc
+import qgreenland.util.request as request_module
+from qgreenland.util.blobs import blob_path
+from qgreenland.util.request import (
+    VALIDATORS_FILENAME,
+    asset_upstream_changed,
+    fetch_and_write_file,
+    read_validators,
+)
+
+DATA = bytes(range(256)) * 4096
+DATA_SHA256 = hashlib.sha256(DATA).hexdigest()
+# Another version of the file, of the same size.
+DATA_V2 = DATA[::-1]
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    # Drop the connection after sending this many bytes of the next response.
+    drop_after: Optional[int] = None
+    data = DATA
+    etag = '"v1"'
+    # Change the file to `DATA_V2` after responding to the next HEAD request.
+    change_after_head = False
+    # Respond to HEAD requests with this status instead.
+    head_status: Optional[int] = None
+    ranges_requested: list[str] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):  # noqa: N802
+        if self.head_status is not None:
+            self.send_response(self.head_status)
+            self.end_headers()
+            return
+
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(self.data)))
+        self.end_headers()
+
+        if self.change_after_head:
+            type(self).change_after_head = False
+            type(self).data = DATA_V2
+            type(self).etag = '"v2"'
+
+    def do_GET(self):  # noqa: N802
+        byte_range = self.headers.get("Range")
+        if byte_range is not None:
+            type(self).ranges_requested.append(byte_range)
+        if_range = self.headers.get("If-Range")
+        if byte_range is None or (if_range and if_range != self.etag):
+            start, end = 0, len(self.data) - 1
+            self.send_response(200)
+        else:
+            first, last = byte_range.removeprefix("bytes=").split("-")
+            start, end = int(first), int(last)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(self.data)}")
+
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        body = self.data[start : end + 1]  # noqa: E203
+        if (drop_after := type(self).drop_after) is not None:
+            type(self).drop_after = None
+            self.wfile.write(body[:drop_after])
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def range_server(http_server, isolated_hosts):
+    _RangeHandler.drop_after = None
+    _RangeHandler.data = DATA
+    _RangeHandler.etag = '"v1"'
+    _RangeHandler.change_after_head = False
+    _RangeHandler.head_status = None
+    _RangeHandler.ranges_requested = []
+    return http_server(_RangeHandler)
+
+
+def test_fetch_and_write_file_resumes(range_server, tmp_path):
+    _RangeHandler.drop_after = 1000
+
+    fp = fetch_and_write_file(
+        f"{range_server}/data.bin",
+        output_dir=tmp_path,
+        session=requests.Session(),
+        chunk_size=100,
+    )
+
+    assert fp == tmp_path / "data.bin"
+    assert fp.read_bytes() == DATA
+    assert _RangeHandler.ranges_requested == [
+        f"bytes=0-{len(DATA) - 1}",
+        f"bytes=1000-{len(DATA) - 1}",
+    ]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        VALIDATORS_FILENAME,
+        "data.bin",
+    ]
+
+
+def test_fetch_and_write_file_segmented(range_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(request_module, "SEGMENTED_DOWNLOAD_MIN_BYTES", 0)
+
+    blob_dir = tmp_path / "blobs"
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    fp = fetch_and_write_file(
+        f"{range_server}/data.bin",
+        output_dir=output_dir,
+        blob_dir=blob_dir,
+        sha256={"data.bin": DATA_SHA256},
+        session=requests.Session(),
+        segments=4,
+    )
+
+    assert fp.read_bytes() == DATA
+    assert fp.samefile(blob_path(DATA_SHA256, blob_dir=blob_dir))
+    assert len(_RangeHandler.ranges_requested) == 4
+
+
+def _write_progress(partial_dir, *, url: str, etag: str, done: int) -> None:
+    """Simulate a previous, interrupted, download of `DATA`."""
+    partial_dir.mkdir()
+    (partial_dir / "data.bin.part").write_bytes(DATA[:done])
+    (partial_dir / "data.bin.part.json").write_text(
+        json.dumps(
+            {
+                "url": url,
+                "size": len(DATA),
+                "etag": etag,
+                "last_modified": None,
+                "segments": [{"start": 0, "end": len(DATA), "done": done}],
+            },
+        ),
+    )
+
+
+def test_fetch_and_write_file_resumes_partial_dir(range_server, tmp_path):
+    url = f"{range_server}/data.bin"
+    partial_dir = tmp_path / "partial"
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    _write_progress(partial_dir, url=url, etag='"v1"', done=5000)
+
+    fp = fetch_and_write_file(
+        url,
+        output_dir=output_dir,
+        partial_dir=partial_dir,
+        session=requests.Session(),
+    )
+
+    assert fp.read_bytes() == DATA
+    assert _RangeHandler.ranges_requested == [f"bytes=5000-{len(DATA) - 1}"]
+    assert list(partial_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize("change_after_head", [False, True])
+def test_fetch_and_write_file_discards_changed_partial(
+    range_server,
+    tmp_path,
+    change_after_head,
+):
+    url = f"{range_server}/data.bin"
+    partial_dir = tmp_path / "partial"
+    _write_progress(partial_dir, url=url, etag='"v1"', done=5000)
+
+    if change_after_head:
+        # The file changes after the partial download is resumed, answering the
+        # `If-Range` request with the whole file.
+        _RangeHandler.change_after_head = True
+        expected_ranges = [f"bytes=5000-{len(DATA) - 1}", f"bytes=0-{len(DATA) - 1}"]
+    else:
+        _RangeHandler.data = DATA_V2
+        _RangeHandler.etag = '"v2"'
+        expected_ranges = [f"bytes=0-{len(DATA) - 1}"]
+
+    fp = fetch_and_write_file(
+        url,
+        output_dir=tmp_path,
+        partial_dir=partial_dir,
+        session=requests.Session(),
+    )
+
+    assert fp.read_bytes() == DATA_V2
+    assert read_validators(tmp_path).files[url].etag == '"v2"'
+    assert _RangeHandler.ranges_requested == expected_ranges
+    assert list(partial_dir.iterdir()) == []
+
+
+def test_asset_upstream_changed(range_server, tmp_path):
+    assert asset_upstream_changed(tmp_path) is None
+
+    fetch_and_write_file(
+        f"{range_server}/data.bin",
+        output_dir=tmp_path,
+        session=requests.Session(),
+    )
+    assert asset_upstream_changed(tmp_path) is False
+
+    _RangeHandler.etag = '"v2"'
+    assert asset_upstream_changed(tmp_path) is True
+
+    # The server refuses HEAD requests.
+    _RangeHandler.head_status = 405
+    assert asset_upstream_changed(tmp_path) is None
+
+    _RangeHandler.head_status = 404
+    with pytest.raises(exc.QgrRuntimeError):
+        asset_upstream_changed(tmp_path)
+
+
+def test_fetch_and_write_file_blob_store(range_server, tmp_path):
+    url = f"{range_server}/data.bin"
+    blob_dir = tmp_path / "blobs"
+    first_dir = tmp_path / "first"
+    second_dir = tmp_path / "second"
+    first_dir.mkdir()
+    second_dir.mkdir()
+
+    first_fp = fetch_and_write_file(
+        url,
+        output_dir=first_dir,
+        blob_dir=blob_dir,
+        session=requests.Session(),
+    )
+    assert first_fp.samefile(blob_path(DATA_SHA256, blob_dir=blob_dir))
+    assert len(_RangeHandler.ranges_requested) == 1
+
+    # A file with a known digest which is already stored isn't downloaded.
+    second_fp = fetch_and_write_file(
+        url,
+        output_dir=second_dir,
+        blob_dir=blob_dir,
+        sha256={"data.bin": DATA_SHA256},
+        session=requests.Session(),
+    )
+    assert second_fp.samefile(first_fp)
+    assert len(_RangeHandler.ranges_requested) == 1
+
+
+def test_fetch_and_write_file_sha256_mismatch(range_server, tmp_path):
+    with pytest.raises(exc.QgrRuntimeError, match="SHA-256 of data.bin"):
+        fetch_and_write_file(
+            f"{range_server}/data.bin",
+            output_dir=tmp_path,
+            sha256={"data.bin": "0" * 64},
+            session=requests.Session(),
+        )
+
+    assert not (tmp_path / "data.bin").exists()
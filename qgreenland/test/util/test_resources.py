@@ -0,0 +1,61 @@
+from qgreenland.constants.project import FETCH_HOST_CONCURRENCY
+from qgreenland.models.config.asset import CommandAsset, HttpAsset
+from qgreenland.models.config.step import CommandStep, FusedStep, PythonStep
+from qgreenland.util.luigi.resources import (
+    fetch_resources,
+    resource_limits,
+    step_resource_class,
+    step_resources,
+)
+
+
+def _python_step(utility: str) -> PythonStep:
+    return PythonStep(
+        utility=utility,
+        input_file="{input_dir}/in.tif",
+        output_file="{output_dir}/out.tif",
+    )
+
+
+def test_step_resource_class_inferred():
+    assert step_resource_class(CommandStep(args=["gdalwarp", "a", "b"])) == "memory"
+    assert step_resource_class(CommandStep(args=["ogr2ogr", "a", "b"])) == "light"
+    assert step_resource_class(CommandStep(args=["cp", "a", "b"])) == "light"
+    assert step_resource_class(_python_step("gdal_translate")) == "cpu"
+    assert step_resources(_python_step("ogr2ogr")) == {}
+
+
+def test_step_resource_class_explicit():
+    step = CommandStep(args=["gdalwarp", "a", "b"], resource_class="light")
+    assert step_resource_class(step) == "light"
+
+
+def test_fused_step_resource_class():
+    step = FusedStep(
+        steps=[_python_step("gdal_translate"), _python_step("gdalwarp")],
+    )
+    assert step_resource_class(step) == "memory"
+    assert step_resources(step) == {"cpu_heavy": 1, "memory_heavy": 1}
+
+
+def test_fetch_resources():
+    http_asset = HttpAsset(
+        id="only",
+        urls=[
+            "https://example.com/a.tif",
+            "https://example.com/b.tif",
+            "ftp://ftp.example.org/c.tif",
+        ],
+    )
+    command_asset = CommandAsset(
+        id="only",
+        args=["wget", "'https://data.example.net/d.zip'", "-O", "{output_dir}/d.zip"],
+    )
+
+    assert fetch_resources(http_asset) == {
+        "fetch_host:example.com": 1,
+        "fetch_host:ftp.example.org": 1,
+    }
+    assert fetch_resources(command_asset) == {"fetch_host:data.example.net": 1}
+    limits = resource_limits([http_asset, command_asset])
+    assert limits["fetch_host:data.example.net"] == FETCH_HOST_CONCURRENCY
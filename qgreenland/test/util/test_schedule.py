@@ -0,0 +1,40 @@
+import luigi
+
+from qgreenland.util.luigi.schedule import CostModel, SchedulePlan
+
+
+class _Task(luigi.Task):
+    name = luigi.Parameter()
+    seconds = luigi.FloatParameter()
+    requires_task = luigi.Parameter(default=None)
+
+    def requires(self):
+        return [self.requires_task] if self.requires_task else []
+
+
+class _TaskCostModel(CostModel):
+    def seconds(self, task):
+        return task.seconds
+
+
+def test_schedule_plan():
+    fetch = _Task(name="fetch", seconds=1)
+    short_chain = _Task(name="short", seconds=2, requires_task=fetch)
+    long_chain_start = _Task(name="long_1", seconds=5, requires_task=fetch)
+    long_chain = _Task(name="long_2", seconds=5, requires_task=long_chain_start)
+
+    plan = SchedulePlan(
+        [short_chain, long_chain],
+        cost_model=_TaskCostModel(entries=[]),
+    )
+    plan.assign_priorities()
+
+    assert plan.critical_path == [fetch, long_chain_start, long_chain]
+    assert plan.critical_path_seconds == 11
+    assert plan.total_seconds == 13
+    assert plan.ideal_makespan_seconds(workers=1) == 13
+    assert plan.ideal_makespan_seconds(workers=4) == 11
+
+    assert fetch.priority == 11
+    assert short_chain.priority == 2
+    assert long_chain.priority == 5
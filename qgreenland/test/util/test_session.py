@@ -0,0 +1,71 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from qgreenland.util.session import get_session, log_session_stats
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+
+class _SlowHandler(_KeepAliveHandler):
+    # Hold responses until this is set.
+    respond = threading.Event()
+
+    def do_GET(self):  # noqa: N802
+        self.respond.wait(timeout=10)
+        super().do_GET()
+
+
+@pytest.fixture
+def server_url(http_server):
+    return http_server(_KeepAliveHandler)
+
+
+def test_get_session_reuses_connections(server_url, caplog):
+    session = get_session(f"{server_url}/a.txt")
+    assert get_session(f"{server_url}/b.txt") is session
+    assert get_session(f"{server_url}/b.txt", verify=False) is not session
+
+    for _ in range(3):
+        assert session.get(f"{server_url}/a.txt").content == b"ok"
+
+    with caplog.at_level(logging.INFO, logger="luigi-interface"):
+        log_session_stats()
+
+    # The Earthdata Login check plus 3 requests, over one connection.
+    assert (
+        f"HTTP session for {server_url}: 4 requests over 1 connections (3 reused),"
+        " 0 Earthdata Login round trips"
+    ) in caplog.messages
+
+
+def test_get_session_doesnt_wait_for_other_hosts(server_url, http_server):
+    slow_url = http_server(_SlowHandler)
+    _SlowHandler.respond.clear()
+
+    # Checking the slow host for Earthdata Login is held up...
+    slow = threading.Thread(target=get_session, args=(f"{slow_url}/a.txt",))
+    slow.start()
+    try:
+        # ...but not getting a session for another host.
+        other = threading.Thread(target=get_session, args=(f"{server_url}/a.txt",))
+        other.start()
+        other.join(timeout=5)
+        assert not other.is_alive()
+        assert slow.is_alive()
+    finally:
+        _SlowHandler.respond.set()
+        slow.join()
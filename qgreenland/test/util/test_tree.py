@@ -1,6 +1,17 @@
+import time
 from functools import partial
 
-from qgreenland.util.tree import _matches_filters
+from qgreenland.constants.paths import LAYERS_CFG_DIR
+from qgreenland.models.config.layer_group import LayerGroupSettings, RootGroupSettings
+from qgreenland.util.module import ModuleObjects
+from qgreenland.util.tree import (
+    LayerGroupNode,
+    LayerNode,
+    _matches_filters,
+    layer_tree,
+    prune_empty_groups,
+    prune_layers_not_in_package,
+)
 
 SELECT_MANY_PATTERNS = ("*machine*", "backgr*")
 SELECT_ONE_PATTERNS = ("bedmachine_thickness",)
@@ -77,3 +88,75 @@ def test__matches_filters_exclude_only(layer_cfgs):
     expected = [True, False, True, True, True, True]
 
     assert actual == expected
+
+
+def _tree(layer_cfgs):
+    root = LayerGroupNode("layers", settings=RootGroupSettings())
+    group = LayerGroupNode("Group", settings=LayerGroupSettings(), parent=root)
+    subgroup = LayerGroupNode("Subgroup", settings=LayerGroupSettings(), parent=group)
+    LayerGroupNode("Empty", settings=LayerGroupSettings(), parent=group)
+
+    LayerNode(layer_cfgs[0].id, layer_cfg=layer_cfgs[0], parent=group)
+    not_in_package = layer_cfgs[1].copy(update={"in_package": False})
+    LayerNode(not_in_package.id, layer_cfg=not_in_package, parent=subgroup)
+
+    return root
+
+
+def test_prune_empty_groups(layer_cfgs):
+    tree = _tree(layer_cfgs)
+    pruned = prune_empty_groups(tree)
+
+    assert pruned.render() == "\n".join(
+        [
+            "layers",
+            "└── Group",
+            "    ├── Subgroup",
+            "    │   └── bedmachine_thickness",
+            "    └── bedmachine_error",
+        ]
+    )
+    # The original tree is untouched, and layer configs are shared.
+    assert len(tree.descendants) == 5
+    assert pruned.leaves[-1].layer_cfg is tree.leaves[-1].layer_cfg
+
+
+def test_prune_layers_not_in_package(layer_cfgs):
+    pruned = prune_layers_not_in_package(_tree(layer_cfgs))
+
+    assert pruned.render() == "\n".join(
+        [
+            "layers",
+            "└── Group",
+            "    └── bedmachine_error",
+        ]
+    )
+    assert pruned.leaves[0].group_name_path == ("Group",)
+
+
+def test_prune_everything(layer_cfgs):
+    tree = LayerGroupNode("layers", settings=RootGroupSettings())
+    LayerGroupNode("Empty", settings=LayerGroupSettings(), parent=tree)
+
+    pruned = prune_empty_groups(tree)
+    assert pruned.name == "layers"
+    assert pruned.children == ()
+
+
+def test_layer_tree_benchmark():
+    """Guard against regressions in the time taken to build the layer tree.
+
+    Modules are only executed once, so this measures building the tree from
+    their layers: ordering, validating and pruning.
+    """
+    module_objects: ModuleObjects = {}
+    layer_tree(LAYERS_CFG_DIR, module_objects=module_objects)
+
+    durations = []
+    for _ in range(5):
+        start = time.monotonic()
+        layer_tree(LAYERS_CFG_DIR, module_objects=module_objects)
+        durations.append(time.monotonic() - start)
+
+    # Takes ~0.01s. Comparing serialized layers took ~0.3s.
+    assert min(durations) < 0.15
@@ -0,0 +1,86 @@
+import gzip
+import zipfile
+
+import pytest
+
+from qgreenland.util.vsi import (
+    archive_member_path,
+    expand_archive_path,
+    extract_archive_path,
+    split_archive_path,
+)
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    with zipfile.ZipFile(tmp_path / "a.zip", "w") as zip_file:
+        zip_file.writestr("a.shp", "shp")
+        zip_file.writestr("a.dbf", "dbf")
+        zip_file.writestr("sub/b.shp", "b")
+    with zipfile.ZipFile(tmp_path / "c.zip", "w") as zip_file:
+        zip_file.writestr("c.shp", "c")
+    with gzip.open(tmp_path / "d.shp.gz", "wb") as gz_file:
+        gz_file.write(b"d")
+
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "args,kwargs,expected",
+    [
+        (("{input_dir}/*.zip", "*.shp"), {}, "/vsizip/{input_dir}/*.zip/*.shp"),
+        (
+            ("{input_dir}/x.gz",),
+            {"decompress_type": "gzip"},
+            "/vsigzip/{input_dir}/x.gz",
+        ),
+        (("{input_dir}/x.gz", "x.shp"), {"decompress_type": "gzip"}, None),
+        (("{input_dir}/*.zip", "*.shp"), {"decompress_type": "7z"}, None),
+        (("{input_dir}/x.tar", "*.shp"), {}, None),
+    ],
+)
+def test_archive_member_path(args, kwargs, expected):
+    assert archive_member_path(*args, **kwargs) == expected
+
+
+def test_split_archive_path():
+    assert split_archive_path("/vsizip//data/a.zip/sub/b.shp") == (
+        "/vsizip/",
+        "/data/a.zip",
+        "sub/b.shp",
+    )
+    assert split_archive_path("/vsigzip//data/d.shp.gz") == (
+        "/vsigzip/",
+        "/data/d.shp.gz",
+        "",
+    )
+    assert split_archive_path("/data/a.shp") is None
+
+
+def test_expand_archive_path(archive_dir):
+    assert expand_archive_path(f"/vsizip/{archive_dir}/*.zip/*.shp") == [
+        f"/vsizip/{archive_dir}/a.zip/a.shp",
+        f"/vsizip/{archive_dir}/c.zip/c.shp",
+    ]
+    assert expand_archive_path(f"/vsizip/{archive_dir}/a.zip/*/*.shp") == [
+        f"/vsizip/{archive_dir}/a.zip/sub/b.shp",
+    ]
+    assert expand_archive_path(f"/vsigzip/{archive_dir}/*.gz") == [
+        f"/vsigzip/{archive_dir}/d.shp.gz",
+    ]
+
+
+def test_extract_archive_path(archive_dir, tmp_path):
+    extracted = extract_archive_path(
+        f"/vsizip/{archive_dir}/a.zip/a.shp",
+        output_dir=tmp_path / "zip",
+    )
+    assert extracted == str(tmp_path / "zip" / "a.shp")
+    assert (tmp_path / "zip" / "a.dbf").read_text() == "dbf"
+
+    (tmp_path / "gz").mkdir()
+    extracted = extract_archive_path(
+        f"/vsigzip/{archive_dir}/d.shp.gz",
+        output_dir=tmp_path / "gz",
+    )
+    assert extracted == str(tmp_path / "gz" / "d.shp")
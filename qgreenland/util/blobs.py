@@ -0,0 +1,65 @@
+"""A content-addressed store of fetched files.
+
+Each file is stored once, named by its SHA-256 digest, and the files in fetched
+asset directories are hard links to the stored blobs. Blobs are read-only so
+that a step can't modify a fetched file in place.
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import qgreenland.exceptions as exc
+from qgreenland.constants.project import DOWNLOAD_CHUNK_SIZE
+
+logger = logging.getLogger("luigi-interface")
+
+
+def blob_path(digest: str, *, blob_dir: Path) -> Path:
+    return blob_dir / digest[:2] / digest
+
+
+def file_sha256(fp: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(fp, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def verify_sha256(fp: Path, digest: str, *, expected: Optional[str]) -> None:
+    """Raise an error and delete `fp` if its `digest` is not `expected`."""
+    if expected is None or digest == expected:
+        return
+
+    fp.unlink()
+    raise exc.QgrRuntimeError(
+        f"SHA-256 of {fp.name} is {digest}, expected {expected}."
+        " The download may be corrupt, or the file may have changed upstream.",
+    )
+
+
+def store_blob(fp: Path, digest: str, *, blob_dir: Path) -> None:
+    """Store `fp` in the blob store, replacing it with a link to the blob."""
+    blob_fp = blob_path(digest, blob_dir=blob_dir)
+    if blob_fp.is_file():
+        logger.info(f"{fp.name} is already stored as {blob_fp}")
+        fp.unlink()
+    else:
+        blob_fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.chmod(0o444)
+        os.replace(fp, blob_fp)
+
+    os.link(blob_fp, fp)
+
+
+def link_blob(digest: str, fp: Path, *, blob_dir: Path) -> bool:
+    """Link the blob with `digest` to `fp`, if it's stored."""
+    blob_fp = blob_path(digest, blob_dir=blob_dir)
+    if not blob_fp.is_file():
+        return False
+
+    os.link(blob_fp, fp)
+    return True
@@ -1,27 +1,44 @@
 import csv
 import datetime
+import fcntl
+import json
 import logging
+import os
 import pprint
-from collections import namedtuple
+import time
+from collections import defaultdict, namedtuple
+from pathlib import Path
+from typing import Iterable, Iterator
 
 import requests
+from funcy import chunks
 
-from qgreenland.constants.project import REQUEST_TIMEOUT
+from qgreenland.constants.paths import CMR_CACHE_FP
+from qgreenland.constants.project import CMR_CACHE_TTL_HOURS, REQUEST_TIMEOUT
+from qgreenland.util.hosts import check_status, with_retries
 
 logger = logging.getLogger("luigi-interface")
 
 CMR_CLIENT_ID_HEADER = {"Client-Id": "nsidc-qgreenland"}
 CMR_BASE_URL = "https://cmr.earthdata.nasa.gov"
 CMR_GRANULES_URL = f"{CMR_BASE_URL}/search/granules.csv"
+CMR_CLEAR_SCROLL_URL = f"{CMR_BASE_URL}/search/clear-scroll"
 
-CMR_GRANULES_SCROLL_URL = (
-    CMR_GRANULES_URL
-    + "?scroll=true&page_size=2000&"
-    + "sort_key[]=%2Bstart_date&online_only=true"
-)
+CMR_SCROLL_PARAMS = [
+    ("scroll", "true"),
+    ("page_size", "2000"),
+    ("sort_key[]", "+start_date"),
+    ("online_only", "true"),
+]
+
+# Granule URs looked up per query, keeping query strings reasonably short.
+CMR_GRANULE_URS_PER_QUERY = 100
 
 Granule = namedtuple("Granule", ["urls", "start_time"])
 
+# A collection concept id and granule UR.
+GranuleKey = tuple[str, str]
+
 
 def _clean_granules_csv(granules):
     """Filter out blank lines."""
@@ -35,25 +52,175 @@ def _csv_granules_to_dicts(resp_text):
 
 
 def get_cmr_granule(*, granule_ur, collection_concept_id):
-    """Query CMR for a granule by Granule UR, return a `Granule`."""
-    url = (
-        f"{CMR_GRANULES_SCROLL_URL}"
-        f"&collection_concept_id[]={collection_concept_id}"
-        f"&granule_ur[]={granule_ur}"
+    """Query CMR for a granule by Granule UR, return a `Granule`.
+
+    See `resolve_cmr_granules`.
+    """
+    key = (collection_concept_id, granule_ur)
+    return resolve_cmr_granules([key])[key]
+
+
+def resolve_cmr_granules(
+    keys: Iterable[GranuleKey],
+    *,
+    cache_fp: Path = CMR_CACHE_FP,
+) -> dict[GranuleKey, Granule]:
+    """Find the granules identified by `keys`.
+
+    Granules resolved in the last `CMR_CACHE_TTL_HOURS` are read from
+    `cache_fp`. The rest are looked up with one scroll query per collection
+    (or per `CMR_GRANULE_URS_PER_QUERY` granules), and cached.
+    """
+    keys = set(keys)
+    cached = _read_cache(cache_fp)
+    granules = {key: cached[key] for key in keys if key in cached}
+
+    missing: defaultdict[str, list[str]] = defaultdict(list)
+    for collection_concept_id, granule_ur in sorted(keys - granules.keys()):
+        missing[collection_concept_id].append(granule_ur)
+
+    resolved: dict[GranuleKey, Granule] = {}
+    for collection_concept_id, granule_urs in missing.items():
+        for batch in chunks(CMR_GRANULE_URS_PER_QUERY, granule_urs):
+            resolved.update(_query_granules(collection_concept_id, batch))
+
+    if not_found := keys - granules.keys() - resolved.keys():
+        raise RuntimeError(f"Expected exactly one granule for each of: {not_found}")
+
+    if resolved:
+        _write_cache(resolved, cache_fp=cache_fp)
+
+    return {**granules, **resolved}
+
+
+def _query_granules(
+    collection_concept_id: str,
+    granule_urs: list[str],
+) -> dict[GranuleKey, Granule]:
+    logger.info(
+        f"Querying CMR for {len(granule_urs)} granules of {collection_concept_id}",
     )
-    response = requests.get(url, headers=CMR_CLIENT_ID_HEADER, timeout=REQUEST_TIMEOUT)
+    params = [
+        *CMR_SCROLL_PARAMS,
+        ("collection_concept_id[]", collection_concept_id),
+        *(("granule_ur[]", granule_ur) for granule_ur in granule_urs),
+    ]
+
+    granules: dict[GranuleKey, Granule] = {}
+    for row in _scroll_granules(params):
+        key = (collection_concept_id, row["Granule UR"])
+        if key in granules:
+            raise RuntimeError(f"Expected exactly one granule, received: {row}")
+        granules[key] = _normalize_granule(row)
+
+    return granules
+
+
+def _scroll_granules(params: list[tuple[str, str]]) -> Iterator[dict[str, str]]:
+    """Query CMR for granules, fetching each page of results as it's needed."""
+    headers = dict(CMR_CLIENT_ID_HEADER)
+    received = 0
+
+    try:
+        while True:
+            response = with_retries(
+                CMR_GRANULES_URL,
+                lambda: _get_granules_page(params, headers=headers),
+                description="CMR search",
+            )
+            if scroll_id := response.headers.get("CMR-Scroll-Id"):
+                headers["CMR-Scroll-Id"] = scroll_id
+
+            page = _csv_granules_to_dicts(response.text)
+            yield from page
+
+            received += len(page)
+            hits = int(response.headers.get("CMR-Hits", 0))
+            if not page or received >= hits or not scroll_id:
+                return
+    finally:
+        if "CMR-Scroll-Id" in headers:
+            _clear_scroll(headers["CMR-Scroll-Id"])
+
+
+def _get_granules_page(params, *, headers) -> requests.Response:
+    response = requests.get(
+        CMR_GRANULES_URL,
+        params=params,
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+    )
+    check_status(response)
 
     if not response.ok:
         raise RuntimeError(f"Error from CMR: {response.text}")
 
-    granules = _csv_granules_to_dicts(response.text)
+    return response
+
 
-    if len(granules) != 1:
-        raise RuntimeError(
-            f"Expected exactly one granule, received: {granules}",
+def _clear_scroll(scroll_id: str) -> None:
+    """Let CMR free the scroll session now, instead of when it expires."""
+    try:
+        requests.post(
+            CMR_CLEAR_SCROLL_URL,
+            json={"scroll_id": scroll_id},
+            headers=CMR_CLIENT_ID_HEADER,
+            timeout=REQUEST_TIMEOUT,
         )
+    except requests.RequestException as e:
+        logger.info(f"Failed to clear CMR scroll session: {e}")
 
-    return _normalize_granule(granules[0])
+
+def _read_cache_entries(cache_fp: Path) -> list[dict]:
+    """Read the unexpired entries of the granule cache."""
+    try:
+        entries = json.loads(cache_fp.read_text())
+    except (OSError, ValueError):
+        return []
+
+    oldest = time.time() - CMR_CACHE_TTL_HOURS * 60 * 60
+    return [entry for entry in entries if entry["resolved_at"] >= oldest]
+
+
+def _read_cache(cache_fp: Path) -> dict[GranuleKey, Granule]:
+    return {
+        (entry["collection_concept_id"], entry["granule_ur"]): Granule(
+            urls=tuple(entry["urls"]),
+            start_time=datetime.datetime.fromisoformat(entry["start_time"]),
+        )
+        for entry in _read_cache_entries(cache_fp)
+    }
+
+
+def _write_cache(granules: dict[GranuleKey, Granule], *, cache_fp: Path) -> None:
+    """Add `granules` to the cache, locking it against concurrent workers."""
+    now = time.time()
+    cache_fp.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(cache_fp.with_name(f"{cache_fp.name}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            entries = [
+                entry
+                for entry in _read_cache_entries(cache_fp)
+                if (entry["collection_concept_id"], entry["granule_ur"]) not in granules
+            ]
+            entries.extend(
+                {
+                    "collection_concept_id": collection_concept_id,
+                    "granule_ur": granule_ur,
+                    "urls": list(granule.urls),
+                    "start_time": granule.start_time.isoformat(),
+                    "resolved_at": now,
+                }
+                for (collection_concept_id, granule_ur), granule in granules.items()
+            )
+
+            temp_fp = cache_fp.with_name(f"{cache_fp.name}.{os.getpid()}.tmp")
+            temp_fp.write_text(json.dumps(entries, indent=2))
+            temp_fp.replace(cache_fp)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 def _normalize_granule(granule):
@@ -89,31 +256,27 @@ def _normalize_granule(granule):
     return Granule(urls=tuple(url.split(",")), start_time=start_time)
 
 
-def search_cmr_granules(*, short_name, version):
-    """Only supports one page of results, limited to 2000 granules."""
+def search_cmr_granules(*, short_name, version) -> Iterator[dict[str, str]]:
+    """Search for granules, following scroll pages as they're consumed."""
 
-    def _version_query_string(version):
+    def _version_query_params(version):
         max_pad_length = 3
         versions_needed = (max_pad_length - len(str(version))) + 1
         versions = [version.zfill(n + 1) for n in range(versions_needed)]
-        return "".join([f"&version={v}" for v in versions])
+        return [("version", v) for v in versions]
 
-    url = (
-        f"{CMR_GRANULES_SCROLL_URL}"
-        f"&short_name={short_name}"
-        f"{_version_query_string(version)}"
+    return _scroll_granules(
+        [
+            *CMR_SCROLL_PARAMS,
+            ("short_name", short_name),
+            *_version_query_params(version),
+        ],
     )
 
-    response = requests.get(url, headers=CMR_CLIENT_ID_HEADER, timeout=REQUEST_TIMEOUT)
-
-    if not response.ok:
-        raise RuntimeError(f"Error from CMR: {response.text}")
-
-    return _csv_granules_to_dicts(response.text)
-
 
 def pretty_search_cmr_granules(**kwargs):
     try:
-        pprint.pprint(search_cmr_granules(**kwargs))
+        for granule in search_cmr_granules(**kwargs):
+            pprint.pprint(granule)
     except BrokenPipeError:
         pass
@@ -1,12 +1,31 @@
+import contextlib
+import functools
+import json
 import logging
+import os
+import re
+import resource
+import shlex
 import subprocess
-from typing import Sequence
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Sequence, Union
 
 import qgreenland.exceptions as exc
+from qgreenland.constants.project import PERSISTENT_SHELL
+from qgreenland.util.ledger import record_command_usage
 from qgreenland.util.runtime_vars import EvalStr
 
 logger = logging.getLogger("luigi-interface")
 
+# Commands containing any of these characters are run in a shell. Some of them
+# (e.g. `*` in a quoted SQL statement) don't always need one, but running such
+# a command in a shell is always correct.
+SHELL_CHARS = frozenset("|&;<>()$`\\*?[]{}~!#\n")
+ENV_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
 
 def interpolate_args(
     args: Sequence[EvalStr],
@@ -16,29 +35,69 @@ def interpolate_args(
     return [arg.eval(**kwargs) for arg in args]
 
 
-def run_qgr_command(args: list[str]):
-    """Run a command in the `qgreenland-cmd` environment."""
-    cmd = [".", "activate", "qgreenland-cmd", "&&"]
-    cmd.extend(args)
+@functools.cache
+def qgr_cmd_environment() -> dict[str, str]:
+    """Resolve the environment variables of the `qgreenland-cmd` environment.
+
+    Activating a conda environment is slow, so we only do it once per process.
+    """
+    start = time.monotonic()
+    result = subprocess.run(
+        ". activate qgreenland-cmd && env -0",
+        shell=True,
+        executable="/bin/bash",
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise exc.QgrSubprocessError(
+            "Failed to activate the `qgreenland-cmd` environment:\n\n"
+            + str(result.stderr, encoding="utf8"),
+        )
+
+    env = dict(
+        var.split("=", 1)
+        for var in str(result.stdout, encoding="utf8").split("\0")
+        if "=" in var
+    )
+    logger.info(
+        "Resolved the `qgreenland-cmd` environment in"
+        f" {time.monotonic() - start:.3f}s",
+    )
+    return env
+
+
+def run_qgr_command(args: list[str], *, env: Optional[dict[str, str]] = None):
+    """Run a command in the `qgreenland-cmd` environment.
 
-    run_cmd(cmd)
+    `env` is added to the environment.
+    """
+    run_cmd(args, env={**qgr_cmd_environment(), **(env or {})})
 
 
-def run_cmd(args: list[str]):
-    """Run a command and log it."""
-    # Hack. The activation of a conda environment does not work as a list.
-    # `subprocess.run(..., shell=True, ...)` enables running commands from
-    # strings.
+def run_cmd(args: list[str], *, env: Optional[dict[str, str]] = None):
+    """Run a command and log it.
+
+    The command is exec'd directly if possible, otherwise it's run in a shell.
+    The arguments are always interpreted as a shell would, e.g. `['"a b"']` is
+    a single argument `a b`.
+    """
     cmd_str = " ".join(str(arg) for arg in args)
 
     logger.info("Running command:")
     logger.info(cmd_str)
-    result = subprocess.run(
-        cmd_str,
-        shell=True,
-        executable="/bin/bash",
-        capture_output=True,
-    )
+
+    start = time.monotonic()
+    argv = _direct_argv(cmd_str)
+    if argv is not None:
+        mode = "exec"
+        result = _exec(argv, env=env)
+    elif PERSISTENT_SHELL:
+        mode = "persistent shell"
+        result = _shell_worker(env).run(cmd_str)
+    else:
+        mode = "shell"
+        result = _run_measured(cmd_str, shell=True, env=env)
+    logger.info(f"Command finished in {time.monotonic() - start:.3f}s ({mode})")
 
     if result.returncode != 0:
         stdout = str(result.stdout, encoding="utf8")
@@ -49,3 +108,170 @@ def run_cmd(args: list[str]):
         )
 
     return result
+
+
+def _direct_argv(cmd_str: str) -> Optional[list[str]]:
+    """Split `cmd_str` in to arguments, or `None` if it requires a shell.
+
+    Leading `KEY=VALUE` environment variable assignments are kept.
+    """
+    if SHELL_CHARS.intersection(cmd_str):
+        return None
+
+    try:
+        argv = shlex.split(cmd_str)
+    except ValueError:
+        return None
+
+    if all(ENV_ASSIGNMENT.match(arg) for arg in argv):
+        return None
+
+    return argv
+
+
+def _exec(argv: list[str], *, env: Optional[dict[str, str]]):
+    env = dict(os.environ if env is None else env)
+    while ENV_ASSIGNMENT.match(argv[0]):
+        key, value = argv.pop(0).split("=", 1)
+        env[key] = value
+
+    try:
+        return _run_measured(argv, env=env)
+    except FileNotFoundError as e:
+        raise exc.QgrSubprocessError(f"Command not found: {argv[0]}") from e
+
+
+def _run_measured(
+    args: Union[str, list[str]],
+    *,
+    env: Optional[dict[str, str]],
+    shell: bool = False,
+) -> subprocess.CompletedProcess:
+    """Like `subprocess.run(..., capture_output=True)`, recording resource usage.
+
+    Output is captured in temporary files instead of pipes, so we can wait for
+    the process with `wait4` without risking a deadlock.
+    """
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            args,
+            shell=shell,
+            executable="/bin/bash" if shell else None,
+            stdout=stdout,
+            stderr=stderr,
+            env=env,
+        )
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        record_command_usage(rusage)
+
+        stdout.seek(0)
+        stderr.seek(0)
+        return subprocess.CompletedProcess(
+            args=args,
+            returncode=process.returncode,
+            stdout=stdout.read(),
+            stderr=stderr.read(),
+        )
+
+
+class _ShellWorker:
+    """A long-lived process which runs one shell command at a time.
+
+    Each command is run in a new bash process, so e.g. `cd` or `export` in one
+    command do not affect the next. Bash is started by the small
+    `shell_worker.py` process instead of the (much larger) process running
+    tasks, which also reports each command's resource usage for the run ledger.
+    """
+
+    SCRIPT = str(Path(__file__).with_name("shell_worker.py"))
+
+    def __init__(self, env: Optional[dict[str, str]]):
+        self.env = env
+        self.pid = os.getpid()
+        self._process = subprocess.Popen(
+            # Isolated, so the `qgreenland-cmd` environment's Python settings
+            # don't affect the worker.
+            [sys.executable, "-I", self.SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            text=True,
+        )
+
+    def run(self, cmd_str: str) -> subprocess.CompletedProcess:
+        assert self._process.stdin is not None
+        assert self._process.stdout is not None
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stdout_path = Path(tmp_dir) / "stdout"
+            stderr_path = Path(tmp_dir) / "stderr"
+            request = {
+                "cmd": cmd_str,
+                "stdout": str(stdout_path),
+                "stderr": str(stderr_path),
+            }
+            try:
+                self._process.stdin.write(json.dumps(request) + "\n")
+                self._process.stdin.flush()
+                line = self._process.stdout.readline()
+            except BrokenPipeError:
+                line = ""
+            if not line:
+                raise exc.QgrSubprocessError(
+                    f"Persistent shell exited unexpectedly running: {cmd_str}",
+                )
+
+            response = json.loads(line)
+            record_command_usage(
+                resource.struct_rusage(response["rusage"]),
+                reaped=False,
+            )
+            return subprocess.CompletedProcess(
+                args=cmd_str,
+                returncode=response["returncode"],
+                stdout=stdout_path.read_bytes(),
+                stderr=stderr_path.read_bytes(),
+            )
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def close(self) -> None:
+        """Stop the worker, if it was started by this process."""
+        if self.pid != os.getpid():
+            return
+
+        assert self._process.stdin is not None
+        with contextlib.suppress(BrokenPipeError):
+            self._process.stdin.close()
+        self._process.wait()
+
+
+# At most this many persistent shell workers, one per environment, are kept by
+# each process. The least recently used is closed to start another.
+MAX_SHELL_WORKERS = 2
+
+# Least recently used first.
+_shell_workers: dict[Optional[tuple], _ShellWorker] = {}
+
+
+def _shell_worker(env: Optional[dict[str, str]]) -> _ShellWorker:
+    """Get a persistent shell worker for this process and environment.
+
+    Workers started by a parent process are not reused after forking.
+    """
+    key = None if env is None else tuple(sorted(env.items()))
+    worker = _shell_workers.pop(key, None)
+    if worker is not None and (worker.pid != os.getpid() or not worker.alive):
+        worker.close()
+        worker = None
+    if worker is None:
+        worker = _ShellWorker(env)
+    _shell_workers[key] = worker
+
+    while len(_shell_workers) > MAX_SHELL_WORKERS:
+        _shell_workers.pop(next(iter(_shell_workers))).close()
+
+    return worker
@@ -1,14 +1,37 @@
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+import sys
 from functools import cache
 from pathlib import Path
+from typing import Any, Optional
 
 import qgreenland.exceptions as exc
-from qgreenland.config.project import project
+from qgreenland import __version__
+from qgreenland.constants.paths import (
+    ASSETS_DIR,
+    CONFIG_CACHE_DIR,
+    PACKAGE_DIR,
+    STYLES_DIR,
+)
+from qgreenland.constants.project import CONFIG_CACHE
 from qgreenland.models.config import Config
 from qgreenland.models.config.dataset import Dataset
+from qgreenland.models.config.project import Project
 from qgreenland.util.misc import find_duplicates
-from qgreenland.util.module import load_objects_from_paths_by_class
+from qgreenland.util.module import ModuleObjects, load_objects_from_paths_by_class
 from qgreenland.util.tree import LayerNode, layer_tree
 
+logger = logging.getLogger("luigi-interface")
+
+# The number of compiled configs kept, e.g. for different `--include` patterns.
+CONFIG_CACHE_SIZE = 8
+
+TEST_DIR = PACKAGE_DIR / "test"
+
 
 def _get_python_module_filepaths(the_dir: Path) -> list[Path]:
     """Return non-dunder python modules found in `the_dir`."""
@@ -24,13 +47,21 @@ def _get_python_module_filepaths(the_dir: Path) -> list[Path]:
     ]
 
 
-def compile_datasets_cfg(config_dir: Path) -> dict[str, Dataset]:
-    """Find and return all datasets in "`config_dir`/datasets"."""
+def compile_datasets_cfg(
+    config_dir: Path,
+    *,
+    module_objects: Optional[ModuleObjects] = None,
+) -> dict[str, Dataset]:
+    """Find and return all datasets in "`config_dir`/datasets".
+
+    See `load_objects_from_paths_by_class` for `module_objects`.
+    """
     datasets_dir = config_dir / "datasets"
     dataset_fps = _get_python_module_filepaths(datasets_dir)
     datasets = load_objects_from_paths_by_class(
         dataset_fps,
         target_class=Dataset,
+        module_objects=module_objects,
     )
 
     duplicates = find_duplicates(d.id for d in datasets)
@@ -49,6 +80,47 @@ def compile_cfg(
     include_patterns: tuple[str, ...] = (),
     exclude_patterns: tuple[str, ...] = (),
     exclude_manual_assets: bool = False,
+    use_cache: bool = CONFIG_CACHE,
+    cache_dir: Path = CONFIG_CACHE_DIR,
+) -> Config:
+    """Compile the config in `config_dir`.
+
+    If `use_cache`, a config compiled earlier is read from `cache_dir` instead,
+    if nothing it depends on (see `config_cache_key`) has changed since.
+    """
+    kwargs: dict[str, Any] = {
+        "include_patterns": include_patterns,
+        "exclude_patterns": exclude_patterns,
+        "exclude_manual_assets": exclude_manual_assets,
+    }
+    if not use_cache:
+        return compile_cfg_uncached(config_dir, **kwargs)
+
+    cache_fp = cache_dir / f"{config_cache_key(config_dir, **kwargs)}.pickle"
+    if (cached := _read_cached_cfg(cache_fp)) is not None:
+        return cached
+
+    config = compile_cfg_uncached(config_dir, **kwargs)
+    _write_cached_cfg(config, cache_fp)
+    return config
+
+
+def _current_project() -> Project:
+    """Import the project config when compiling, rather than once.
+
+    `IncrementalConfigCompiler` drops a changed project module from
+    `sys.modules`, so it's executed again here.
+    """
+    return importlib.import_module("qgreenland.config.project").project
+
+
+def compile_cfg_uncached(
+    config_dir: Path,
+    *,
+    include_patterns: tuple[str, ...],
+    exclude_patterns: tuple[str, ...],
+    exclude_manual_assets: bool,
+    module_objects: Optional[ModuleObjects] = None,
 ) -> Config:
     try:
         compiled_layer_tree = layer_tree(
@@ -56,6 +128,7 @@ def compile_cfg(
             include_patterns=include_patterns,
             exclude_patterns=exclude_patterns,
             exclude_manual_assets=exclude_manual_assets,
+            module_objects=module_objects,
         )
         leaves = compiled_layer_tree.leaves
 
@@ -67,10 +140,96 @@ def compile_cfg(
         layers_dict = {node.layer_cfg.id: node.layer_cfg for node in leaves}
 
         return Config(
-            project=project,
+            project=_current_project(),
             layers=layers_dict,
-            datasets=compile_datasets_cfg(config_dir),
+            datasets=compile_datasets_cfg(config_dir, module_objects=module_objects),
             layer_tree=compiled_layer_tree,
         )
     except Exception as e:
         raise exc.QgrConfigCompileError(f"Failed to compile config. {e}") from e
+
+
+def config_cache_key(
+    config_dir: Path,
+    *,
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+    exclude_manual_assets: bool = False,
+) -> str:
+    """Fingerprint everything compiling the config in `config_dir` depends on.
+
+    That's the compile options, the package and Python versions, the contents
+    of the config and package Python modules (which define the compiled
+    classes), and the modification times and sizes of everything else in the
+    config directory, assets, and styles.
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            [
+                __version__,
+                sys.version,
+                str(config_dir),
+                include_patterns,
+                exclude_patterns,
+                exclude_manual_assets,
+            ],
+        ).encode(),
+    )
+
+    for fp in _config_cache_inputs(config_dir):
+        digest.update(f"{fp}\0".encode())
+        if fp.suffix == ".py":
+            digest.update(fp.read_bytes())
+        else:
+            stat = fp.stat()
+            digest.update(f"{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+
+    return digest.hexdigest()
+
+
+def _config_cache_inputs(config_dir: Path) -> list[Path]:
+    package_modules = (
+        fp for fp in PACKAGE_DIR.glob("**/*.py") if TEST_DIR not in fp.parents
+    )
+    data_files = (
+        fp
+        for data_dir in (config_dir, ASSETS_DIR, STYLES_DIR)
+        for fp in data_dir.glob("**/*")
+        if fp.is_file() and "__pycache__" not in fp.parts
+    )
+
+    return sorted({*package_modules, *data_files})
+
+
+def _read_cached_cfg(cache_fp: Path) -> Optional[Config]:
+    try:
+        with open(cache_fp, "rb") as cache_file:
+            config = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to read cached config {cache_fp}: {e}")
+        return None
+
+    return config if isinstance(config, Config) else None
+
+
+def _write_cached_cfg(config: Config, cache_fp: Path) -> None:
+    """Cache `config`, keeping only the most recently written configs."""
+    try:
+        cache_fp.parent.mkdir(parents=True, exist_ok=True)
+        temp_fp = cache_fp.with_name(f"{cache_fp.name}.{os.getpid()}.tmp")
+        with open(temp_fp, "wb") as cache_file:
+            pickle.dump(config, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_fp.replace(cache_fp)
+
+        cached_fps = sorted(
+            cache_fp.parent.glob("*.pickle"),
+            key=lambda fp: fp.stat().st_mtime,
+            reverse=True,
+        )
+        for stale_fp in cached_fps[CONFIG_CACHE_SIZE:]:
+            stale_fp.unlink(missing_ok=True)
+    except OSError as e:
+        logger.info(f"Not caching the compiled config: {e}")
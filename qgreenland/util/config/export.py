@@ -47,13 +47,13 @@ def export_config_manifest(
         "layers": [
             {
                 # ID first for readability
-                "id": layer_node.layer_cfg.id,
+                "id": layer_id,
                 **layer_node.layer_cfg.dict(include={"title", "description", "tags"}),
-                "hierarchy": layer_node.group_name_path,
+                "hierarchy": cfg.layer_group_paths[layer_id],
                 "layer_details": build_layer_metadata(layer_node.layer_cfg),
                 "assets": _layer_manifest_final_assets(layer_node),
             }
-            for layer_node in cfg.layer_tree.leaves
+            for layer_id, layer_node in cfg.layer_nodes.items()
             # For now, do not include online layers in the layer manifest. The
             # `QGreenland Custom` QGIS Plugin does not currently support online
             # layers. Once online layers are supported in the plugin, this `if`
@@ -76,8 +76,9 @@ def export_config_csv(
     calculate their size on disk.
     """
     report = []
-    for layer_node in cfg.layer_tree.leaves:
+    for layer_id, layer_node in cfg.layer_nodes.items():
         layer_cfg = layer_node.layer_cfg
+        group_path = cfg.layer_group_paths[layer_id]
 
         if not layer_cfg.in_package:
             continue
@@ -97,8 +98,8 @@ def export_config_csv(
 
         report.append(
             {
-                "Group": layer_node.group_name_path[0],
-                "Subgroup": "/".join(layer_node.group_name_path[1:]),
+                "Group": group_path[0],
+                "Subgroup": "/".join(group_path[1:]),
                 "Layer Title": layer_cfg.title,
                 "Layer Description": layer_cfg.description,
                 "Vector or Raster": layer_type,
@@ -0,0 +1,183 @@
+"""Recompile the config, executing only the modules which changed.
+
+Layer and dataset modules are executed by path, but import the modules they
+depend on (datasets, helpers, the project) by name. `module_dependencies` maps
+which config modules import which, by parsing their imports, so when a module
+changes, it and every module which depends on it are executed again. The
+objects found in every other module are reused.
+
+Changes to modules outside the config directory (e.g. models) aren't detected;
+start again to pick them up.
+"""
+import ast
+import hashlib
+import logging
+import sys
+from pathlib import Path
+from typing import Optional
+
+from qgreenland.models.config import Config
+from qgreenland.util.config.compile import compile_cfg_uncached
+from qgreenland.util.module import ModuleObjects
+
+logger = logging.getLogger("luigi-interface")
+
+# Config module dependencies: the config modules each config module imports.
+Dependencies = dict[Path, set[Path]]
+
+
+def config_module_fps(config_dir: Path) -> list[Path]:
+    return sorted(
+        fp for fp in config_dir.glob("**/*.py") if "__pycache__" not in fp.parts
+    )
+
+
+def module_dependencies(module_fps: list[Path]) -> Dependencies:
+    """Map each of `module_fps` to the modules among `module_fps` it imports."""
+    known = set(module_fps)
+    return {fp: module_imports(fp) & known for fp in module_fps}
+
+
+def module_imports(module_fp: Path) -> set[Path]:
+    """Find the files of the modules `module_fp` imports, where they exist.
+
+    Both `import a.b` and `from a import b` (where `b` may be a module or an
+    object in `a`) are resolved against `sys.path`.
+    """
+    tree = ast.parse(module_fp.read_bytes(), filename=str(module_fp))
+
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = _absolute_module_name(node, module_fp=module_fp)
+            names.add(base)
+            names.update(f"{base}.{alias.name}" for alias in node.names)
+
+    return {fp for name in names if (fp := _module_fp(name)) is not None}
+
+
+def _absolute_module_name(node: ast.ImportFrom, *, module_fp: Path) -> str:
+    if not node.level:
+        return node.module or ""
+
+    package = _module_name(module_fp).split(".")[: -node.level]
+    return ".".join([*package, *([node.module] if node.module else [])])
+
+
+def _module_fp(name: str) -> Optional[Path]:
+    """Find the file of the module `name` on `sys.path`, without importing it."""
+    parts = name.split(".")
+    for root in sys.path:
+        module_dir = Path(root or ".").joinpath(*parts)
+        for fp in (module_dir.with_suffix(".py"), module_dir / "__init__.py"):
+            if fp.is_file():
+                return fp.resolve()
+
+    return None
+
+
+def _module_name(module_fp: Path) -> str:
+    """Find the name `module_fp` is imported as, from the longest `sys.path` root."""
+    module_fp = module_fp.resolve()
+    roots = [
+        Path(root or ".").resolve()
+        for root in sys.path
+        if Path(root or ".").resolve() in module_fp.parents
+    ]
+    if not roots:
+        return module_fp.stem
+
+    parts = module_fp.relative_to(max(roots, key=lambda r: len(r.parts))).parts
+    parts = (*parts[:-1], Path(parts[-1]).stem)
+    return ".".join(parts[:-1] if parts[-1] == "__init__" else parts)
+
+
+def dependents(changed: set[Path], dependencies: Dependencies) -> set[Path]:
+    """Find `changed` and every module which depends on them, transitively."""
+    importers: dict[Path, set[Path]] = {}
+    for fp, imported in dependencies.items():
+        for imported_fp in imported:
+            importers.setdefault(imported_fp, set()).add(fp)
+
+    found = set(changed)
+    queue = list(changed)
+    while queue:
+        for importer in importers.get(queue.pop(), ()):
+            if importer not in found:
+                found.add(importer)
+                queue.append(importer)
+
+    return found
+
+
+class IncrementalConfigCompiler:
+    """Compile the config in `config_dir`, then recompile only what changed."""
+
+    def __init__(
+        self,
+        config_dir: Path,
+        *,
+        include_patterns: tuple[str, ...] = (),
+        exclude_patterns: tuple[str, ...] = (),
+        exclude_manual_assets: bool = False,
+    ):
+        self.config_dir = config_dir.resolve()
+        self.include_patterns = include_patterns
+        self.exclude_patterns = exclude_patterns
+        self.exclude_manual_assets = exclude_manual_assets
+
+        self._module_objects: ModuleObjects = {}
+        self._digests: dict[Path, str] = {}
+        self._dependencies: Dependencies = {}
+        # Before the first compile, imported config modules are current.
+        self._first = True
+        self.executed: set[Path] = set()
+        """Modules executed again by the latest `compile`."""
+
+    def compile(self) -> Config:
+        """Compile the config, executing only modules which changed since last time.
+
+        Modules which depend on changed modules are executed again too.
+        """
+        module_fps = config_module_fps(self.config_dir)
+        digests = {fp: hashlib.sha256(fp.read_bytes()).hexdigest() for fp in module_fps}
+        changed = {
+            fp
+            for fp in digests.keys() | self._digests.keys()
+            if digests.get(fp) != self._digests.get(fp)
+        }
+
+        # Dependencies may have changed too, so look for dependents with both.
+        dependencies = {
+            fp: deps
+            for fp, deps in self._dependencies.items()
+            if fp in digests and fp not in changed
+        }
+        dependencies.update(module_dependencies(sorted(changed & digests.keys())))
+        stale = dependents(changed, {**self._dependencies, **dependencies})
+
+        for fp in stale:
+            self._module_objects.pop(fp, None)
+            if not self._first:
+                # Imported by name, so `import` would find the stale module.
+                sys.modules.pop(_module_name(fp), None)
+        self._first = False
+
+        # Only keep what's successfully compiled, so failed modules are
+        # executed again next time.
+        self._digests = {fp: d for fp, d in self._digests.items() if fp not in stale}
+        config = compile_cfg_uncached(
+            self.config_dir,
+            include_patterns=self.include_patterns,
+            exclude_patterns=self.exclude_patterns,
+            exclude_manual_assets=self.exclude_manual_assets,
+            module_objects=self._module_objects,
+        )
+
+        self._digests = digests
+        self._dependencies = dependencies
+        self.executed = {fp for fp in stale if fp in self._module_objects}
+        logger.info(f"Executed {len(self.executed)} changed config modules")
+        return config
@@ -0,0 +1,114 @@
+"""Content-addressed keys for pipeline step outputs.
+
+A step's key is a hash of everything that determines its output: the evaluated
+step configuration, the key of the step before it, and, for the first step, the
+fingerprint of the layer's input asset. If any of those change, the key changes
+and the step's old output directory is no longer considered complete.
+"""
+import hashlib
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+from qgreenland.models.config.asset import AnyAsset
+from qgreenland.models.config.dataset import Dataset
+from qgreenland.models.config.layer import Layer
+from qgreenland.models.config.step import AnyStep
+from qgreenland.util.json import MagicJSONEncoder
+from qgreenland.util.runtime_vars import EvalPath, EvalStr
+
+# Bump this to invalidate all existing step outputs, e.g. if the way steps are
+# run changes in a way that is not represented in the configuration.
+FINGERPRINT_VERSION = 1
+
+# Fields which don't affect outputs: `resource_class` only affects how a step is
+# scheduled, and `sha256` only verifies an asset's files.
+NON_OUTPUT_FIELDS = frozenset({"resource_class", "sha256", "stream"})
+
+
+def _hash(thing: Any) -> str:
+    serialized = json.dumps(thing, cls=MagicJSONEncoder, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _fields(model: BaseModel, *, exclude: frozenset[str] = frozenset()) -> dict:
+    """Recursively serialize only the fields of `model`.
+
+    Unlike `model.dict()`, this ignores cached properties (e.g. `provenance`)
+    which pydantic stores alongside fields once they have been accessed.
+    """
+
+    def _serialize(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return _fields(value)
+        if isinstance(value, dict):
+            return {k: _serialize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [_serialize(v) for v in value]
+        return value
+
+    return {
+        name: _serialize(getattr(model, name))
+        for name in model.__fields__
+        if name not in exclude and name not in NON_OUTPUT_FIELDS
+    }
+
+
+def _evaluated(value: Any) -> Any:
+    """Recursively evaluate runtime variables in `value`.
+
+    `{input_dir}` and `{output_dir}` are left as-is; they are determined by the
+    fingerprint itself.
+    """
+    if isinstance(value, (EvalStr, EvalPath)):
+        return str(value.eval())
+    if isinstance(value, dict):
+        return {k: _evaluated(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_evaluated(v) for v in value]
+    return value
+
+
+def asset_fingerprint(*, dataset_cfg: Dataset, asset_cfg: AnyAsset) -> str:
+    """Identify the fetched asset by its configuration.
+
+    The fetched files themselves are not inspected, because this fingerprint
+    must be known before the asset is fetched.
+    """
+    return _hash(
+        {
+            "version": FINGERPRINT_VERSION,
+            "dataset_id": dataset_cfg.id,
+            "asset": _fields(asset_cfg),
+        }
+    )
+
+
+def step_fingerprint(step: AnyStep, *, upstream: str) -> str:
+    """Identify a step's output by its evaluated configuration and its input.
+
+    The step `id` is excluded; it's only a human-readable label.
+    """
+    step_cfg = _fields(step, exclude=frozenset({"id"}))
+    return _hash(
+        {
+            "step": _evaluated(step_cfg),
+            "upstream": upstream,
+        }
+    )
+
+
+def layer_step_fingerprints(layer_cfg: Layer) -> list[str]:
+    """Calculate the fingerprint of each of `layer_cfg`'s steps, in order."""
+    fingerprints: list[str] = []
+    upstream = asset_fingerprint(
+        dataset_cfg=layer_cfg.input.dataset,
+        asset_cfg=layer_cfg.input.asset,
+    )
+
+    for step in layer_cfg.steps or []:
+        upstream = step_fingerprint(step, upstream=upstream)
+        fingerprints.append(upstream)
+
+    return fingerprints
@@ -0,0 +1,149 @@
+"""A process-wide pool of logged-in FTP connections, per host.
+
+Reusing a control connection avoids connecting and logging in again for every
+file, which dominates the time taken to fetch many small files from one host.
+Each transfer still opens its own (passive mode) data connection, as FTP
+requires.
+
+Like HTTP sessions (see `qgreenland.util.session`), connections are never
+shared between processes. With more than one worker, Luigi runs each task in
+its own process, so connections are only reused within a task (e.g. between
+the files of one asset, or retries). Fetches of many single-file assets from
+one host only share connections with `--workers 1`.
+
+Idle connections are logged out of (with `QUIT`) when the process exits, or
+with `close_idle_connections`.
+"""
+import atexit
+import ftplib
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import unquote, urlsplit
+
+from qgreenland.constants.project import REQUEST_TIMEOUT
+
+logger = logging.getLogger("luigi-interface")
+
+# The number of idle connections kept open per host.
+POOL_MAXSIZE = 4
+
+_Key = tuple[int, str, int, str]
+
+_idle: dict[_Key, list[ftplib.FTP]] = {}
+_logins: Counter[_Key] = Counter()
+_transfers: Counter[_Key] = Counter()
+_lock = threading.Lock()
+
+
+def _key(url: str) -> _Key:
+    parts = urlsplit(url)
+    return (
+        os.getpid(),
+        parts.hostname or "",
+        parts.port or ftplib.FTP_PORT,
+        unquote(parts.username or "anonymous"),
+    )
+
+
+def ftp_path(url: str) -> str:
+    return unquote(urlsplit(url).path)
+
+
+@contextmanager
+def ftp_connection(url: str) -> Iterator[ftplib.FTP]:
+    """Borrow a logged-in connection to the host of `url`.
+
+    The connection is returned to the pool if the block succeeds, and closed
+    otherwise, since its state is unknown.
+    """
+    key = _key(url)
+    ftp = _take_idle(key) or _login(url, key=key)
+
+    try:
+        yield ftp
+    except BaseException:
+        ftp.close()
+        raise
+
+    with _lock:
+        _transfers[key] += 1
+        idle = _idle.setdefault(key, [])
+        if len(idle) < POOL_MAXSIZE:
+            idle.append(ftp)
+            return
+
+    ftp.close()
+
+
+def _take_idle(key: _Key) -> Optional[ftplib.FTP]:
+    while True:
+        with _lock:
+            idle = _idle.get(key)
+            if not idle:
+                return None
+            ftp = idle.pop()
+
+        # The server may have closed the connection while it was idle.
+        try:
+            ftp.voidcmd("NOOP")
+        except (ftplib.Error, OSError, EOFError):
+            ftp.close()
+            continue
+
+        return ftp
+
+
+def _login(url: str, *, key: _Key) -> ftplib.FTP:
+    parts = urlsplit(url)
+    _, host, port, user = key
+
+    ftp = ftplib.FTP(timeout=REQUEST_TIMEOUT)
+    try:
+        ftp.connect(host, port)
+        ftp.login(user, unquote(parts.password or "anonymous@"))
+        # All transfers are binary; set once instead of per transfer.
+        ftp.voidcmd("TYPE I")
+    except BaseException:
+        ftp.close()
+        raise
+
+    with _lock:
+        _logins[key] += 1
+
+    return ftp
+
+
+def log_ftp_stats() -> None:
+    """Log how well this process's FTP connections were reused."""
+    pid = os.getpid()
+    with _lock:
+        for key in sorted(_logins.keys() | _transfers.keys()):
+            key_pid, host, port, user = key
+            if key_pid != pid:
+                continue
+
+            logger.info(
+                f"FTP connections to {user}@{host}:{port}: {_transfers[key]}"
+                f" transfers over {_logins[key]} logins",
+            )
+
+
+def close_idle_connections() -> None:
+    """Log out of this process's idle connections."""
+    pid = os.getpid()
+    with _lock:
+        keys = [key for key in _idle if key[0] == pid]
+        idle = [ftp for key in keys for ftp in _idle.pop(key)]
+
+    for ftp in idle:
+        try:
+            ftp.quit()
+        except (ftplib.Error, OSError, EOFError):
+            ftp.close()
+
+
+atexit.register(close_idle_connections)
@@ -0,0 +1,62 @@
+"""Tune GDAL's threading and block cache to the machine and number of workers.
+
+GDAL defaults to a single thread and a block cache of 5% of memory. Instead,
+each step shares the machine's cores and a fraction of its memory evenly with
+the other Luigi workers. Steps can override these settings with their own
+GDAL configuration options (e.g. `PythonStep.config_options`, or
+`--config GDAL_NUM_THREADS 1` in a `CommandStep`'s arguments).
+
+The settings used are recorded in each step's output directory, so they can be
+included in the layer's provenance.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from qgreenland.util.machine import machine_cpu_count, machine_memory_bytes
+
+# Set by `qgreenland run` so worker processes know how many workers share the
+# machine.
+WORKERS_ENVVAR = "QGR_LUIGI_WORKERS"
+
+# Hidden, so it isn't matched by globs like `{input_dir}/*` in later steps.
+GDAL_SETTINGS_FILENAME = ".gdal-settings.json"
+
+# The fraction of memory shared between all workers' GDAL block caches.
+CACHE_MEMORY_FRACTION = 0.5
+MIN_CACHE_MB = 64
+
+
+def active_workers() -> int:
+    return int(os.environ.get(WORKERS_ENVVAR, 1))
+
+
+def gdal_settings(*, workers: Optional[int] = None) -> dict[str, str]:
+    """Calculate GDAL configuration options for one of `workers` concurrent steps.
+
+    Defaults to the number of workers of the current run.
+    """
+    workers = max(1, workers or active_workers())
+    cache_bytes = machine_memory_bytes() * CACHE_MEMORY_FRACTION / workers
+
+    return {
+        "GDAL_NUM_THREADS": str(max(1, machine_cpu_count() // workers)),
+        # Megabytes.
+        "GDAL_CACHEMAX": str(max(MIN_CACHE_MB, int(cache_bytes // 2**20))),
+    }
+
+
+def write_gdal_settings(settings: dict[str, str], *, output_dir: Path) -> None:
+    with open(output_dir / GDAL_SETTINGS_FILENAME, "w") as settings_file:
+        json.dump(settings, settings_file, sort_keys=True)
+
+
+def read_gdal_settings(step_dir: Path) -> Optional[dict[str, str]]:
+    """Read the settings a step was run with, if they were recorded."""
+    settings_fp = step_dir / GDAL_SETTINGS_FILENAME
+    if not settings_fp.is_file():
+        return None
+
+    with open(settings_fp) as settings_file:
+        return json.load(settings_file)
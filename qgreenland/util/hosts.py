@@ -0,0 +1,271 @@
+"""Retry transient failures politely, and pause hosts which keep failing.
+
+Requests which fail transiently (dropped connections, timeouts, 429s and 5xxs)
+are retried with exponential backoff and full jitter, so workers retrying at
+the same time don't hit a struggling host in lockstep. After
+`BREAKER_THRESHOLD` consecutive failures, a host's circuit breaker opens:
+requests to that host, from any worker process, wait until
+`BREAKER_COOLDOWN_SECONDS` have passed, while fetches from other hosts carry on.
+
+How many assets are fetched from each host at once is limited separately, by
+the Luigi scheduler; see `qgreenland.util.luigi.resources.fetch_resources`.
+
+Requests, retries and throughput are counted per host, saved by each fetch task
+and summarized at the end of a run; see `host_stats_summary`.
+"""
+import fcntl
+import ftplib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Mapping, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+
+import qgreenland.exceptions as exc
+from qgreenland.constants.paths import FETCH_HOSTS_DIR
+
+logger = logging.getLogger("luigi-interface")
+
+T = TypeVar("T")
+
+# Attempts per request, including the first.
+RETRY_ATTEMPTS = 6
+
+# The delay before the nth retry is random, up to `BASE * 2**(n - 1)` seconds.
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Consecutive failures in a process before a host is paused, and for how long.
+BREAKER_THRESHOLD = 4
+BREAKER_COOLDOWN_SECONDS = 60.0
+
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    ftplib.error_temp,
+    # Raised by `ftplib` when the server closes the connection.
+    EOFError,
+    socket.timeout,
+    ConnectionError,
+    exc.QgrTransientError,
+)
+
+HOST_STATS_FILENAME = "stats.jsonl"
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    """Time spent transferring `bytes`, summed over concurrent transfers."""
+
+    def add(self, other: "HostStats") -> None:
+        self.requests += other.requests
+        self.retries += other.retries
+        self.failures += other.failures
+        self.bytes += other.bytes
+        self.seconds += other.seconds
+
+
+_stats: dict[str, HostStats] = {}
+_consecutive_failures: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).hostname or url
+
+
+def check_status(resp: requests.Response) -> None:
+    """Raise `QgrTransientError` if `resp` is worth retrying."""
+    if resp.status_code not in TRANSIENT_STATUS_CODES:
+        return
+
+    resp.close()
+    error = exc.QgrTransientError(f"Received '{resp.status_code}' from {resp.url}.")
+    if (retry_after := resp.headers.get("retry-after", "")).isdigit():
+        error.retry_after = float(retry_after)
+    raise error
+
+
+def backoff_seconds(attempt: int, *, retry_after: Optional[float] = None) -> float:
+    """How long to wait after failed `attempt` (from 1) before trying again.
+
+    A server's `Retry-After` is respected, up to `BACKOFF_MAX_SECONDS`.
+    """
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX_SECONDS)
+
+    return random.uniform(
+        0,
+        min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)),
+    )
+
+
+def with_retries(
+    url: str,
+    func: Callable[[], T],
+    *,
+    description: str = "Request",
+    attempts: int = RETRY_ATTEMPTS,
+) -> T:
+    """Call `func`, which requests `url`, retrying if it fails transiently."""
+    host = host_of(url)
+    attempt = 1
+    while True:
+        wait_for_host(host)
+        with _lock:
+            _stats.setdefault(host, HostStats()).requests += 1
+
+        try:
+            result = func()
+        except TRANSIENT_ERRORS as e:
+            _record_failure(host)
+            if attempt >= attempts:
+                raise
+
+            retry_after = getattr(e, "retry_after", None)
+            delay = backoff_seconds(attempt, retry_after=retry_after)
+            logger.warning(
+                f"{description} of {url} failed (attempt {attempt}/{attempts});"
+                f" retrying in {delay:.1f}s: {e}",
+            )
+            with _lock:
+                _stats[host].retries += 1
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        with _lock:
+            _consecutive_failures[host] = 0
+        return result
+
+
+def record_transfer(url: str, *, nbytes: int, seconds: float) -> None:
+    with _lock:
+        stats = _stats.setdefault(host_of(url), HostStats())
+        stats.bytes += nbytes
+        stats.seconds += seconds
+
+
+def _record_failure(host: str) -> None:
+    with _lock:
+        _stats.setdefault(host, HostStats()).failures += 1
+        failures = _consecutive_failures.get(host, 0) + 1
+        _consecutive_failures[host] = failures
+
+    # Once open, the circuit stays half-open: every further failure before a
+    # success pauses the host again.
+    if failures >= BREAKER_THRESHOLD:
+        _pause_host(host, failures=failures)
+
+
+def _paused_fp(host: str) -> Path:
+    return FETCH_HOSTS_DIR / f"{host}.paused"
+
+
+def _pause_host(host: str, *, failures: int) -> None:
+    logger.warning(
+        f"Pausing requests to {host} for {BREAKER_COOLDOWN_SECONDS:.0f}s after"
+        f" {failures} consecutive failures",
+    )
+    paused_fp = _paused_fp(host)
+    paused_fp.parent.mkdir(parents=True, exist_ok=True)
+    temp_fp = paused_fp.with_name(f"{paused_fp.name}.{os.getpid()}.tmp")
+    temp_fp.write_text(str(time.time() + BREAKER_COOLDOWN_SECONDS))
+    temp_fp.replace(paused_fp)
+
+
+def paused_until(host: str) -> Optional[float]:
+    """Find the time until which `host` is paused by any process, if it is."""
+    try:
+        until = float(_paused_fp(host).read_text())
+    except (OSError, ValueError):
+        return None
+
+    return until if until > time.time() else None
+
+
+def wait_for_host(host: str) -> None:
+    if (until := paused_until(host)) is None:
+        return
+
+    logger.info(f"Waiting {until - time.time():.0f}s for {host} to be unpaused")
+    time.sleep(max(0.0, until - time.time()))
+
+
+def save_host_stats(run_id: Optional[str]) -> None:
+    """Save, then reset, this process's host statistics for run `run_id`.
+
+    Statistics are only saved if there's a run to summarize them for.
+    """
+    with _lock:
+        stats = dict(_stats)
+        _stats.clear()
+
+    if run_id is None or not stats:
+        return
+
+    stats_fp = FETCH_HOSTS_DIR / HOST_STATS_FILENAME
+    stats_fp.parent.mkdir(parents=True, exist_ok=True)
+    lines = "".join(
+        json.dumps({"run_id": run_id, "host": host, **asdict(host_stats)}) + "\n"
+        for host, host_stats in stats.items()
+    )
+    with open(stats_fp, "a") as stats_file:
+        fcntl.flock(stats_file, fcntl.LOCK_EX)
+        try:
+            stats_file.write(lines)
+        finally:
+            fcntl.flock(stats_file, fcntl.LOCK_UN)
+
+
+def read_host_stats(run_id: str) -> dict[str, HostStats]:
+    """Total the statistics saved by each task of run `run_id`, by host."""
+    stats_fp = FETCH_HOSTS_DIR / HOST_STATS_FILENAME
+    if not stats_fp.is_file():
+        return {}
+
+    totals: dict[str, HostStats] = {}
+    with open(stats_fp) as stats_file:
+        for line in stats_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.pop("run_id") != run_id:
+                continue
+            host = record.pop("host")
+            totals.setdefault(host, HostStats()).add(HostStats(**record))
+
+    return totals
+
+
+def host_stats_summary(stats: Mapping[str, HostStats]) -> str:
+    if not stats:
+        return "No files were fetched over HTTP or FTP."
+
+    lines = ["Fetched from:"]
+    for host, host_stats in sorted(stats.items()):
+        mib = host_stats.bytes / 2**20
+        rate = f"{mib / host_stats.seconds:.1f}" if host_stats.seconds else "-"
+        lines.append(
+            f"  - {host}: {host_stats.requests} requests,"
+            f" {host_stats.retries} retries, {host_stats.failures} failures;"
+            f" {mib:.1f} MiB at {rate} MiB/s per transfer",
+        )
+
+    return "\n".join(lines)
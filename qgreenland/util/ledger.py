@@ -0,0 +1,267 @@
+"""A persistent record of the resources used by each pipeline task.
+
+Entries are appended to `RUN_LEDGER_FP` by Luigi event handlers, which run in
+the same process as the task itself. Use `qgreenland stats` to view them.
+"""
+import fcntl
+import logging
+import resource
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import luigi
+
+from qgreenland.constants.paths import RUN_LEDGER_FP
+from qgreenland.models.ledger import LedgerEntry
+
+logger = logging.getLogger("luigi-interface")
+
+# Peak RSS (KiB) of any command run by the current task. `ru_maxrss` of
+# `RUSAGE_CHILDREN` can't be used; it covers all commands run by this process.
+_command_peak_rss_kb = 0
+
+# CPU seconds of commands run for this process, but not by it.
+_unreaped_command_cpu = {"user": 0.0, "system": 0.0}
+
+# Resource usage snapshots taken when each task started, by task id.
+_task_starts: dict[str, dict[str, Any]] = {}
+
+_run_id: Optional[str] = None
+
+
+def record_command_usage(
+    rusage: resource.struct_rusage,
+    *,
+    reaped: bool = True,
+) -> None:
+    """Record the resource usage of a command run by the current task.
+
+    The CPU time of commands which weren't `reaped` by this process (e.g. run
+    by a persistent shell worker) isn't in its `RUSAGE_CHILDREN`, so is added.
+    """
+    global _command_peak_rss_kb
+    _command_peak_rss_kb = max(_command_peak_rss_kb, rusage.ru_maxrss)
+    if not reaped:
+        _unreaped_command_cpu["user"] += rusage.ru_utime
+        _unreaped_command_cpu["system"] += rusage.ru_stime
+
+
+def enable_run_ledger() -> str:
+    """Record every task completed by this process (and its workers).
+
+    Returns the run id.
+    """
+    global _run_id
+    if _run_id is None:
+        _run_id = datetime.now().isoformat(timespec="seconds")
+        luigi.Task.event_handler(luigi.Event.START)(_on_start)
+        luigi.Task.event_handler(luigi.Event.SUCCESS)(_on_success)
+
+    return _run_id
+
+
+def current_run_id() -> Optional[str]:
+    """Get the id of the run being recorded, also in worker processes, if any."""
+    return _run_id
+
+
+def read_ledger(ledger_fp: Path = RUN_LEDGER_FP) -> list[LedgerEntry]:
+    if not ledger_fp.is_file():
+        return []
+
+    with open(ledger_fp) as ledger_file:
+        return [LedgerEntry.parse_raw(line) for line in ledger_file if line.strip()]
+
+
+def append_ledger_entry(entry: LedgerEntry, ledger_fp: Path = RUN_LEDGER_FP) -> None:
+    """Append `entry`, locking the ledger against concurrent workers."""
+    line = entry.json() + "\n"
+
+    ledger_fp.parent.mkdir(parents=True, exist_ok=True)
+    with open(ledger_fp, "a") as ledger_file:
+        fcntl.flock(ledger_file, fcntl.LOCK_EX)
+        try:
+            ledger_file.write(line)
+        finally:
+            fcntl.flock(ledger_file, fcntl.LOCK_UN)
+
+
+def _snapshot() -> dict[str, Any]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "time": time.monotonic(),
+        "user_cpu": own.ru_utime + children.ru_utime + _unreaped_command_cpu["user"],
+        "system_cpu": (
+            own.ru_stime + children.ru_stime + _unreaped_command_cpu["system"]
+        ),
+        # `ru_maxrss` is the peak of the whole process, in KiB on Linux.
+        "own_maxrss_kb": own.ru_maxrss,
+        **_io_counters(),
+    }
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak RSS of this process to its current RSS.
+
+    With one worker, tasks run one after another in the same process, so the
+    peak must be reset for each task. Only possible on Linux.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+
+    return True
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Read the peak RSS (KiB) of this process since `reset_peak_rss`."""
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def _io_counters() -> dict[str, Optional[int]]:
+    """Read storage I/O of this process, including its finished children."""
+    try:
+        with open("/proc/self/io") as io_file:
+            counters = dict(line.split(": ") for line in io_file.read().splitlines())
+    except (OSError, ValueError):
+        return {"read_bytes": None, "written_bytes": None}
+
+    return {
+        "read_bytes": int(counters["read_bytes"]),
+        "written_bytes": int(counters["write_bytes"]),
+    }
+
+
+def _describe(task: luigi.Task) -> Optional[tuple[str, str, Optional[str]]]:
+    """Find the subject, step, and fingerprint of tasks we want to record."""
+    from qgreenland.util.fingerprint import asset_fingerprint, layer_step_fingerprints
+    from qgreenland.util.luigi.tasks.fetch import FetchTask
+    from qgreenland.util.luigi.tasks.main import ChainableTask, FinalizeTask
+
+    if isinstance(task, ChainableTask):
+        return (task.layer_id, task.step_identifier, task.step_fingerprint)
+
+    if isinstance(task, FetchTask):
+        return (
+            f"{task.dataset_id}.{task.asset_id}",
+            "fetch",
+            asset_fingerprint(dataset_cfg=task.dataset_cfg, asset_cfg=task.asset_cfg),
+        )
+
+    if isinstance(task, FinalizeTask):
+        fingerprints = layer_step_fingerprints(task.layer_cfg)
+        return (task.layer_id, "finalize", fingerprints[-1] if fingerprints else None)
+
+    return None
+
+
+def _output_bytes(task: luigi.Task) -> int:
+    from qgreenland.util.fs import directory_size_bytes
+
+    output = task.output()
+    if not isinstance(output, luigi.LocalTarget):
+        return 0
+
+    path = Path(output.path)
+    if path.is_dir():
+        return directory_size_bytes(path)
+    if path.is_file():
+        return path.stat().st_size
+    return 0
+
+
+def _on_start(task: luigi.Task) -> None:
+    global _command_peak_rss_kb
+    if _describe(task) is None:
+        return
+
+    _command_peak_rss_kb = 0
+    _task_starts[task.task_id] = {
+        **_snapshot(),
+        "peak_rss_reset": reset_peak_rss(),
+    }
+
+
+def _delta(start: dict[str, Any], end: dict[str, Any], key: str) -> Optional[int]:
+    if start[key] is None or end[key] is None:
+        return None
+    return end[key] - start[key]
+
+
+def _on_success(task: luigi.Task) -> None:
+    start = _task_starts.pop(task.task_id, None)
+    description = _describe(task)
+    if start is None or description is None:
+        return
+
+    subject, step, fingerprint = description
+    end = _snapshot()
+
+    own_peak_rss_kb = peak_rss_kb() if start["peak_rss_reset"] else None
+    if own_peak_rss_kb is None:
+        # The peak of the whole process, which may predate this task.
+        own_peak_rss_kb = end["own_maxrss_kb"]
+
+    try:
+        append_ledger_entry(
+            LedgerEntry(
+                run_id=_run_id,
+                finished_at=datetime.now(),
+                task=task.get_task_family(),
+                subject=subject,
+                step=step,
+                fingerprint=fingerprint,
+                wall_seconds=end["time"] - start["time"],
+                user_cpu_seconds=end["user_cpu"] - start["user_cpu"],
+                system_cpu_seconds=end["system_cpu"] - start["system_cpu"],
+                peak_rss_bytes=max(own_peak_rss_kb, _command_peak_rss_kb) * 1024,
+                read_bytes=_delta(start, end, "read_bytes"),
+                written_bytes=_delta(start, end, "written_bytes"),
+                output_bytes=_output_bytes(task),
+            ),
+        )
+    except Exception as e:
+        # Never fail a task because its statistics couldn't be recorded.
+        logger.warning(f"Failed to record {task} in the run ledger: {e}")
+
+
+def compare_with_previous(
+    entries: list[LedgerEntry],
+    *,
+    run_id: Optional[str] = None,
+) -> list[tuple[LedgerEntry, Optional[LedgerEntry]]]:
+    """Pair each entry of a run with the latest entry for the same task before it.
+
+    Defaults to the latest run. Empty if there's no run `run_id`.
+    """
+    if not entries:
+        return []
+
+    run_id = run_id or entries[-1].run_id
+    run_index = next(
+        (i for i, entry in enumerate(entries) if entry.run_id == run_id),
+        None,
+    )
+    if run_index is None:
+        return []
+
+    previous: dict[tuple[str, str], LedgerEntry] = {}
+    for entry in entries[:run_index]:
+        previous[entry.key] = entry
+
+    return [
+        (entry, previous.get(entry.key)) for entry in entries if entry.run_id == run_id
+    ]
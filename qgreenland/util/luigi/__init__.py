@@ -1,3 +1,4 @@
+import logging
 from functools import cache
 from typing import Generator, Type
 
@@ -15,6 +16,8 @@ from qgreenland.models.config.asset import (
 from qgreenland.models.config.dataset import Dataset
 from qgreenland.models.config.layer import Layer
 from qgreenland.util.config.config import get_config
+from qgreenland.util.fingerprint import layer_step_fingerprints
+from qgreenland.util.luigi.schedule import CostModel, SchedulePlan
 from qgreenland.util.luigi.tasks.fetch import (
     FetchCmrGranule,
     FetchDataFiles,
@@ -24,6 +27,8 @@ from qgreenland.util.luigi.tasks.fetch import (
 )
 from qgreenland.util.luigi.tasks.main import ChainableTask, FinalizeTask
 
+logger = logging.getLogger("luigi-interface")
+
 # TODO: Make "fetch" tasks into Python "steps"?
 ASSET_TYPE_TASKS: dict[Type[AnyAsset], Type[FetchTask]] = {
     CmrAsset: FetchCmrGranule,
@@ -66,6 +71,37 @@ def fetch_tasks_from_dataset(
         yield _fetch_task(dataset_cfg, asset_cfg)
 
 
+def _step_tasks(
+    layer_cfg: Layer,
+    *,
+    fetch_task: FetchTask,
+    planned_step_tasks: dict[str, ChainableTask],
+) -> list[ChainableTask]:
+    """Create a chain of step tasks for `layer_cfg`, starting at `fetch_task`.
+
+    Layers often share identical leading steps against the same asset (e.g.
+    unzipping the same archive). Steps with the same fingerprint produce the
+    same output, so instead of creating a new task for them, the task already
+    in `planned_step_tasks` is re-used. The step's output is owned by the first
+    layer that planned it, and all other layers' subsequent steps read from it.
+    """
+    tasks: list[ChainableTask] = []
+    task: luigi.Task = fetch_task
+
+    for step_number, fingerprint in enumerate(layer_step_fingerprints(layer_cfg)):
+        if fingerprint not in planned_step_tasks:
+            planned_step_tasks[fingerprint] = ChainableTask(
+                requires_task=task,
+                layer_id=layer_cfg.id,
+                step_number=step_number,
+            )
+
+        task = planned_step_tasks[fingerprint]
+        tasks.append(task)
+
+    return tasks
+
+
 @cache
 def generate_layer_pipelines(
     *,
@@ -75,9 +111,17 @@ def generate_layer_pipelines(
 
     Instead of calling tasks now, we return a list of callables with the
     arguments already populated.
+
+    Identical step prefixes are shared between layers, so the resulting task
+    graph is a DAG rather than one independent chain per layer.
+
+    Each task's priority is set to the predicted duration of the longest chain
+    of work starting with it, so the longest chains are started first.
     """
     config = get_config()
     tasks: list[luigi.Task] = []
+    planned_step_tasks: dict[str, ChainableTask] = {}
+    step_count = 0
 
     layers = config.layers.values()
 
@@ -95,12 +139,13 @@ def generate_layer_pipelines(
 
         # If the layer has no steps, it's just fetched and finalized.
         if layer_cfg.steps:
-            for step_number, _ in enumerate(layer_cfg.steps):
-                task = ChainableTask(
-                    requires_task=task,
-                    layer_id=layer_cfg.id,
-                    step_number=step_number,
-                )
+            step_tasks = _step_tasks(
+                layer_cfg,
+                fetch_task=task,
+                planned_step_tasks=planned_step_tasks,
+            )
+            step_count += len(step_tasks)
+            task = step_tasks[-1]
 
         # We only need the last task in the layer pipeline to run all
         # "required" tasks in a layer pipeline.
@@ -111,4 +156,12 @@ def generate_layer_pipelines(
 
         tasks.append(task)
 
+    if step_count:
+        logger.info(
+            f"Planned {len(planned_step_tasks)} step tasks for {step_count} layer"
+            " steps; identical steps are shared between layers.",
+        )
+
+    SchedulePlan(tasks, cost_model=CostModel()).assign_priorities()
+
     return tasks
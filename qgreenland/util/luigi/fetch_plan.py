@@ -0,0 +1,148 @@
+"""Estimate what a fetch will download before starting it.
+
+The size of each file of each asset which hasn't been fetched yet is requested
+concurrently (`HEAD` for HTTP, `SIZE` for FTP), and the total is compared with
+the free space in working storage.
+
+The latest plan is saved, and used by `CostModel` to predict how long fetches
+which have never been recorded will take, so the largest downloads are started
+first and overlap with processing of smaller layers.
+"""
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import luigi
+
+from qgreenland.constants.paths import FETCH_PLAN_FP, WORKING_STORAGE_DIR
+from qgreenland.models.fetch_plan import FetchPlan, PlannedFetch
+from qgreenland.util.cmr import resolve_cmr_granules
+from qgreenland.util.luigi.tasks.fetch import (
+    FetchCmrGranule,
+    FetchDataFiles,
+    FetchLocalDataFiles,
+    FetchTask,
+)
+from qgreenland.util.request import remote_size
+
+logger = logging.getLogger("luigi-interface")
+
+
+def plan_fetches(
+    tasks: Iterable[luigi.Task],
+    *,
+    workers: int,
+    storage_dir: Path = WORKING_STORAGE_DIR,
+) -> FetchPlan:
+    """Plan the incomplete fetches of `tasks`, making `workers` requests at once.
+
+    Local assets (manual and repository assets) are copied, and streamed assets
+    are read as they're needed, not downloaded, so neither are planned. Command
+    assets are planned with an unknown size.
+    """
+    pending = [
+        task
+        for task in tasks
+        if isinstance(task, FetchTask)
+        and not isinstance(task, FetchLocalDataFiles)
+        and not getattr(task.asset_cfg, "stream", False)
+        and not task.complete()
+    ]
+    urls = _task_urls(pending)
+
+    lookups = [(task, url) for task in pending for url in urls[task.task_id]]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(lambda lookup: _size(*lookup), lookups))
+
+    task_sizes: dict[str, list[Optional[int]]] = {task.task_id: [] for task in pending}
+    for (task, _), size in zip(lookups, sizes):
+        task_sizes[task.task_id].append(size)
+
+    fetches = [
+        PlannedFetch(
+            dataset_id=task.dataset_id,
+            asset_id=task.asset_id,
+            urls=urls[task.task_id],
+            bytes=_total(task_sizes[task.task_id]),
+        )
+        for task in pending
+    ]
+    fetches.sort(key=lambda fetch: (fetch.bytes is None, -(fetch.bytes or 0)))
+
+    return FetchPlan(
+        created_at=datetime.now(),
+        fetches=fetches,
+        total_bytes=sum(fetch.bytes or 0 for fetch in fetches),
+        free_bytes=free_bytes(storage_dir),
+    )
+
+
+def _total(sizes: list[Optional[int]]) -> Optional[int]:
+    """Sum `sizes`, if they're all known."""
+    if not sizes or None in sizes:
+        return None
+    return sum(size for size in sizes if size is not None)
+
+
+def _task_urls(tasks: list[FetchTask]) -> dict[str, list[str]]:
+    """Find the URLs each task will download, resolving CMR granules at once."""
+    cmr_keys = {
+        task.task_id: (task.asset_cfg.collection_concept_id, task.asset_cfg.granule_ur)
+        for task in tasks
+        if isinstance(task, FetchCmrGranule)
+    }
+    granules = resolve_cmr_granules(cmr_keys.values()) if cmr_keys else {}
+
+    urls: dict[str, list[str]] = {}
+    for task in tasks:
+        if isinstance(task, FetchCmrGranule):
+            urls[task.task_id] = list(granules[cmr_keys[task.task_id]].urls)
+        elif isinstance(task, FetchDataFiles):
+            urls[task.task_id] = [str(url) for url in task.asset_cfg.urls]
+        else:
+            urls[task.task_id] = []
+
+    return urls
+
+
+def _size(task: FetchTask, url: str) -> Optional[int]:
+    try:
+        return remote_size(url, verify=getattr(task.asset_cfg, "verify_tls", True))
+    except Exception as e:
+        logger.warning(f"Failed to find the size of {url}: {e}")
+        return None
+
+
+def free_bytes(path: Path) -> int:
+    """Find the free space on the filesystem `path` is, or would be, on."""
+    while not path.exists():
+        path = path.parent
+    return shutil.disk_usage(path).free
+
+
+def plan_summary(plan: FetchPlan) -> str:
+    gib = 2**30
+    lines = [
+        f"Planned {len(plan.fetches)} fetches totalling"
+        f" {plan.total_bytes / gib:.2f} GiB ({plan.unknown_count} of unknown size),"
+        f" with {plan.free_bytes / gib:.2f} GiB free in working storage.",
+    ]
+    if not plan.fits:
+        lines.append("WARNING: The planned fetches won't fit in working storage!")
+
+    return "\n".join(lines)
+
+
+def write_fetch_plan(plan: FetchPlan, plan_fp: Path = FETCH_PLAN_FP) -> None:
+    plan_fp.parent.mkdir(parents=True, exist_ok=True)
+    plan_fp.write_text(plan.json(indent=2))
+
+
+def read_fetch_plan(plan_fp: Path = FETCH_PLAN_FP) -> Optional[FetchPlan]:
+    if not plan_fp.is_file():
+        return None
+
+    return FetchPlan.parse_file(plan_fp)
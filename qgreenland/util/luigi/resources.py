@@ -0,0 +1,153 @@
+"""Limit how many CPU- or memory-heavy steps run at once.
+
+Each step has a resource class (see `ResourceClass`), either set explicitly or
+inferred from the programs it runs. Heavy steps require a unit of a Luigi
+resource, and the scheduler is told how many units are available based on the
+machine's core count and memory. Light steps are only limited by the number of
+workers, so a high worker count can be used safely.
+
+Fetches similarly require a unit of a resource for each host they fetch from,
+so at most `FETCH_HOST_CONCURRENCY` assets are fetched from any one host at
+once, while fetches from other hosts use the remaining workers.
+"""
+import os
+import re
+from typing import Iterable
+
+import luigi
+import luigi.interface
+
+from qgreenland.constants.project import FETCH_HOST_CONCURRENCY
+from qgreenland.models.config.asset import AnyAsset, CmrAsset, CommandAsset, HttpAsset
+from qgreenland.models.config.step import (
+    AnyStep,
+    CommandStep,
+    ExtractSlicesStep,
+    FusedStep,
+    PythonStep,
+    ResourceClass,
+)
+from qgreenland.util.hosts import host_of
+from qgreenland.util.machine import machine_cpu_count, machine_memory_bytes
+
+# Programs which are expected to be heavy when run on large inputs.
+PROGRAM_RESOURCE_CLASSES: dict[str, ResourceClass] = {
+    "gdalwarp": "memory",
+    "gdal_calc.py": "memory",
+    "gdalmdimtranslate": "memory",
+    "gdal_translate": "cpu",
+    "gdaladdo": "cpu",
+    "gdal_rasterize": "cpu",
+}
+
+# In order of increasing demand.
+RESOURCE_CLASSES: tuple[ResourceClass, ...] = ("light", "cpu", "memory")
+
+# The Luigi resources required by each resource class.
+CLASS_RESOURCES: dict[ResourceClass, dict[str, int]] = {
+    "light": {},
+    "cpu": {"cpu_heavy": 1},
+    "memory": {"cpu_heavy": 1, "memory_heavy": 1},
+}
+
+# The memory we expect a memory-heavy step may use.
+MEMORY_HEAVY_STEP_BYTES = 4 * 2**30
+
+# CMR granules are looked up, then mostly downloaded from NSIDC, so we treat
+# them all as coming from the same host.
+CMR_HOST = "cmr.earthdata.nasa.gov"
+
+_URL_PATTERN = re.compile(r"\b(?:https?|ftp)://[^\s'\"]+")
+
+
+def _programs(step: AnyStep) -> set[str]:
+    if isinstance(step, PythonStep):
+        return {step.utility}
+    if isinstance(step, ExtractSlicesStep):
+        return {"gdalmdimtranslate"}
+    if isinstance(step, CommandStep):
+        # Arguments may contain several words, e.g. `'gdalwarp -r bilinear'`.
+        words = " ".join(str(arg) for arg in step.args).split()
+        return {os.path.basename(word) for word in words}
+    return set()
+
+
+def step_resource_class(step: AnyStep) -> ResourceClass:
+    """Determine the resource class of `step`, inferring it if not specified."""
+    if isinstance(step, FusedStep):
+        return max(
+            (step_resource_class(sub_step) for sub_step in step.steps),
+            key=RESOURCE_CLASSES.index,
+        )
+
+    if explicit := getattr(step, "resource_class", None):
+        return explicit
+
+    return max(
+        (PROGRAM_RESOURCE_CLASSES.get(program, "light") for program in _programs(step)),
+        key=RESOURCE_CLASSES.index,
+        default="light",
+    )
+
+
+def step_resources(step: AnyStep) -> dict[str, int]:
+    """Determine the Luigi resources required to run `step`."""
+    return CLASS_RESOURCES[step_resource_class(step)]
+
+
+def asset_hosts(asset: AnyAsset) -> set[str]:
+    """Find the hosts `asset` is fetched from.
+
+    The URLs of command assets are found in their arguments.
+    """
+    if isinstance(asset, HttpAsset):
+        return {host_of(str(url)) for url in asset.urls}
+    if isinstance(asset, CmrAsset):
+        return {CMR_HOST}
+    if isinstance(asset, CommandAsset):
+        return {
+            host_of(url) for arg in asset.args for url in _URL_PATTERN.findall(str(arg))
+        }
+    return set()
+
+
+def fetch_resources(asset: AnyAsset) -> dict[str, int]:
+    """Determine the Luigi resources required to fetch `asset`."""
+    return {f"fetch_host:{host}": 1 for host in asset_hosts(asset)}
+
+
+def resource_limits(assets: Iterable[AnyAsset] = ()) -> dict[str, int]:
+    """Calculate how many heavy steps this machine can run at once.
+
+    Also limits fetches from the hosts of `assets`. Luigi would otherwise limit
+    fetches from each host to one at a time.
+    """
+    return {
+        "cpu_heavy": machine_cpu_count(),
+        "memory_heavy": max(1, machine_memory_bytes() // MEMORY_HEAVY_STEP_BYTES),
+        **{
+            resource: FETCH_HOST_CONCURRENCY
+            for asset in assets
+            for resource in fetch_resources(asset)
+        },
+    }
+
+
+class ResourceLimitedSchedulerFactory(luigi.interface._WorkerSchedulerFactory):
+    """Tell the scheduler, local or remote, about this machine's resources.
+
+    Pass to `luigi.build` as `worker_scheduler_factory`.
+    """
+
+    def __init__(self, resources: dict[str, int]):
+        self.resources = resources
+
+    def create_local_scheduler(self):
+        scheduler = super().create_local_scheduler()
+        scheduler.update_resources(**self.resources)
+        return scheduler
+
+    def create_remote_scheduler(self, url):
+        scheduler = super().create_remote_scheduler(url)
+        scheduler.update_resources(**self.resources)
+        return scheduler
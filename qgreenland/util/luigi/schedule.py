@@ -0,0 +1,242 @@
+"""Prioritize tasks by the predicted duration of the work remaining after them.
+
+Luigi runs pending tasks in order of priority, and raises the priority of each
+task's dependencies to at least its own. Giving every task a priority equal to
+the longest chain of predicted work from the start of that task to the end of
+the pipeline means the longest chains (e.g. large rasters) are dispatched first,
+instead of dominating the end of the build.
+
+Durations are predicted from previous runs recorded in the run ledger, or, for
+fetches which have never been recorded, from their planned size (see
+`qgreenland.util.luigi.fetch_plan`).
+"""
+import logging
+from functools import cached_property
+from statistics import median
+from typing import Iterable, Optional
+
+import luigi
+
+from qgreenland.models.fetch_plan import FetchPlan
+from qgreenland.models.ledger import LedgerEntry
+from qgreenland.util.ledger import read_ledger
+from qgreenland.util.luigi.fetch_plan import read_fetch_plan
+from qgreenland.util.luigi.tasks.fetch import FetchTask
+from qgreenland.util.luigi.tasks.main import ChainableTask, FinalizeTask
+
+logger = logging.getLogger("luigi-interface")
+
+# Predicted durations, in seconds, of tasks which have never been recorded.
+DEFAULT_TASK_SECONDS = {
+    "fetch": 30.0,
+    "step": 10.0,
+    "finalize": 1.0,
+}
+
+# The download speed assumed when predicting the duration of a planned fetch.
+PLANNED_FETCH_BYTES_PER_SECOND = 10 * 2**20
+
+
+class CostModel:
+    """Predict task durations from previously recorded runs and the fetch plan."""
+
+    def __init__(
+        self,
+        entries: Optional[list[LedgerEntry]] = None,
+        *,
+        fetch_plan: Optional[FetchPlan] = None,
+    ):
+        self.entries = read_ledger() if entries is None else entries
+        self.fetch_plan = read_fetch_plan() if fetch_plan is None else fetch_plan
+
+    @cached_property
+    def _planned_fetch_seconds(self) -> dict[str, float]:
+        if self.fetch_plan is None:
+            return {}
+
+        return {
+            fetch.subject: fetch.bytes / PLANNED_FETCH_BYTES_PER_SECOND
+            for fetch in self.fetch_plan.fetches
+            if fetch.bytes is not None
+        }
+
+    @cached_property
+    def _by_fingerprint(self) -> dict[str, list[float]]:
+        durations: dict[str, list[float]] = {}
+        for entry in self.entries:
+            if entry.fingerprint:
+                durations.setdefault(entry.fingerprint, []).append(entry.wall_seconds)
+        return durations
+
+    @cached_property
+    def _by_key(self) -> dict[tuple[str, str], list[float]]:
+        durations: dict[tuple[str, str], list[float]] = {}
+        for entry in self.entries:
+            durations.setdefault(entry.key, []).append(entry.wall_seconds)
+        return durations
+
+    def seconds(self, task: luigi.Task) -> float:
+        """Predict the duration of `task`.
+
+        Prefer records of identically-configured tasks, then records of the
+        same layer's step (e.g. before its configuration changed), then a
+        fetch's planned size, then a default.
+        """
+        if isinstance(task, ChainableTask):
+            fingerprint = task.step_fingerprint
+            key = (task.layer_id, task.step_identifier)
+            default = DEFAULT_TASK_SECONDS["step"]
+        elif isinstance(task, FetchTask):
+            fingerprint = None
+            key = (f"{task.dataset_id}.{task.asset_id}", "fetch")
+            default = self._planned_fetch_seconds.get(
+                key[0],
+                DEFAULT_TASK_SECONDS["fetch"],
+            )
+        elif isinstance(task, FinalizeTask):
+            fingerprint = None
+            key = (task.layer_id, "finalize")
+            default = DEFAULT_TASK_SECONDS["finalize"]
+        else:
+            return 0.0
+
+        if fingerprint and (durations := self._by_fingerprint.get(fingerprint)):
+            return median(durations)
+        if durations := self._by_key.get(key):
+            return median(durations)
+        return default
+
+
+class SchedulePlan:
+    """The predicted cost of the task graph required by `final_tasks`."""
+
+    def __init__(
+        self,
+        final_tasks: Iterable[luigi.Task],
+        *,
+        cost_model: CostModel,
+        exclude_complete: bool = False,
+    ):
+        """Predict the cost of running `final_tasks` and their dependencies.
+
+        If `exclude_complete`, tasks which are already complete (and will not be
+        run) cost nothing.
+        """
+        self.final_tasks = list(final_tasks)
+        self.cost_model = cost_model
+
+        # Each task's dependents, by task id.
+        self.dependents: dict[str, list[luigi.Task]] = {}
+        self.tasks: dict[str, luigi.Task] = {}
+        for task in self.final_tasks:
+            self._add(task)
+
+        self.seconds: dict[str, float] = {
+            task_id: (
+                0.0
+                if exclude_complete and task.complete()
+                else cost_model.seconds(task)
+            )
+            for task_id, task in self.tasks.items()
+        }
+
+        self.remaining_seconds: dict[str, float] = {}
+        for task in self.tasks.values():
+            self._remaining(task)
+
+    def _add(self, task: luigi.Task) -> None:
+        stack = [task]
+        while stack:
+            task = stack.pop()
+            if task.task_id in self.tasks:
+                continue
+
+            self.tasks[task.task_id] = task
+            self.dependents.setdefault(task.task_id, [])
+            for dependency in luigi.task.flatten(task.requires()):
+                self.dependents.setdefault(dependency.task_id, []).append(task)
+                stack.append(dependency)
+
+    def _remaining(self, task: luigi.Task) -> float:
+        """Predict the longest chain of work from the start of `task`."""
+        # Iterative post-order traversal; chains can be long.
+        stack = [task]
+        while stack:
+            current = stack[-1]
+            if current.task_id in self.remaining_seconds:
+                stack.pop()
+                continue
+
+            pending = [
+                dependent
+                for dependent in self.dependents[current.task_id]
+                if dependent.task_id not in self.remaining_seconds
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+
+            stack.pop()
+            longest_after = max(
+                (
+                    self.remaining_seconds[dependent.task_id]
+                    for dependent in self.dependents[current.task_id]
+                ),
+                default=0.0,
+            )
+            self.remaining_seconds[current.task_id] = (
+                self.seconds[current.task_id] + longest_after
+            )
+
+        return self.remaining_seconds[task.task_id]
+
+    @property
+    def total_seconds(self) -> float:
+        """The predicted duration of all tasks run one after the other."""
+        return sum(self.seconds.values())
+
+    @property
+    def critical_path(self) -> list[luigi.Task]:
+        """The longest chain of predicted work, in order."""
+        roots = [
+            task
+            for task in self.tasks.values()
+            if not luigi.task.flatten(task.requires())
+        ]
+        if not roots:
+            return []
+
+        path = [max(roots, key=lambda t: self.remaining_seconds[t.task_id])]
+        while dependents := self.dependents[path[-1].task_id]:
+            path.append(
+                max(dependents, key=lambda t: self.remaining_seconds[t.task_id]),
+            )
+
+        return path
+
+    @property
+    def critical_path_seconds(self) -> float:
+        path = self.critical_path
+        return self.remaining_seconds[path[0].task_id] if path else 0.0
+
+    def ideal_makespan_seconds(self, *, workers: int) -> float:
+        """Calculate a lower bound on the duration of the whole build."""
+        return max(self.critical_path_seconds, self.total_seconds / workers)
+
+    def assign_priorities(self) -> None:
+        """Set each task's Luigi priority to its predicted remaining work."""
+        for task_id, task in self.tasks.items():
+            task.priority = round(self.remaining_seconds[task_id])
+
+    def report(self, *, workers: int) -> str:
+        lines = [
+            f"Predicted critical path ({self.critical_path_seconds:.0f}s):",
+            *(
+                f"  {self.seconds[task.task_id]:8.1f}s  {task!r}"
+                for task in self.critical_path
+            ),
+            f"Predicted total work: {self.total_seconds:.0f}s",
+            f"Ideal makespan with {workers} worker(s):"
+            f" {self.ideal_makespan_seconds(workers=workers):.0f}s",
+        ]
+        return "\n".join(lines)
@@ -1,21 +1,37 @@
+import logging
+import multiprocessing
 import shutil
+from pathlib import Path
+from typing import Iterable
 
 import luigi
 
-from qgreenland.constants.paths import FETCH_DATASETS_DIR, PRIVATE_ARCHIVE_DIR
+from qgreenland.constants.paths import (
+    FETCH_BLOBS_DIR,
+    FETCH_DATASETS_DIR,
+    FETCH_PARTIAL_DIR,
+    PRIVATE_ARCHIVE_DIR,
+)
 from qgreenland.models.config.asset import (
     CmrAsset,
     HttpAsset,
     ManualAsset,
     RepositoryAsset,
 )
-from qgreenland.util.cmr import get_cmr_granule
+from qgreenland.util.cmr import get_cmr_granule, resolve_cmr_granules
 from qgreenland.util.command import interpolate_args, run_qgr_command
 from qgreenland.util.config.config import get_config
-from qgreenland.util.edl import create_earthdata_authenticated_session as make_session
+from qgreenland.util.ftp import close_idle_connections, log_ftp_stats
+from qgreenland.util.hosts import save_host_stats
 from qgreenland.util.layer import datasource_dirname
+from qgreenland.util.ledger import current_run_id
+from qgreenland.util.luigi.resources import fetch_resources
 from qgreenland.util.luigi.target import temporary_path_dir
-from qgreenland.util.request import fetch_and_write_file
+from qgreenland.util.range_cache import stream_path
+from qgreenland.util.request import fetch_and_write_file, filename_from_url
+from qgreenland.util.session import log_session_stats
+
+logger = logging.getLogger("luigi-interface")
 
 
 # TODO: call this 'FetchDataset'? 'FetchAsset'?
@@ -30,6 +46,11 @@ class FetchTask(luigi.Task):
             asset_id=self.asset_cfg.id,
         )
 
+    @property
+    def partial_dir(self):
+        """Where incomplete downloads are kept so they can be resumed."""
+        return FETCH_PARTIAL_DIR / self.output_name
+
     @property
     def dataset_cfg(self):
         config = get_config()
@@ -39,10 +60,20 @@ class FetchTask(luigi.Task):
     def asset_cfg(self):
         return self.dataset_cfg.assets[self.asset_id]
 
+    @property
+    def resources(self):
+        return fetch_resources(self.asset_cfg)
+
+    def on_success(self):
+        save_host_stats(current_run_id())
+        return super().on_success()
+
+    def on_failure(self, exception):
+        save_host_stats(current_run_id())
+        return super().on_failure(exception)
 
-class FetchCmrGranule(FetchTask):
-    session = None
 
+class FetchCmrGranule(FetchTask):
     def output(self):
         path = FETCH_DATASETS_DIR / self.output_name
         return luigi.LocalTarget(path)
@@ -58,15 +89,17 @@ class FetchCmrGranule(FetchTask):
 
         with temporary_path_dir(self.output()) as temp_path:
             for url in granule.urls:
-                if not self.session:
-                    self.session = make_session(hosts=[url], verify=True)
-
                 fetch_and_write_file(
                     url,
                     output_dir=temp_path,
-                    session=self.session,
+                    partial_dir=self.partial_dir,
+                    blob_dir=FETCH_BLOBS_DIR,
+                    sha256=self.asset_cfg.sha256,
                 )
 
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
+        _log_connection_stats()
+
 
 class FetchDataFiles(FetchTask):
     def output(self):
@@ -81,12 +114,40 @@ class FetchDataFiles(FetchTask):
 
         with temporary_path_dir(self.output()) as temp_path:
             for url in self.asset_cfg.urls:
+                if self.asset_cfg.stream:
+                    self._write_stream_vrt(str(url), output_dir=temp_path)
+                    continue
+
                 fetch_and_write_file(
                     url,
                     output_dir=temp_path,
+                    partial_dir=self.partial_dir,
+                    blob_dir=FETCH_BLOBS_DIR,
+                    sha256=self.asset_cfg.sha256,
                     verify=self.asset_cfg.verify_tls,
                 )
 
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
+        _log_connection_stats()
+
+    def _write_stream_vrt(self, url: str, *, output_dir: Path) -> None:
+        """Write a VRT, named like the file at `url`, which streams it.
+
+        GDAL recognizes VRTs by their content, so steps can read the VRT as if
+        it were the file, e.g. `{input_dir}/foo.tif`. Only the file's header is
+        read now.
+        """  # noqa: FS003
+        run_qgr_command(
+            [
+                "gdal_translate",
+                "-q",
+                "-of",
+                "VRT",
+                stream_path(url, verify_tls=self.asset_cfg.verify_tls),
+                str(output_dir / filename_from_url(url)),
+            ],
+        )
+
 
 class FetchLocalDataFiles(FetchTask):
     """Fetch data that's already on the local installation.
@@ -138,3 +199,31 @@ class FetchDataWithCommand(FetchTask):
                     output_dir=temp_path,
                 ),
             )
+
+
+def _log_connection_stats() -> None:
+    log_session_stats()
+    log_ftp_stats()
+    if multiprocessing.parent_process() is not None:
+        # Luigi's task processes exit without running `atexit` handlers.
+        close_idle_connections()
+
+
+def prefetch_cmr_granules(tasks: Iterable[luigi.Task]) -> None:
+    """Resolve the granules of incomplete CMR fetches in as few queries as possible.
+
+    Each `FetchCmrGranule` then finds its granule in the cache instead of
+    querying CMR itself.
+    """
+    keys = [
+        (task.asset_cfg.collection_concept_id, task.asset_cfg.granule_ur)
+        for task in tasks
+        if isinstance(task, FetchCmrGranule) and not task.complete()
+    ]
+    if not keys:
+        return
+
+    try:
+        resolve_cmr_granules(keys)
+    except Exception as e:
+        logger.warning(f"Failed to resolve CMR granules; each fetch will retry: {e}")
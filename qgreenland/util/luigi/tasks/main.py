@@ -4,23 +4,34 @@ Manages input and output directories and various ways of running pipeline steps.
 Doesn't care about what files end up in the output directory, that's the
 responsibility of the step configuration.
 """
+import logging
+import os
 import shutil
+from functools import cached_property
 from pathlib import Path
+from typing import Optional
 
 import luigi
 
 from qgreenland.constants.paths import WIP_LAYERS_DIR
 from qgreenland.runners import step_runner
 from qgreenland.util.config.config import get_config
+from qgreenland.util.fingerprint import layer_step_fingerprints
+from qgreenland.util.gdal_settings import read_gdal_settings
 from qgreenland.util.layer import (
     get_layer_compile_dir,
     get_layer_fp,
     get_layer_release_dir,
 )
+from qgreenland.util.luigi.resources import step_resources
 from qgreenland.util.luigi.target import temporary_path_dir
 from qgreenland.util.metadata import write_metadata_file
 from qgreenland.util.provenance import write_provenance_file
-from qgreenland.util.tree import leaf_lookup
+
+logger = logging.getLogger("luigi-interface")
+
+# Number of fingerprint characters used in step output directory names.
+FINGERPRINT_LENGTH = 16
 
 
 class QgrLayerTask(luigi.Task):
@@ -44,7 +55,7 @@ class QgrLayerTask(luigi.Task):
     def node(self):
         """Find the corresponding LayerNode in the config tree."""
         config = get_config()
-        return leaf_lookup(config.layer_tree, target_node_name=self.layer_id)
+        return config.layer_nodes[self.layer_id]
 
 
 # TODO: Rename... QgrTask? ChainableLayerTask? ChainableLayerStep?
@@ -81,17 +92,37 @@ class ChainableTask(QgrLayerTask):
         """
         return f"{self.step_number:02}-{self.step.type}-{self.step.id}"
 
+    @property  # type: ignore[override]
+    def resources(self) -> dict[str, int]:
+        """Limit concurrency of CPU- and memory-heavy steps."""
+        return step_resources(self.step)
+
+    @cached_property
+    def step_fingerprint(self) -> str:
+        """Content-addressed key of this step's output.
+
+        Changes whenever this step's evaluated configuration, any previous
+        step's configuration, or the input asset's configuration changes.
+        """
+        return layer_step_fingerprints(self.layer_cfg)[self.step_number]
+
     def output(self):
         """Define a directory for the step's behavior to write things into.
 
         We don't care what those files are or what directory structure lies
         within.
 
+        The directory name includes the step's fingerprint, so changes to the
+        configuration are detected automatically: the output of an outdated
+        step is simply not found and the step is run again.
+
         NOTE: As soon as this directory exists, Luigi will consider this Task
         complete. _Always_ wrap behaviors in a temporary directory for outputs.
         """
         return luigi.LocalTarget(
-            WIP_LAYERS_DIR / self.layer_id / self.step_identifier,
+            WIP_LAYERS_DIR
+            / self.layer_id
+            / f"{self.step_identifier}-{self.step_fingerprint[:FINGERPRINT_LENGTH]}",
         )
 
     def run(self):
@@ -102,6 +133,18 @@ class ChainableTask(QgrLayerTask):
         NOTE: If jobs fail, temporary directory is not cleaned up. The WIP dir
         is ephemeral and will be cleaned up in a more wholesale manner.
         """
+        if cached_output := self._find_identical_output():
+            logger.info(f"Reusing identical step output: {cached_output}")
+            with temporary_path_dir(self.output()) as temp_path:
+                # Hard link instead of copying; step outputs are never modified.
+                shutil.copytree(
+                    cached_output,
+                    temp_path,
+                    copy_function=os.link,
+                    dirs_exist_ok=True,
+                )
+            return
+
         with temporary_path_dir(self.output()) as temp_path:
             step_runner(
                 self.step,
@@ -109,6 +152,16 @@ class ChainableTask(QgrLayerTask):
                 output_dir=str(temp_path),
             )
 
+    def _find_identical_output(self) -> Optional[Path]:
+        """Find a completed output with this step's fingerprint in any layer.
+
+        e.g. the output of this step from before the layer was renamed.
+        """
+        fingerprint = self.step_fingerprint[:FINGERPRINT_LENGTH]
+        matches = WIP_LAYERS_DIR.glob(f"*/*-{fingerprint}")
+
+        return next((m for m in matches if m.is_dir()), None)
+
 
 class LinkLayer(QgrLayerTask):
     def output(self):
@@ -155,16 +208,29 @@ class FinalizeTask(QgrLayerTask):
         # Copy file in there, renaming after layer id.
         final_fn = f"{self.layer_cfg.id}{input_fp.suffix}"
         with temporary_path_dir(self.output()) as temp_path:
-            shutil.copy2(input_fp, temp_path / final_fn)
+            # Not `copy2`; fetched files are read-only links to stored blobs,
+            # and released files shouldn't be.
+            shutil.copyfile(input_fp, temp_path / final_fn)
 
             # Create layer provenance and metadata files. These are not
             # "AncillaryFile" jobs because we need one file per layer.
             write_provenance_file(
                 layer_cfg=self.layer_cfg,
                 filepath=temp_path / "provenance.txt",
+                step_gdal_settings=self._step_gdal_settings(),
             )
 
             write_metadata_file(
                 layer_cfg=self.layer_cfg,
                 filepath=temp_path / "metadata.txt",
             )
+
+    def _step_gdal_settings(self) -> list[Optional[dict[str, str]]]:
+        """Read the GDAL settings each of this layer's steps was run with."""
+        settings = []
+        task = self.requires()
+        while isinstance(task, ChainableTask):
+            settings.append(read_gdal_settings(Path(task.output().path)))
+            task = task.requires()
+
+        return list(reversed(settings))
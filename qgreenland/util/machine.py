@@ -0,0 +1,10 @@
+import os
+
+
+def machine_memory_bytes() -> int:
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def machine_cpu_count() -> int:
+    """Count the cores available to this process."""
+    return len(os.sched_getaffinity(0))
@@ -1,3 +1,4 @@
+import re
 from typing import Any, Callable
 
 from pydantic import validator
@@ -27,3 +28,15 @@ def validate_paragraph_text(text: str):
         raise ValueError("Paragraph text must end with a period.")
 
     return text
+
+
+def validate_sha256_digests(digests: dict[str, str]):
+    """Validate SHA-256 digests are lowercase hexadecimal."""
+    for filename, digest in digests.items():
+        if not re.fullmatch("[0-9a-f]{64}", digest):
+            raise ValueError(
+                f"Expected a lowercase hexadecimal SHA-256 digest for {filename}."
+                f" Received: {digest}",
+            )
+
+    return digests
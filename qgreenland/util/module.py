@@ -2,7 +2,7 @@ import importlib
 import inspect
 from pathlib import Path
 from types import ModuleType
-from typing import Type, TypeVar
+from typing import Any, Optional, Type, TypeVar
 
 
 def module_from_path(module_path: Path) -> ModuleType:
@@ -28,16 +28,28 @@ def module_from_path(module_path: Path) -> ModuleType:
 
 T = TypeVar("T")
 
+# Objects found in modules, by module path.
+ModuleObjects = dict[Path, list[Any]]
+
 
 # TODO: Operate on a single path
 def load_objects_from_paths_by_class(
     module_paths: list[Path],
     *,
     target_class: Type[T],
+    module_objects: Optional[ModuleObjects] = None,
 ) -> list[T]:
-    """Return all objects of class `model_class` in `module_paths`."""
+    """Return all objects of class `model_class` in `module_paths`.
+
+    If `module_objects` is provided, modules already in it aren't executed
+    again; their objects are reused. Objects found in other modules are added.
+    """
     found_models = []
     for module_path in module_paths:
+        if module_objects is not None and module_path in module_objects:
+            found_models.extend(module_objects[module_path])
+            continue
+
         module = module_from_path(module_path)
 
         # TODO: Validate `id`s of each model, if present, are unique? Do that
@@ -45,6 +57,8 @@ def load_objects_from_paths_by_class(
 
         models = _find_in_module_by_class(module, target_class=target_class)
         found_models.extend(models)
+        if module_objects is not None:
+            module_objects[module_path] = models
 
     return found_models
 
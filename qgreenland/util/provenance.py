@@ -6,14 +6,27 @@ from qgreenland.models.config.layer import Layer
 from qgreenland.models.config.step import AnyStep
 
 
-def write_provenance_file(*, layer_cfg: Layer, filepath: Path) -> None:
-    """Write layer provenance to a text file."""
+def write_provenance_file(
+    *,
+    layer_cfg: Layer,
+    filepath: Path,
+    step_gdal_settings: Optional[list[Optional[dict[str, str]]]] = None,
+) -> None:
+    """Write layer provenance to a text file.
+
+    `step_gdal_settings` are the GDAL settings each step was run with, if
+    known.
+    """
     # TODO: default message for layers with no processing steps? Just include a
     # string that indicates where the data were fetched from?
     txt_to_write = ""
 
     if layer_cfg.steps:
         txt_to_write = layer_provenance_text(layer_cfg)
+        if step_gdal_settings:
+            txt_to_write += "\n\n# Steps were run with the following GDAL"
+            txt_to_write += " settings, unless set by the step itself:\n\n"
+            txt_to_write += _gdal_settings_text(layer_cfg.steps, step_gdal_settings)
 
     with open(filepath, "w") as provenance_file:
         provenance_file.write(
@@ -42,3 +55,19 @@ def _steps_provenance_text(steps: Optional[list[AnyStep]]) -> Optional[str]:
 
 def _asset_provenance_text(asset: DatasetAsset) -> str:
     return asset.provenance
+
+
+def _gdal_settings_text(
+    steps: list[AnyStep],
+    step_gdal_settings: list[Optional[dict[str, str]]],
+) -> str:
+    lines = []
+    for step_number, (step, settings) in enumerate(zip(steps, step_gdal_settings)):
+        settings_text = (
+            " ".join(f"{key}={value}" for key, value in sorted(settings.items()))
+            if settings
+            else "(not recorded)"
+        )
+        lines.append(f"{step_number:02}-{step.id}: {settings_text}")
+
+    return "\n".join(lines)
@@ -0,0 +1,400 @@
+"""Read remote files through a persistent on-disk cache of byte ranges.
+
+Streamed assets (`HttpAsset.stream`) aren't downloaded. Each of their files is
+"fetched" as a small GDAL VRT whose source is a `/vsicurl/` path on a local
+proxy. The proxy serves the byte ranges GDAL reads from `RANGE_CACHE_DIR`,
+fetching only the blocks which aren't there yet. So a step which crops a small
+window out of a large remote raster fetches, and keeps, only the blocks
+containing that window (and the file's header).
+
+The proxy is served by `qgreenland run` and `qgreenland fetch` for as long as
+their tasks run, and worker processes reach it at `RANGE_CACHE_PORT`.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, ContextManager, Iterable, Iterator, Optional
+from urllib.parse import quote, unquote
+
+import qgreenland.exceptions as exc
+from qgreenland.constants.paths import RANGE_CACHE_DIR
+from qgreenland.constants.project import RANGE_CACHE_PORT, REQUEST_TIMEOUT
+from qgreenland.models.validators import ResponseValidators
+from qgreenland.util.hosts import check_status, record_transfer, with_retries
+from qgreenland.util.request import filename_from_url
+from qgreenland.util.session import get_session
+
+logger = logging.getLogger("luigi-interface")
+
+# Remote files are fetched and cached in blocks of this many bytes. GDAL reads
+# a few KiB at a time, so each block saves many small requests.
+RANGE_CACHE_BLOCK_SIZE = 2**20
+
+# The URL, size and validators of a cached file, in its cache directory.
+META_FILENAME = "meta.json"
+
+_RANGE_HEADER = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def stream_path(
+    url: str,
+    *,
+    port: int = RANGE_CACHE_PORT,
+    verify_tls: bool = True,
+) -> str:
+    """Find the GDAL path for reading `url` through the range cache proxy.
+
+    With `verify_tls=False`, the proxy doesn't verify the server's certificate.
+    """
+    query = "" if verify_tls else "?verify_tls=false"
+    return f"/vsicurl/http://127.0.0.1:{port}/{quote(url, safe='')}{query}"
+
+
+class RangeCache:
+    """Blocks of remote files, fetched with HTTP range requests and kept on disk.
+
+    Each file's blocks are kept in a directory named for the SHA-256 of its
+    URL, with the file's size and validators (`ETag` and `Last-Modified`). A
+    cache checks these against the upstream file with a HEAD request the first
+    time it's asked for the file, and fetches blocks with `If-Range`. If the
+    file has changed, its cached blocks are dropped, so blocks of different
+    versions of a file are never mixed.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = RANGE_CACHE_DIR,
+        *,
+        block_size: int = RANGE_CACHE_BLOCK_SIZE,
+    ):
+        self.cache_dir = cache_dir
+        self.block_size = block_size
+        # URLs whose cached blocks have been checked against the upstream file.
+        self._revalidated: set[str] = set()
+
+    def _url_dir(self, url: str) -> Path:
+        return self.cache_dir / hashlib.sha256(url.encode()).hexdigest()
+
+    def _meta(self, url: str) -> Optional[dict[str, Any]]:
+        meta_fp = self._url_dir(url) / META_FILENAME
+        if not meta_fp.is_file():
+            return None
+
+        return json.loads(meta_fp.read_text())
+
+    def drop(self, url: str) -> None:
+        """Drop the cached blocks of the file at `url`."""
+        shutil.rmtree(self._url_dir(url), ignore_errors=True)
+
+    def size(self, url: str, *, verify_tls: bool = True) -> Optional[int]:
+        """Find the size of the file at `url`, or `None` if there isn't one.
+
+        The first time, the cached blocks are dropped if the file has changed.
+        """
+        meta = self._meta(url)
+        if meta is not None and url in self._revalidated:
+            return meta["size"]
+
+        current = self._head(url, verify_tls=verify_tls)
+        self._revalidated.add(url)
+        if current is None:
+            return None
+
+        if meta is not None and _validators(meta).changed(_validators(current)):
+            logger.info(f"{url} has changed; dropping its cached blocks.")
+            self.drop(url)
+        if meta != current:
+            _write_atomic(
+                self._url_dir(url) / META_FILENAME,
+                json.dumps(current, indent=2).encode(),
+            )
+
+        return current["size"]
+
+    def _head(self, url: str, *, verify_tls: bool) -> Optional[dict[str, Any]]:
+        """Find the size and validators of the file at `url`, if there is one."""
+        session = get_session(url, verify=verify_tls)
+
+        def head():
+            resp = session.head(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            check_status(resp)
+            return resp
+
+        with with_retries(url, head, description="HEAD request") as resp:
+            if resp.status_code in (403, 404, 410):
+                return None
+            if not resp.ok:
+                raise exc.QgrRuntimeError(
+                    f"Failed to find the size of {url}: '{resp.status_code}'",
+                )
+            if (
+                resp.headers.get("accept-ranges", "").lower() != "bytes"
+                or "content-length" not in resp.headers
+            ):
+                raise exc.QgrRuntimeError(
+                    f"{url} can't be streamed; its server doesn't support byte ranges.",
+                )
+
+            return {
+                "url": url,
+                "size": int(resp.headers["content-length"]),
+                "etag": resp.headers.get("etag"),
+                "last_modified": resp.headers.get("last-modified"),
+            }
+
+    def read(
+        self,
+        url: str,
+        start: int,
+        end: int,
+        *,
+        verify_tls: bool = True,
+    ) -> bytes:
+        """Read bytes `start` to `end` (exclusive) of the file at `url`."""
+        first = start // self.block_size
+        last = (end - 1) // self.block_size
+        blocks = range(first, last + 1)
+
+        missing = [i for i in blocks if not self._block_fp(url, i).is_file()]
+        for run_start, run_end in _runs(missing):
+            self._fetch_blocks(url, run_start, run_end, verify_tls=verify_tls)
+
+        data = b"".join(self._block_fp(url, i).read_bytes() for i in blocks)
+        offset = first * self.block_size
+        return data[start - offset : end - offset]  # noqa: E203
+
+    def _block_fp(self, url: str, index: int) -> Path:
+        return self._url_dir(url) / f"{index}.block"
+
+    def _fetch_blocks(
+        self,
+        url: str,
+        first: int,
+        last: int,
+        *,
+        verify_tls: bool,
+    ) -> None:
+        """Fetch blocks `first` to `last` (inclusive) with one range request.
+
+        If the file has changed since its size was found, its cached blocks
+        are dropped and `QgrUpstreamChangedError` is raised.
+        """
+        size = self.size(url, verify_tls=verify_tls)
+        meta = self._meta(url)
+        if size is None or meta is None:
+            raise exc.QgrRuntimeError(f"Can't read from missing file {url}")
+        start = first * self.block_size
+        end = min((last + 1) * self.block_size, size)
+
+        session = get_session(url, verify=verify_tls)
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        if if_range := _validators(meta).if_range:
+            headers["If-Range"] = if_range
+
+        def get():
+            started = time.monotonic()
+            resp = session.get(
+                url,
+                timeout=REQUEST_TIMEOUT,
+                stream=True,
+                headers=headers,
+            )
+            try:
+                check_status(resp)
+                if if_range and resp.status_code == 200:
+                    # The server sends the whole file when it no longer matches.
+                    self.drop(url)
+                    raise exc.QgrUpstreamChangedError(
+                        f"{url} has changed; dropped its cached blocks.",
+                    )
+                if resp.status_code != 206:
+                    raise exc.QgrRuntimeError(
+                        f"Expected partial content from {url}, received"
+                        f" '{resp.status_code}'.",
+                    )
+                content = resp.content
+            finally:
+                resp.close()
+
+            record_transfer(
+                url,
+                nbytes=len(content),
+                seconds=time.monotonic() - started,
+            )
+            return content
+
+        data = with_retries(
+            url,
+            get,
+            description=f"Download of bytes {start}-{end - 1}",
+        )
+        for index in range(first, last + 1):
+            offset = (index - first) * self.block_size
+            _write_atomic(
+                self._block_fp(url, index),
+                data[offset : offset + self.block_size],  # noqa: E203
+            )
+
+
+def _validators(meta: dict[str, Any]) -> ResponseValidators:
+    """Read a cached file's validators from its `META_FILENAME`."""
+    return ResponseValidators(
+        filename=filename_from_url(meta["url"]),
+        etag=meta["etag"],
+        last_modified=meta["last_modified"],
+        content_length=meta["size"],
+    )
+
+
+def _runs(indexes: list[int]) -> Iterator[tuple[int, int]]:
+    """Group sorted `indexes` into runs of consecutive integers (first, last)."""
+    for index in indexes:
+        if index - 1 not in indexes:
+            last = index
+            while last + 1 in indexes:
+                last += 1
+            yield index, last
+
+
+def _write_atomic(fp: Path, data: bytes) -> None:
+    """Write `fp` so concurrent readers never see it incomplete."""
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    temp_fp = fp.with_name(f"{fp.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temp_fp.write_bytes(data)
+    temp_fp.replace(fp)
+
+
+class _RangeCacheHandler(BaseHTTPRequestHandler):
+    """Serve files at the (percent-encoded) URLs in request paths from a cache."""
+
+    server: "_RangeCacheServer"
+
+    def log_message(self, format, *args):
+        logger.debug(f"Range cache: {format % args}")
+
+    def do_HEAD(self):  # noqa: N802
+        self._respond(send_body=False)
+
+    def do_GET(self):  # noqa: N802
+        self._respond(send_body=True)
+
+    def _size(self, url: str, *, verify_tls: bool) -> Optional[int]:
+        """Find the size of the file at `url`, or send an error if we can't."""
+        try:
+            size = self.server.cache.size(url, verify_tls=verify_tls)
+        except Exception as e:
+            logger.warning(f"Failed to stream {url}: {e}")
+            self.send_error(502)
+            return None
+
+        if size is None:
+            self.send_error(404)
+        return size
+
+    def _respond(self, *, send_body: bool) -> None:
+        path, _, query = self.path.partition("?")
+        url = unquote(path.lstrip("/"))
+        verify_tls = "verify_tls=false" not in query.split("&")
+        if not url.startswith(("http://", "https://")):
+            self.send_error(404)
+            return
+
+        if (size := self._size(url, verify_tls=verify_tls)) is None:
+            return
+
+        byte_range = _parse_range(self.headers.get("Range"), size=size)
+        if byte_range is not None and byte_range[0] >= byte_range[1]:
+            self.send_error(416)
+            return
+        if byte_range is None:
+            start, end = 0, size
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start))
+        self.end_headers()
+
+        if send_body:
+            self._send_body(url, start, end, verify_tls=verify_tls)
+
+    def _send_body(self, url: str, start: int, end: int, *, verify_tls: bool) -> None:
+        block_size = self.server.cache.block_size
+        try:
+            for position in range(start, end, block_size):
+                self.wfile.write(
+                    self.server.cache.read(
+                        url,
+                        position,
+                        min(position + block_size, end),
+                        verify_tls=verify_tls,
+                    ),
+                )
+        except exc.QgrUpstreamChangedError as e:
+            # The response has started, so cut it short for GDAL to fail.
+            logger.warning(f"Failed to stream {url}: {e}")
+            self.close_connection = True
+
+
+def _parse_range(header: Optional[str], *, size: int) -> Optional[tuple[int, int]]:
+    """Parse a single-range `Range` header into (start, end exclusive)."""
+    if not header or not (match := _RANGE_HEADER.match(header)):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # A suffix range, e.g. the last 100 bytes.
+        return max(0, size - int(last)), size
+
+    return int(first), min(int(last) + 1 if last else size, size)
+
+
+class _RangeCacheServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, cache: RangeCache):
+        super().__init__(("127.0.0.1", port), _RangeCacheHandler)
+        self.cache = cache
+
+
+@contextmanager
+def serve_range_cache(
+    *,
+    port: int = RANGE_CACHE_PORT,
+    cache_dir: Path = RANGE_CACHE_DIR,
+) -> Iterator[int]:
+    """Serve the range cache proxy in a thread, yielding its port.
+
+    Port 0 picks any free port.
+    """
+    server = _RangeCacheServer(port, RangeCache(cache_dir))
+    thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": 0.1},
+        daemon=True,
+    )
+    thread.start()
+    port = server.server_address[1]
+    logger.info(f"Serving the range cache at {cache_dir} on port {port}")
+    try:
+        yield port
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def serve_range_cache_if_streaming(assets: Iterable) -> ContextManager[Optional[int]]:
+    """Serve the range cache proxy while running tasks, if any of `assets` streams."""
+    if any(getattr(asset, "stream", False) for asset in assets):
+        return serve_range_cache()
+    return nullcontext()
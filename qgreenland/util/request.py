@@ -1,29 +1,88 @@
 import cgi
+import ftplib
+import hashlib
+import json
+import logging
+import os
 import re
-import urllib.request
-from contextlib import closing
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Any, Mapping, Optional
+
+import requests
 
 import qgreenland.exceptions as exc
-from qgreenland.constants.project import REQUEST_TIMEOUT
-from qgreenland.util.edl import create_earthdata_authenticated_session
+from qgreenland.constants.project import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_SEGMENTS,
+    REQUEST_TIMEOUT,
+)
+from qgreenland.models.validators import AssetValidators, ResponseValidators
+from qgreenland.util.blobs import file_sha256, link_blob, store_blob, verify_sha256
+from qgreenland.util.ftp import ftp_connection, ftp_path
+from qgreenland.util.hosts import check_status, record_transfer, with_retries
+from qgreenland.util.session import get_session
+
+logger = logging.getLogger("luigi-interface")
+
+HEADERS = {"User-Agent": "QGreenland"}
+
+# Records the `ResponseValidators` of each file in a fetched asset's directory.
+# Hidden, so it isn't matched by globs like `{input_dir}/*` in layer steps.
+VALIDATORS_FILENAME = ".validators.json"
+
+# Files smaller than this are downloaded as a single segment.
+SEGMENTED_DOWNLOAD_MIN_BYTES = 64 * 2**20
+
+# The most read from an FTP data connection at once.
+FTP_BLOCK_SIZE = 256 * 2**10
 
-CHUNK_SIZE = 8 * 1024
+# Progress of a download is saved at most this often. Saving less often only
+# means a little more is downloaded again when resuming.
+PROGRESS_SAVE_SECONDS = 1.0
 
 
-# Ignore complexity rule C901
-# TODO: make this less complex!
-def fetch_and_write_file(  # noqa:C901
+def fetch_and_write_file(
     url: str,
     *,
     output_dir: Path,
+    partial_dir: Optional[Path] = None,
+    blob_dir: Optional[Path] = None,
+    sha256: Optional[Mapping[str, str]] = None,
     session=None,
     verify=True,
-):
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    segments: int = DOWNLOAD_SEGMENTS,
+) -> Path:
     """Attempt to download and write file from url.
 
     Assumes filename from URL or content-disposition header.
+
+    If the server supports byte ranges, the file is first written to a `.part`
+    file in `partial_dir` (by default, `output_dir`), and an interrupted
+    download is resumed from where it left off, including by a later call with
+    the same `partial_dir`. Files of at least `SEGMENTED_DOWNLOAD_MIN_BYTES`
+    are downloaded as `segments` concurrent byte ranges. FTP downloads are
+    resumed likewise, with `REST`, over pooled connections (see
+    `qgreenland.util.ftp`). Transient failures are retried with backoff; see
+    `qgreenland.util.hosts`.
+
+    The response's validators (e.g. `ETag`) are recorded in `output_dir`, so
+    the file can later be checked for upstream changes without downloading it;
+    see `asset_upstream_changed`.
+
+    The file's SHA-256 is calculated as it's written and checked against
+    `sha256` (expected digests by filename), if specified. If `blob_dir` is
+    specified, the file is stored there and linked in to `output_dir` (see
+    `qgreenland.util.blobs`), and files with an expected digest which are
+    already stored are not downloaded again.
     """
+    expected_sha256 = sha256 or {}
+
     if url.startswith("ftp://"):
         if not verify:
             raise exc.QgrRuntimeError(
@@ -31,69 +90,775 @@ def fetch_and_write_file(  # noqa:C901
                 " sources.",
             )
 
-        _ftp_fetch_and_write(url, output_dir)
+        fp, digest = with_retries(
+            url,
+            lambda: _ftp_fetch_and_write(
+                url,
+                output_dir,
+                partial_dir=partial_dir or output_dir,
+                chunk_size=chunk_size,
+            ),
+            description="Download",
+        )
+        _verify_and_store(fp, digest, expected=expected_sha256, blob_dir=blob_dir)
+        return fp
+
+    if not session:
+        session = get_session(url, verify=verify)
+
+    remote_file = _head(url, session=session)
+    if (
+        remote_file
+        and blob_dir
+        and (pinned_digest := expected_sha256.get(remote_file.filename))
+        and link_blob(
+            pinned_digest,
+            output_dir / remote_file.filename,
+            blob_dir=blob_dir,
+        )
+    ):
+        logger.info(f"Linked {remote_file.filename} from the blob store")
+        validators = remote_file
     else:
-        # TODO: Share the session across requests somehow?
-        if not session:
-            session = create_earthdata_authenticated_session(hosts=[url], verify=verify)
+        validators, digest = _download(
+            url,
+            remote_file=remote_file,
+            output_dir=output_dir,
+            partial_dir=partial_dir or output_dir,
+            session=session,
+            chunk_size=chunk_size,
+            segments=segments,
+        )
+        _verify_and_store(
+            output_dir / validators.filename,
+            digest,
+            expected=expected_sha256,
+            blob_dir=blob_dir,
+        )
 
-        with session.get(
+    record_validators(url, validators, asset_dir=output_dir)
+
+    return output_dir / validators.filename
+
+
+def _download(
+    url: str,
+    *,
+    remote_file: Optional[ResponseValidators],
+    output_dir: Path,
+    partial_dir: Path,
+    session,
+    chunk_size: int,
+    segments: int,
+    restart_if_changed: bool = True,
+) -> tuple[ResponseValidators, str]:
+    """Download `url` to `output_dir`, returning its validators and SHA-256.
+
+    If the file changes upstream during a ranged download, the download is
+    started again, once, from a new HEAD request.
+    """
+    if remote_file is None or remote_file.content_length is None:
+        # We can't resume; download in one go.
+        return _stream_and_write(
+            url,
+            output_dir=output_dir,
+            session=session,
+            chunk_size=chunk_size,
+        )
+
+    try:
+        digest = _ranged_download(
+            url,
+            output_dir=output_dir,
+            partial_dir=partial_dir,
+            remote_file=remote_file,
+            session=session,
+            chunk_size=chunk_size,
+            segments=segments,
+        )
+    except exc.QgrUpstreamChangedError as e:
+        if not restart_if_changed:
+            raise
+        logger.warning(f"{e} Starting the download again.")
+        return _download(
+            url,
+            remote_file=_head(url, session=session),
+            output_dir=output_dir,
+            partial_dir=partial_dir,
+            session=session,
+            chunk_size=chunk_size,
+            segments=segments,
+            restart_if_changed=False,
+        )
+
+    return remote_file, digest
+
+
+def _verify_and_store(
+    fp: Path,
+    digest: str,
+    *,
+    expected: Mapping[str, str],
+    blob_dir: Optional[Path],
+) -> None:
+    verify_sha256(fp, digest, expected=expected.get(fp.name))
+    if blob_dir:
+        store_blob(fp, digest, blob_dir=blob_dir)
+
+
+def _head(url: str, *, session) -> Optional[ResponseValidators]:
+    """Identify the file at `url`.
+
+    `content_length` is only set if the server supports byte ranges.
+    """
+
+    def head():
+        resp = session.head(
             url,
             timeout=REQUEST_TIMEOUT,
-            stream=True,
-            headers={"User-Agent": "QGreenland"},
-        ) as resp:
+            allow_redirects=True,
+            headers=HEADERS,
+        )
+        check_status(resp)
+        return resp
+
+    try:
+        resp = with_retries(url, head, description="HEAD request")
+    except (requests.RequestException, exc.QgrTransientError) as e:
+        logger.info(f"HEAD request for {url} failed: {e}")
+        return None
+
+    with resp:
+        if not resp.ok:
+            return None
+
+        validators = ResponseValidators.from_headers(
+            resp.headers,
+            filename=_filename(resp, url=url),
+        )
+        if resp.headers.get("accept-ranges", "").lower() != "bytes":
+            return validators.copy(update={"content_length": None})
+
+        return validators
+
+
+def _ranged_download(
+    url: str,
+    *,
+    output_dir: Path,
+    partial_dir: Path,
+    remote_file: ResponseValidators,
+    session,
+    chunk_size: int,
+    segments: int,
+) -> str:
+    """Download `url` with byte range requests, returning its SHA-256.
+
+    Raises `QgrUpstreamChangedError`, and discards the partial download, if the
+    file no longer matches `remote_file`.
+    """
+    assert remote_file.content_length is not None
+    size = remote_file.content_length
+
+    partial_dir.mkdir(parents=True, exist_ok=True)
+    part_fp = partial_dir / f"{remote_file.filename}.part"
+
+    download = _RangedDownload.resume_or_start(
+        url,
+        part_fp=part_fp,
+        remote_file=remote_file,
+        segments=segments if size >= SEGMENTED_DOWNLOAD_MIN_BYTES else 1,
+    )
+    try:
+        download.run(session=session, chunk_size=chunk_size)
+    except exc.QgrUpstreamChangedError:
+        part_fp.unlink()
+        download.progress_fp.unlink()
+        raise
+    digest = download.sha256()
+
+    shutil.move(part_fp, output_dir / remote_file.filename)
+    download.progress_fp.unlink()
+
+    return digest
+
+
+def _stream_and_write(
+    url: str,
+    *,
+    output_dir: Path,
+    session,
+    chunk_size: int,
+) -> tuple[ResponseValidators, str]:
+    return with_retries(
+        url,
+        lambda: _stream_and_write_once(
+            url,
+            output_dir=output_dir,
+            session=session,
+            chunk_size=chunk_size,
+        ),
+        description="Download",
+    )
+
+
+def _stream_and_write_once(
+    url: str,
+    *,
+    output_dir: Path,
+    session,
+    chunk_size: int,
+) -> tuple[ResponseValidators, str]:
+    started = time.monotonic()
+    with session.get(
+        url,
+        timeout=REQUEST_TIMEOUT,
+        stream=True,
+        headers=HEADERS,
+    ) as resp:
+        check_status(resp)
+        fn = _filename(resp, url=url)
+
+        if resp.status_code != 200:
+            raise exc.QgrRuntimeError(
+                f"Received '{resp.status_code}' from {resp.request.url}."
+                f" Content: {resp.text}",
+            )
+
+        fp = output_dir / fn
+        part_fp = output_dir / f"{fn}.part"
+
+        sha256 = hashlib.sha256()
+        nbytes = 0
+        try:
+            with open(part_fp, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    nbytes += len(chunk)
+        finally:
+            record_transfer(url, nbytes=nbytes, seconds=time.monotonic() - started)
+
+        part_fp.rename(fp)
+
+        validators = ResponseValidators.from_headers(resp.headers, filename=fn)
+        return validators, sha256.hexdigest()
+
+
+def read_validators(asset_dir: Path) -> AssetValidators:
+    validators_fp = asset_dir / VALIDATORS_FILENAME
+    if not validators_fp.is_file():
+        return AssetValidators()
+
+    return AssetValidators.parse_file(validators_fp)
+
+
+def record_validators(
+    url: str,
+    validators: ResponseValidators,
+    *,
+    asset_dir: Path,
+) -> None:
+    """Add the validators of the file fetched from `url` to `asset_dir`'s."""
+    asset_validators = read_validators(asset_dir)
+    asset_validators = AssetValidators(
+        files={**asset_validators.files, url: validators},
+    )
+    (asset_dir / VALIDATORS_FILENAME).write_text(asset_validators.json(indent=2))
+
+
+# Statuses with which servers which don't support HEAD requests refuse them.
+HEAD_REFUSED_STATUS_CODES = frozenset({403, 405, 501})
+
+
+def upstream_changed(
+    url: str,
+    validators: ResponseValidators,
+    *,
+    session,
+) -> Optional[bool]:
+    """Check if the file at `url` has changed since it was fetched.
+
+    Sends a conditional HEAD request. `None` if we can't tell. Other errors,
+    e.g. if the file is no longer there, are raised.
+    """
+
+    def head():
+        resp = session.head(
+            url,
+            timeout=REQUEST_TIMEOUT,
+            allow_redirects=True,
+            headers={**HEADERS, **validators.conditional_headers},
+        )
+        check_status(resp)
+        return resp
+
+    with with_retries(url, head, description="HEAD request") as resp:
+        if resp.status_code == 304:
+            return False
 
-            # Try to extract the filename from the `content-disposition` header
+        if resp.status_code in HEAD_REFUSED_STATUS_CODES:
+            logger.info(f"Can't revalidate {url}; its server refused a HEAD request.")
+            return None
+
+        if not resp.ok:
+            raise exc.QgrRuntimeError(
+                f"Received '{resp.status_code}' from {resp.request.url}.",
+            )
+
+        return validators.changed(
+            ResponseValidators.from_headers(resp.headers, filename=validators.filename),
+        )
+
+
+def asset_upstream_changed(asset_dir: Path, *, verify: bool = True) -> Optional[bool]:
+    """Check if any file of the asset fetched to `asset_dir` has changed.
+
+    `None` if we can't tell, e.g. if the asset was fetched before validators
+    were recorded.
+    """
+    files = read_validators(asset_dir).files
+    if not files:
+        return None
+
+    changed = [
+        upstream_changed(url, validators, session=get_session(url, verify=verify))
+        for url, validators in files.items()
+    ]
+    if any(changed):
+        return True
+    if None in changed:
+        return None
+
+    return False
+
+
+def remote_size(url: str, *, verify: bool = True) -> Optional[int]:
+    """Find the size of the file at `url` without downloading it.
+
+    `None` if the server doesn't tell us.
+    """
+    if url.startswith("ftp://"):
+
+        def ftp_size():
+            with ftp_connection(url) as ftp:
+                return _ftp_size(ftp, ftp_path(url))
+
+        return with_retries(url, ftp_size, description="SIZE request")
+
+    session = get_session(url, verify=verify)
+
+    def head():
+        resp = session.head(
+            url,
+            timeout=REQUEST_TIMEOUT,
+            allow_redirects=True,
+            headers=HEADERS,
+        )
+        check_status(resp)
+        return resp
+
+    with with_retries(url, head, description="HEAD request") as resp:
+        if not resp.ok:
+            return None
+
+        return ResponseValidators.from_headers(
+            resp.headers,
+            filename=filename_from_url(url),
+        ).content_length
+
+
+def _filename(resp: requests.Response, *, url: str) -> str:
+    """Get the filename from the `content-disposition` header or `url`."""
+    if (
+        disposition := resp.headers.get("content-disposition")
+    ) and "filename" in disposition:
+        # Sometimes the filename is quoted, sometimes it's not.
+        parsed = cgi.parse_header(disposition)
+        # Handle case where disposition itself (usually "attachment")
+        # isn't present (geothermal heat flux :bell:).
+        matcher = re.compile('filename="?(.*)"?')
+        if "filename" in parsed[0] and (match := matcher.match(parsed[0])):
+            return match.groups()[0].strip("'\"")
+        return parsed[1]["filename"]
+
+    if not (fn := filename_from_url(url)):
+        raise exc.QgrRuntimeError(
+            f"Failed to retrieve output filename from {url}",
+        )
+
+    return fn
+
+
+@dataclass
+class _Segment:
+    start: int
+    end: int
+    """Exclusive."""
+    done: int = 0
+
+    @property
+    def position(self) -> int:
+        return self.start + self.done
+
+
+class _RangedDownload:
+    """Download byte ranges of a file in to a `.part` file.
+
+    Progress of each range (segment) is saved alongside the `.part` file, with
+    the file's validators, so the download can be resumed while the file is
+    unchanged. Each range request is conditional on the file being unchanged,
+    with `If-Range`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        part_fp: Path,
+        remote_file: ResponseValidators,
+        segments: list[_Segment],
+    ):
+        assert remote_file.content_length is not None
+        self.url = url
+        self.part_fp = part_fp
+        self.progress_fp = part_fp.with_name(f"{part_fp.name}.json")
+        self.remote_file = remote_file
+        self.size = remote_file.content_length
+        self.segments = segments
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+        # A single segment downloaded from the start in one call is hashed as
+        # it's written. Otherwise, the file is read and hashed once complete.
+        self._sha256 = (
+            hashlib.sha256() if len(segments) == 1 and segments[0].done == 0 else None
+        )
+
+    @classmethod
+    def resume_or_start(
+        cls,
+        url: str,
+        *,
+        part_fp: Path,
+        remote_file: ResponseValidators,
+        segments: int,
+    ) -> "_RangedDownload":
+        """Resume the download of `part_fp`, if it's of the same file version.
+
+        Only partial downloads of the same URL, size, ETag and modification
+        time are resumed. Without a (strong) ETag or modification time, we
+        can't tell if the file has changed, so the download starts again.
+        """
+        assert remote_file.content_length is not None
+        size = remote_file.content_length
+        progress_fp = part_fp.with_name(f"{part_fp.name}.json")
+        version = _file_version(url, remote_file)
+        if part_fp.is_file() and progress_fp.is_file():
+            progress = json.loads(progress_fp.read_text())
             if (
-                disposition := resp.headers.get("content-disposition")
-            ) and "filename" in disposition:
-                # Sometimes the filename is quoted, sometimes it's not.
-                parsed = cgi.parse_header(disposition)
-                # Handle case where disposition itself (usually "attachment")
-                # isn't present (geothermal heat flux :bell:).
-                matcher = re.compile('filename="?(.*)"?')
-                if "filename" in parsed[0] and (match := matcher.match(parsed[0])):
-                    fn = match.groups()[0].strip("'\"")
-                else:
-                    fn = parsed[1]["filename"]
-            else:
-                if not (fn := _filename_from_url(url)):
-                    raise exc.QgrRuntimeError(
-                        f"Failed to retrieve output filename from {url}",
+                remote_file.if_range is not None
+                and {key: progress.get(key) for key in version} == version
+            ):
+                download = cls(
+                    url,
+                    part_fp=part_fp,
+                    remote_file=remote_file,
+                    segments=[_Segment(**s) for s in progress["segments"]],
+                )
+                logger.info(
+                    f"Resuming download of {url} at"
+                    f" {download.done_bytes}/{size} bytes",
+                )
+                return download
+
+        bounds = [size * i // segments for i in range(segments + 1)]
+        download = cls(
+            url,
+            part_fp=part_fp,
+            remote_file=remote_file,
+            segments=[
+                _Segment(start=start, end=end)
+                for start, end in zip(bounds, bounds[1:])
+                if end > start
+            ],
+        )
+        with open(part_fp, "wb") as f:
+            f.truncate(size)
+        download._save_progress()
+
+        return download
+
+    def sha256(self) -> str:
+        """Hash the downloaded file."""
+        if self._sha256 is not None:
+            return self._sha256.hexdigest()
+
+        return file_sha256(self.part_fp)
+
+    @property
+    def done_bytes(self) -> int:
+        return sum(segment.done for segment in self.segments)
+
+    def run(self, *, session, chunk_size: int) -> None:
+        fd = os.open(self.part_fp, os.O_WRONLY)
+        try:
+            if len(self.segments) <= 1:
+                for segment in self.segments:
+                    self._fetch(
+                        segment,
+                        fd=fd,
+                        session=session,
+                        chunk_size=chunk_size,
+                    )
+                return
+
+            logger.info(f"Downloading {self.url} in {len(self.segments)} segments")
+            with ThreadPoolExecutor(max_workers=len(self.segments)) as executor:
+                futures = [
+                    executor.submit(
+                        self._fetch,
+                        segment,
+                        fd=fd,
+                        session=session,
+                        chunk_size=chunk_size,
                     )
+                    for segment in self.segments
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            os.close(fd)
+
+    def _fetch(self, segment: _Segment, *, fd: int, session, chunk_size: int) -> None:
+        """Fetch `segment`, resuming from where it was interrupted on retries."""
+
+        def fetch_remaining() -> None:
+            if segment.position < segment.end:
+                self._fetch_from_position(
+                    segment,
+                    fd=fd,
+                    session=session,
+                    chunk_size=chunk_size,
+                )
+
+        with_retries(
+            self.url,
+            fetch_remaining,
+            description=f"Download of bytes {segment.start}-{segment.end - 1}",
+        )
+
+    def _fetch_from_position(
+        self,
+        segment: _Segment,
+        *,
+        fd: int,
+        session,
+        chunk_size: int,
+    ) -> None:
+        headers = {
+            **HEADERS,
+            "Range": f"bytes={segment.position}-{segment.end - 1}",
+        }
+        if if_range := self.remote_file.if_range:
+            headers["If-Range"] = if_range
 
-            if resp.status_code != 200:
+        with session.get(
+            self.url,
+            timeout=REQUEST_TIMEOUT,
+            stream=True,
+            headers=headers,
+        ) as resp:
+            check_status(resp)
+            if if_range and resp.status_code == 200:
+                # The server sends the whole file when it no longer matches.
+                raise exc.QgrUpstreamChangedError(f"{self.url} has changed.")
+            if resp.status_code != 206:
                 raise exc.QgrRuntimeError(
-                    f"Received '{resp.status_code}' from {resp.request.url}."
-                    f" Content: {resp.text}",
+                    f"Expected partial content from {resp.request.url}, received"
+                    f" '{resp.status_code}'.",
                 )
 
-            fp = output_dir / fn
+            started = time.monotonic()
+            started_at = segment.done
+            try:
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    # Ignore anything beyond the requested range.
+                    chunk = chunk[: segment.end - segment.position]
+                    os.pwrite(fd, chunk, segment.position)
+                    if self._sha256 is not None:
+                        self._sha256.update(chunk)
+                    with self._lock:
+                        segment.done += len(chunk)
+                        if time.monotonic() - self._saved_at > PROGRESS_SAVE_SECONDS:
+                            self._save_progress()
+            finally:
+                with self._lock:
+                    self._save_progress()
+                record_transfer(
+                    self.url,
+                    nbytes=segment.done - started_at,
+                    seconds=time.monotonic() - started,
+                )
 
-            with open(fp, "wb") as f:
-                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
-                    f.write(chunk)
+    def _save_progress(self) -> None:
+        """Save progress. Must be called while holding `self._lock`, if running."""
+        self._saved_at = time.monotonic()
+        temp_fp = self.progress_fp.with_name(f"{self.progress_fp.name}.tmp")
+        temp_fp.write_text(
+            json.dumps(
+                {
+                    **_file_version(self.url, self.remote_file),
+                    "segments": [asdict(segment) for segment in self.segments],
+                },
+            ),
+        )
+        temp_fp.replace(self.progress_fp)
 
-        return fp
+
+def _file_version(url: str, remote_file: ResponseValidators) -> dict[str, Any]:
+    """Identify the version of a file being downloaded, to save with progress."""
+    return {
+        "url": url,
+        "size": remote_file.content_length,
+        "etag": remote_file.etag,
+        "last_modified": remote_file.last_modified,
+    }
 
 
-def _ftp_fetch_and_write(url: str, output_dir: Path) -> None:
+def _ftp_fetch_and_write(
+    url: str,
+    output_dir: Path,
+    *,
+    partial_dir: Path,
+    chunk_size: int,
+) -> tuple[Path, str]:
+    """Download `url` over a pooled FTP connection, returning its SHA-256.
+
+    The file is first written to a `.part` file in `partial_dir`, alongside the
+    file's URL, size and modification time. If a `.part` file of the same
+    version of the file is already there, the download is resumed from its end
+    with `REST`.
+    """
     # TODO support earthdata login
-    fn = _filename_from_url(url)
+    fn = filename_from_url(url)
+    partial_dir.mkdir(parents=True, exist_ok=True)
+    part_fp = partial_dir / f"{fn}.part"
+    progress_fp = part_fp.with_name(f"{part_fp.name}.json")
+
+    with ftp_connection(url) as ftp:
+        path = ftp_path(url)
+        size = _ftp_size(ftp, path)
+        progress = {"url": url, "size": size, "modified": _ftp_modified(ftp, path)}
+        offset = _ftp_resume_offset(part_fp, progress_fp=progress_fp, progress=progress)
+        if offset:
+            logger.info(f"Resuming download of {url} at {offset}/{size} bytes")
+        else:
+            progress_fp.write_text(json.dumps(progress))
+
+        sha256 = hashlib.sha256() if offset == 0 else None
+        if size is None or offset < size:
+            _ftp_retrieve(
+                url,
+                ftp=ftp,
+                part_fp=part_fp,
+                offset=offset,
+                sha256=sha256,
+                chunk_size=chunk_size,
+            )
+
+    if size is not None and (received := part_fp.stat().st_size) != size:
+        raise exc.QgrTransientError(
+            f"Received {received} of {size} bytes of {url}.",
+        )
+
     fp = output_dir / fn
+    shutil.move(part_fp, fp)
+    progress_fp.unlink()
+    return fp, sha256.hexdigest() if sha256 else file_sha256(fp)
+
+
+def _ftp_resume_offset(
+    part_fp: Path,
+    *,
+    progress_fp: Path,
+    progress: dict[str, Any],
+) -> int:
+    """Find where to resume downloading to `part_fp`, or 0 to start again.
+
+    Only partial downloads of the same URL, size and modification time are
+    resumed. Without a size or modification time, we can't tell whether the
+    file changed, so we start again.
+    """
+    if progress["size"] is None and progress["modified"] is None:
+        return 0
+
+    try:
+        saved_progress = json.loads(progress_fp.read_text())
+        offset = part_fp.stat().st_size
+    except (OSError, ValueError):
+        return 0
+
+    if saved_progress != progress:
+        return 0
+    if progress["size"] is not None and offset > progress["size"]:
+        return 0
+
+    return offset
 
-    # TODO: do we need `closing`?
-    with closing(urllib.request.urlopen(url)) as r:
-        with open(fp, "wb") as f:
-            while True:
-                chunk = r.read(CHUNK_SIZE)
-                if not chunk:
-                    break
-                f.write(chunk)
+
+def _ftp_size(ftp: ftplib.FTP, path: str) -> Optional[int]:
+    try:
+        return ftp.size(path)
+    except ftplib.error_perm:
+        # The server doesn't support `SIZE`.
+        return None
+
+
+def _ftp_modified(ftp: ftplib.FTP, path: str) -> Optional[str]:
+    """Get the modification time of `path`, as the server reports it."""
+    try:
+        return ftp.sendcmd(f"MDTM {path}").split(maxsplit=1)[1]
+    except (ftplib.error_perm, IndexError):
+        # The server doesn't support `MDTM`.
+        return None
+
+
+def _ftp_retrieve(
+    url: str,
+    *,
+    ftp: ftplib.FTP,
+    part_fp: Path,
+    offset: int,
+    sha256,
+    chunk_size: int,
+) -> None:
+    """Append `url` to `part_fp` from `offset`, buffering `chunk_size` bytes."""
+    started = time.monotonic()
+    nbytes = 0
+
+    # Blocks are received much smaller than `chunk_size`; buffer them.
+    with open(part_fp, "ab" if offset else "wb", buffering=chunk_size) as f:
+
+        def write(block: bytes) -> None:
+            nonlocal nbytes
+            f.write(block)
+            if sha256 is not None:
+                sha256.update(block)
+            nbytes += len(block)
+
+        try:
+            ftp.retrbinary(
+                f"RETR {ftp_path(url)}",
+                write,
+                blocksize=FTP_BLOCK_SIZE,
+                rest=offset or None,
+            )
+        finally:
+            record_transfer(url, nbytes=nbytes, seconds=time.monotonic() - started)
 
 
-def _filename_from_url(url: str) -> str:
+def filename_from_url(url: str) -> str:
     url_after_slash_index = url.rfind("/") + 1
     fn = url[url_after_slash_index:]
 
@@ -0,0 +1,129 @@
+"""A process-wide pool of HTTP sessions, one per host.
+
+Reusing a session reuses its connections, avoiding a new TCP/TLS handshake
+for every request, and means each host is only checked for Earthdata Login
+once. Earthdata Login cookies are shared between all sessions, so logging in
+for one host is enough for the login service to skip asking for credentials
+again for another.
+
+Sessions are never shared between processes, because their connections can't
+be safely used after forking.
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from qgreenland.constants.project import DOWNLOAD_SEGMENTS
+from qgreenland.util.edl import create_earthdata_authenticated_session
+
+logger = logging.getLogger("luigi-interface")
+
+URS_HOST = "urs.earthdata.nasa.gov"
+
+# The number of connections kept open per host. Enough for every segment of a
+# segmented download, plus some more for concurrent tasks in the same process.
+POOL_MAXSIZE = DOWNLOAD_SEGMENTS + 4
+
+
+class _CountingAdapter(HTTPAdapter):
+    """An adapter which counts requests, to compare with connections opened."""
+
+    def __init__(self):
+        super().__init__(pool_maxsize=POOL_MAXSIZE)
+        self.request_count = 0
+
+    def send(self, request, *args, **kwargs):
+        self.request_count += 1
+        return super().send(request, *args, **kwargs)
+
+    @property
+    def connection_count(self) -> int:
+        pools = self.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+
+@dataclass
+class _PooledSession:
+    session: requests.Session
+    adapter: _CountingAdapter
+    auth_round_trips: int = 0
+
+
+_SessionKey = tuple[int, str, bool]
+
+_shared_cookies = requests.cookies.RequestsCookieJar()
+_sessions: dict[_SessionKey, _PooledSession] = {}
+# Held while a key's session is created, which may take a while (checking for
+# Earthdata Login), so that's done once without holding up other hosts.
+_key_locks: dict[_SessionKey, threading.Lock] = {}
+# Guards changes to `_sessions` and `_key_locks`.
+_lock = threading.Lock()
+
+
+def get_session(url: str, *, verify: bool = True) -> requests.Session:
+    """Get this process's session for the host of `url`.
+
+    The session is authenticated with Earthdata Login if the host requires it.
+    We assume a host either requires it for all URLs or none.
+    """
+    scheme, host, *_ = urlsplit(url)
+    key = (os.getpid(), f"{scheme}://{host}", verify)
+
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        if key not in _sessions:
+            pooled = _new_session()
+            pooled.session.verify = verify
+            create_earthdata_authenticated_session(
+                pooled.session,
+                hosts=[url],
+                verify=verify,
+            )
+            with _lock:
+                _sessions[key] = pooled
+
+        return _sessions[key].session
+
+
+def _new_session() -> _PooledSession:
+    session = requests.Session()
+    session.cookies = _shared_cookies
+
+    adapter = _CountingAdapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    pooled = _PooledSession(session=session, adapter=adapter)
+
+    def count_auth_round_trips(resp, *args, **kwargs):
+        if urlsplit(resp.url).hostname == URS_HOST:
+            pooled.auth_round_trips += 1
+
+    session.hooks["response"].append(count_auth_round_trips)
+
+    return pooled
+
+
+def log_session_stats() -> None:
+    """Log how well each of this process's sessions reused connections."""
+    pid = os.getpid()
+    with _lock:
+        for (session_pid, host, _), pooled in _sessions.items():
+            if session_pid != pid:
+                continue
+
+            requests_sent = pooled.adapter.request_count
+            connections = pooled.adapter.connection_count
+            logger.info(
+                f"HTTP session for {host}: {requests_sent} requests over"
+                f" {connections} connections"
+                f" ({max(0, requests_sent - connections)} reused),"
+                f" {pooled.auth_round_trips} Earthdata Login round trips",
+            )
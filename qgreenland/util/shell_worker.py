@@ -0,0 +1,41 @@
+"""Run shell commands one at a time for a persistent shell worker.
+
+Started by `qgreenland.util.command` with the path of this file, so only the
+standard library may be imported. Each line read from stdin is a JSON request
+`{"cmd": ..., "stdout": ..., "stderr": ...}`; the command is run with bash,
+its output written to the given files, and a JSON line with its exit code and
+resource usage (the fields of `resource.struct_rusage`) written to stdout.
+Exits when stdin is closed.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+
+def run(request: dict) -> dict:
+    with open(request["stdout"], "wb") as stdout, open(
+        request["stderr"],
+        "wb",
+    ) as stderr:
+        process = subprocess.Popen(
+            ["/bin/bash", "-c", request["cmd"]],
+            stdin=subprocess.DEVNULL,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+    return {"returncode": process.returncode, "rusage": list(rusage)}
+
+
+def main() -> None:
+    for line in sys.stdin:
+        sys.stdout.write(json.dumps(run(json.loads(line))) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,11 @@
-import copy
-import json
 import logging
 from abc import ABC
 from fnmatch import fnmatch
 from functools import cached_property
 from pathlib import Path
-from typing import Any, Optional, Union
+from typing import Any, Callable, Optional, Union, cast
 
 import anytree
-import funcy
 from anytree.exporter import DictExporter
 
 import qgreenland.exceptions as exc
@@ -20,9 +17,8 @@ from qgreenland.models.config.layer_group import (
     LayerGroupSettings,
     RootGroupSettings,
 )
-from qgreenland.util.json import MagicJSONEncoder
 from qgreenland.util.misc import find_duplicates
-from qgreenland.util.module import load_objects_from_paths_by_class
+from qgreenland.util.module import ModuleObjects, load_objects_from_paths_by_class
 
 logger = logging.getLogger("luigi-interface")
 
@@ -90,12 +86,18 @@ def layer_tree(
     include_patterns: tuple[str, ...] = (),
     exclude_patterns: tuple[str, ...] = (),
     exclude_manual_assets: bool = False,
+    module_objects: Optional[ModuleObjects] = None,
 ) -> anytree.Node:
+    """Build the layer tree from the directories and modules in `layer_cfg_dir`.
+
+    See `load_objects_from_paths_by_class` for `module_objects`.
+    """
     tree = _tree_from_dir(
         layer_cfg_dir,
         include_patterns=include_patterns,
         exclude_patterns=exclude_patterns,
         exclude_manual_assets=exclude_manual_assets,
+        module_objects=module_objects,
     )
 
     # Clean up any empty layer groups. This shouldn't happen normally, but if
@@ -116,19 +118,6 @@ def layer_tree(
     return tree
 
 
-def leaf_lookup(
-    tree: anytree.Node,
-    target_node_name: str,
-) -> LayerNode:
-    matches = [leaf for leaf in tree.leaves if leaf.name == target_node_name]
-    if len(matches) != 1:
-        raise RuntimeError(
-            f"Found not-one matches: {matches}",
-        )
-
-    return matches[0]
-
-
 def _filter_directory_contents(paths=list[Path]) -> list[Path]:
     """Return the `paths` to include only those we care about."""
 
@@ -147,6 +136,8 @@ LayerDirectoryElement = Union[Path, Layer]
 
 def _explode_config_layers_from_python_files(
     paths: list[Path],
+    *,
+    module_objects: Optional[ModuleObjects] = None,
 ) -> list[LayerDirectoryElement]:
     """Explode Layers from Python files, with directory paths intact.
 
@@ -160,6 +151,7 @@ def _explode_config_layers_from_python_files(
             config_layers = load_objects_from_paths_by_class(
                 [path],
                 target_class=Layer,
+                module_objects=module_objects,
             )
             result.extend(config_layers)
         else:
@@ -194,38 +186,42 @@ def _default_ordering_strategy(
     return ordered_directory_elements
 
 
+def _order_key(element: LayerDirectoryElement) -> str:
+    """Identify `element` as it would be in `settings.order`.
+
+    Layers are identified by their id with a leading ":", and groups by their
+    directory name.
+    """
+    if isinstance(element, Layer):
+        return f":{element.id}"
+    return element.name
+
+
 def _manual_ordering_strategy(
     layers_and_groups: list[LayerDirectoryElement],
     settings: AnyGroupSettings,
 ) -> list[LayerDirectoryElement]:
     """Sort `layers_and_groups` using `settings.order` as a guide."""
-    ordered_directory_elements: list[LayerDirectoryElement] = []
-
     if not settings.order:
         raise RuntimeError("Order must be specified in settings.")
 
-    for s in settings.order:
-        try:
-            if s.startswith(":"):
-                matcher = lambda x: isinstance(x, Layer) and x.id == s[1:]
-                thing_desc = f'layer id "{s[1:]}"'
-            else:
-                matcher = lambda x: isinstance(x, Path) and x.name == s
-                thing_desc = f'group/directory "{s}"'
-
-            matches = funcy.lfilter(matcher, layers_and_groups)
-            if len(matches) != 1:
-                raise RuntimeError(
-                    f"Expected to find {thing_desc}. Found: {matches}",
-                )
+    elements_by_key: dict[str, list[LayerDirectoryElement]] = {}
+    for element in layers_and_groups:
+        elements_by_key.setdefault(_order_key(element), []).append(element)
 
-            thing = matches[0]
-        except Exception as e:
+    ordered_directory_elements: list[LayerDirectoryElement] = []
+    for s in settings.order:
+        matches = elements_by_key.get(s, [])
+        if len(matches) != 1:
+            thing_desc = (
+                f'layer id "{s[1:]}"' if s.startswith(":") else f'group/directory "{s}"'
+            )
             raise RuntimeError(
-                f'Unexpected error processing `settings.order` element "{s}".' f" {e}",
+                f'Unexpected error processing `settings.order` element "{s}".'
+                f" Expected to find {thing_desc}. Found: {matches}",
             )
 
-        ordered_directory_elements.append(thing)
+        ordered_directory_elements.append(matches[0])
 
     return ordered_directory_elements
 
@@ -238,16 +234,11 @@ def _validate_ordered(
     """Validate that `ordered_directory_elements` is comprehensive.
 
     All `LayerDirectoryElement`s found in `unordered_layers_and_groups` must be
-    present in `ordered_layers_and_groups`. Return any elements which are not.
+    present in `ordered_layers_and_groups`, and vice versa. Elements are
+    compared by their `settings.order` keys.
     """
-    ondisk_set = {
-        json.dumps(e, cls=MagicJSONEncoder, sort_keys=True)
-        for e in unordered_layers_and_groups
-    }
-    ordered_set = {
-        json.dumps(e, cls=MagicJSONEncoder, sort_keys=True)
-        for e in ordered_layers_and_groups
-    }
+    ondisk_set = {_order_key(e) for e in unordered_layers_and_groups}
+    ordered_set = {_order_key(e) for e in ordered_layers_and_groups}
 
     if (diff := ondisk_set - ordered_set) != set():
         raise RuntimeError(
@@ -263,6 +254,7 @@ def _ordered_layers_and_groups(
     the_dir: Path,
     *,
     is_root: bool,
+    module_objects: Optional[ModuleObjects] = None,
 ) -> tuple[list[LayerDirectoryElement], AnyGroupSettings]:
     """Examine `the_dir` for layers and groups and sort them.
 
@@ -274,10 +266,12 @@ def _ordered_layers_and_groups(
     (layer_and_group_paths, settings, settings_path,) = _handle_layer_config_directory(
         the_dir,
         is_root=is_root,
+        module_objects=module_objects,
     )
 
     layers_and_groups = _explode_config_layers_from_python_files(
         layer_and_group_paths,
+        module_objects=module_objects,
     )
 
     try:
@@ -304,6 +298,7 @@ def _handle_layer_config_directory(
     the_dir: Path,
     *,
     is_root: bool,
+    module_objects: Optional[ModuleObjects] = None,
 ) -> tuple[list[Path], AnyGroupSettings, Optional[Path]]:
     """Load settings and contents from given directory path."""
     directory_contents = _filter_directory_contents(
@@ -329,6 +324,7 @@ def _handle_layer_config_directory(
     settings_objects = load_objects_from_paths_by_class(
         [settings_fp],
         target_class=RootGroupSettings,
+        module_objects=module_objects,
     )
 
     if len(settings_objects) != 1:
@@ -410,11 +406,13 @@ def _tree_from_dir(
     include_patterns: tuple[str, ...] = (),
     exclude_patterns: tuple[str, ...] = (),
     exclude_manual_assets: bool = False,
+    module_objects: Optional[ModuleObjects] = None,
 ) -> anytree.Node:
     """Create a Node tree for given `the_dir`, attached to `parent`."""
     ordered_layers_and_groups, settings = _ordered_layers_and_groups(
         the_dir,
         is_root=(not bool(parent)),
+        module_objects=module_objects,
     )
 
     # Create a node for this directory
@@ -434,6 +432,7 @@ def _tree_from_dir(
                 include_patterns=include_patterns,
                 exclude_patterns=exclude_patterns,
                 exclude_manual_assets=exclude_manual_assets,
+                module_objects=module_objects,
             )
         elif isinstance(thing, Layer):
             if _matches_filters(
@@ -460,54 +459,75 @@ def _tree_from_dir(
     return root_node
 
 
-def _delete_node(
-    node: anytree.node,
+def _log_pruned(
+    node: QgrTreeNode,
     msg: str = "Removing node",
 ) -> None:
-    """Delete (_"delete"_) the node by orphaning it and letting the GC kill it.
-
-    Yes, this is the right way :)
-        https://github.com/c0fec0de/anytree/issues/152
-    """
     node_path = list(node.group_name_path) + [node.name]
     node_name = "/".join(node_path)
-    logger.warn(f"{msg}: /{node_name}")
-    node.parent = None
+    logger.warning(f"{msg}: /{node_name}")
+
+
+def _pruned_copy(
+    node: QgrTreeNode,
+    *,
+    keep_layer: Callable[[Layer], bool],
+    parent: Optional[LayerGroupNode] = None,
+) -> Optional[QgrTreeNode]:
+    """Copy `node` and its descendants, keeping only non-empty groups.
+
+    Only layers for which `keep_layer` is true are kept. The tree is copied in a
+    single post-order pass, and the copies share the (immutable) layer configs
+    and group settings of the originals, so copying is cheap.
+    """
+    if isinstance(node, LayerNode):
+        if not keep_layer(node.layer_cfg):
+            _log_pruned(node, msg="Removing layer not in package")
+            return None
+
+        return LayerNode(node.name, layer_cfg=node.layer_cfg, parent=parent)
+
+    group = LayerGroupNode(node.name, settings=node.settings)
+    for child in node.children:
+        _pruned_copy(child, keep_layer=keep_layer, parent=group)
+
+    # Only attach groups once we know they aren't empty.
+    if not group.children:
+        _log_pruned(node, msg="Removing empty group")
+        return None
+
+    group.parent = parent
+    return group
+
+
+def _prune(
+    tree: LayerGroupNode,
+    *,
+    keep_layer: Callable[[Layer], bool],
+) -> LayerGroupNode:
+    pruned = _pruned_copy(tree, keep_layer=keep_layer)
+    if pruned is None:
+        # Keep the root, even if it's empty.
+        return LayerGroupNode(tree.name, settings=tree.settings)
+
+    return cast(LayerGroupNode, pruned)
 
 
 def prune_layers_not_in_package(
     tree: LayerGroupNode,
 ) -> LayerGroupNode:
-    """Remove any leaf nodes that are `not in_package`.
+    """Copy `tree` without any leaf nodes that are `not in_package`.
 
     If there are any empty groups after this, remove them too.
     """
-    lt = copy.deepcopy(tree)
-
-    # We can iterate using tree.leaves here because we know all LayerNodes are
-    # leaves. Removing these leaves shouldn't create new LayerNode leaves.
-    for node in lt.leaves:
-        if type(node) is LayerNode and not node.layer_cfg.in_package:
-            _delete_node(node, msg="Removing layer not in package")
-
-    lt = prune_empty_groups(lt)
-    return lt
+    return _prune(tree, keep_layer=lambda layer_cfg: layer_cfg.in_package)
 
 
 def prune_empty_groups(
     tree: LayerGroupNode,
 ) -> LayerGroupNode:
-    """Remove any leaf nodes which are not LayerNodes."""
-    lt = copy.deepcopy(tree)
-
-    # NOTE: We MUST iterate using PostOrderIter(lt) instead of lt.leaves
-    # because removing a leaf group may leave its parent group newly enleafened.
-    for node in anytree.PostOrderIter(lt):
-        if node.is_leaf and type(node) is not LayerNode:
-            logger.warn(f"{node.group_name_path=}, {node.name=}")
-            _delete_node(node, msg="Removing empty group")
-
-    return lt
+    """Copy `tree` without any leaf nodes which are not LayerNodes."""
+    return _prune(tree, keep_layer=lambda layer_cfg: True)
 
 
 if __name__ == "__main__":
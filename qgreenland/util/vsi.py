@@ -0,0 +1,127 @@
+"""Address files inside archives with GDAL's virtual file systems.
+
+GDAL reads e.g. `/vsizip//path/to/data.zip/dir/data.shp` directly from the
+archive, so steps can read archive members without a step extracting them
+first. Globs are allowed in both the archive and member parts of these paths
+in a `PythonStep`'s `input_file`, and are expanded like a shell would expand
+them in a directory the archive was extracted to.
+
+Some formats can't be read through a virtual file system. Their archives are
+extracted to a temporary directory when the step runs instead.
+"""
+import glob
+import gzip
+import shutil
+import zipfile
+from fnmatch import fnmatch
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+import qgreenland.exceptions as exc
+
+# GDAL virtual file system prefixes, by `decompress_step` decompression type.
+VSI_ARCHIVE_PREFIXES = {
+    "unzip": "/vsizip/",
+    "gzip": "/vsigzip/",
+}
+# Archive file extensions, by prefix.
+VSI_ARCHIVE_SUFFIXES = {
+    "/vsizip/": ".zip",
+    "/vsigzip/": ".gz",
+}
+
+
+def archive_member_path(
+    archive: str,
+    member: str = "",
+    *,
+    decompress_type: str = "unzip",
+) -> Optional[str]:
+    """Find the GDAL path to `member` of `archive`.
+
+    `None` if GDAL can't read the archive in place. gzip files have exactly
+    one member, so `member` must be empty for them.
+    """
+    prefix = VSI_ARCHIVE_PREFIXES.get(decompress_type)
+    if prefix is None or not archive.lower().endswith(VSI_ARCHIVE_SUFFIXES[prefix]):
+        return None
+    if prefix == "/vsigzip/":
+        return None if member else f"{prefix}{archive}"
+
+    return f"{prefix}{archive}/{member}" if member else f"{prefix}{archive}"
+
+
+def split_archive_path(path: str) -> Optional[tuple[str, str, str]]:
+    """Split a GDAL archive path into its prefix, archive, and member.
+
+    `None` if `path` isn't in an archive.
+    """
+    for prefix, suffix in VSI_ARCHIVE_SUFFIXES.items():
+        if not path.startswith(prefix):
+            continue
+
+        parts = path.removeprefix(prefix).split("/")
+        for i, part in enumerate(parts):
+            if part.lower().endswith(suffix):
+                archive, member = parts[: i + 1], parts[i + 1 :]  # noqa: E203
+                return prefix, "/".join(archive), "/".join(member)
+
+    return None
+
+
+def expand_archive_path(path: str) -> list[str]:
+    """Expand globs in the archive and member parts of `path`."""
+    split = split_archive_path(path)
+    if split is None:
+        raise exc.QgrRuntimeError(f"Expected a path in an archive. Received: {path}")
+    prefix, archive, member = split
+
+    archives = sorted(glob.glob(archive)) if glob.has_magic(archive) else [archive]
+    if not glob.has_magic(member):
+        return [f"{prefix}{a}/{member}" if member else f"{prefix}{a}" for a in archives]
+
+    return [
+        f"{prefix}{a}/{name}"
+        for a in archives
+        for name in _archive_members(a, prefix=prefix)
+        if _glob_match(name, member)
+    ]
+
+
+def _archive_members(archive: str, *, prefix: str) -> list[str]:
+    if prefix != "/vsizip/":
+        raise exc.QgrRuntimeError(f"Can't list the members of {prefix}{archive}")
+
+    with zipfile.ZipFile(archive) as zip_file:
+        return sorted(name for name in zip_file.namelist() if not name.endswith("/"))
+
+
+def _glob_match(name: str, pattern: str) -> bool:
+    """Match `name` like a shell glob would: wildcards don't match `/`."""
+    name_parts = PurePosixPath(name).parts
+    pattern_parts = PurePosixPath(pattern).parts
+    return len(name_parts) == len(pattern_parts) and all(
+        fnmatch(n, p) for n, p in zip(name_parts, pattern_parts)
+    )
+
+
+def extract_archive_path(path: str, *, output_dir: Path) -> str:
+    """Extract the archive containing `path` to `output_dir`.
+
+    Returns the extracted equivalent of `path`. Every member is extracted, so
+    files which accompany the member (e.g. a shapefile's `.dbf`) are too.
+    """
+    split = split_archive_path(path)
+    if split is None:
+        raise exc.QgrRuntimeError(f"Expected a path in an archive. Received: {path}")
+    prefix, archive, member = split
+
+    if prefix == "/vsigzip/":
+        extracted_fp = output_dir / Path(archive).stem
+        with gzip.open(archive, "rb") as src, open(extracted_fp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        return str(extracted_fp)
+
+    with zipfile.ZipFile(archive) as zip_file:
+        zip_file.extractall(output_dir)
+    return str(output_dir / member)
@@ -14,6 +14,9 @@ fi
 # In case of permission problems:
 # sudo chown -R $USER:$USER $LOCAL_CACHE_DIR/*
 
-rsync -a --progress --verbose \
+# Fetched files are hard links to content-addressed blobs in `.blobs`.
+# Preserve the links (`-H`) so each file is copied only once, and skip files we
+# already have; blobs never change.
+rsync -aH --ignore-existing --progress --verbose \
     -e "ssh -i ${VAGRANT_SSH_KEY}" \
-    vagrant@${PROD_HOSTNAME}:${PROD_CACHE_DIR}/* ${LOCAL_CACHE_DIR}/.
+    vagrant@${PROD_HOSTNAME}:${PROD_CACHE_DIR}/ ${LOCAL_CACHE_DIR}/
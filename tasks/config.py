@@ -3,23 +3,35 @@
 # the QGreenland code" as opposed to "analyzing" it or "exercising" it for
 # testing.
 import difflib
-from pathlib import Path
+import time
+from pprint import pprint
 
 from invoke import task
 
 from qgreenland.constants.paths import CONFIG_DIR
 from qgreenland.util.config.config import get_config, init_config
 from qgreenland.util.config.export import export_config_json
+from qgreenland.util.config.incremental import (
+    IncrementalConfigCompiler,
+    config_module_fps,
+)
 
 
 @task
-def validate(ctx, verbose=False):
+def validate(ctx, verbose=False, watch=False):
     """Validate the configuration files.
 
     The validation is built-in to the code that loads the config files, and this
     happens when initializing the configuration. Any validation errors will be
     raised from the import statement.
+
+    With `--watch`, validate again whenever a config module is saved. Only the
+    changed modules, and the modules which import them, are executed again.
     """
+    if watch:
+        _validate_on_change()
+        return
+
     init_config()
     config = get_config()
 
@@ -37,6 +49,33 @@ def validate(ctx, verbose=False):
     print("🎉🦆 Configuration validation passed.")
 
 
+def _validate_on_change(*, poll_interval: float = 0.5) -> None:
+    compiler = IncrementalConfigCompiler(CONFIG_DIR)
+    mtimes = None
+    print("Watching for config changes. Press Ctrl-C to stop.")
+    try:
+        while True:
+            current = {
+                fp: fp.stat().st_mtime_ns for fp in config_module_fps(CONFIG_DIR)
+            }
+            if current != mtimes:
+                mtimes = current
+                start = time.monotonic()
+                try:
+                    compiler.compile()
+                except Exception as e:
+                    print(f"❌ Configuration validation failed:\n{e}")
+                else:
+                    print(
+                        f"🎉🦆 Configuration validation passed"
+                        f" ({len(compiler.executed)} modules executed in"
+                        f" {time.monotonic() - start:.2f}s).",
+                    )
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+
 @task
 def export(ctx):
     """Export the config as a JSON string."""